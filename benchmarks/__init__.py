@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for the RSA pipeline against a simulated LLM endpoint
+"""
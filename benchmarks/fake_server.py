@@ -0,0 +1,304 @@
+"""
+Fake OpenAI-compatible Server
+Local /chat/completions endpoint with configurable latency, 429s and throughput
+"""
+
+import json
+import math
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "lognormal")
+
+# Granularity of the simulated prompt cache (~128 tokens, like hosted providers)
+PREFIX_BLOCK_CHARS = 512
+
+_VOCABULARY = (
+    "algoritmo solución función lista índice valor caso error complejidad "
+    "búsqueda orden pivote recursión memoria tiempo prueba entrada salida "
+    "resultado estructura nodo árbol grafo arreglo mitad límite condición"
+).split()
+
+
+class FakeOpenAIServer:
+    """
+    Simulated chat completions endpoint for offline benchmarks and tests
+    
+    Each request waits a base latency drawn from the configured distribution
+    plus completion_tokens / tokens_per_second, and is rejected with a 429
+    (and Retry-After header) with probability rate_limit_probability.
+    Supports n > 1 and stream=True like the real API, and reports
+    usage.prompt_tokens_details.cached_tokens for the leading blocks of the
+    messages that an earlier request already sent (simulated prefix cache).
+    """
+    
+    def __init__(
+        self,
+        latency: str = "lognormal",
+        latency_mean: float = 0.2,
+        latency_spread: float = 0.5,
+        rate_limit_probability: float = 0.0,
+        retry_after: float = 0.5,
+        tokens_per_second: Optional[float] = None,
+        completion_tokens: int = 60,
+        max_n: int = 8,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Configure the simulated endpoint
+        
+        Args:
+            latency: "constant", "uniform" (mean ± spread) or "lognormal" (median mean, sigma spread)
+            latency_mean: Base latency in seconds
+            latency_spread: Distribution width (seconds for uniform, sigma for lognormal)
+            rate_limit_probability: Probability of answering 429 instead of a completion
+            retry_after: Value of the Retry-After header on 429 responses
+            tokens_per_second: Simulated generation throughput (None = instant)
+            completion_tokens: Words generated per completion
+            max_n: Largest n accepted in one request (larger n gets a 400)
+            seed: Random seed for reproducible runs
+            host: Interface to bind
+            port: Port to bind (0 = any free port)
+        """
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency must be one of {LATENCY_DISTRIBUTIONS}")
+        
+        self.latency = latency
+        self.latency_mean = latency_mean
+        self.latency_spread = latency_spread
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.max_n = max_n
+        self.host = host
+        self.port = port
+        
+        self.stats = {"requests": 0, "completions": 0, "rate_limited": 0, "streams": 0, "cached_tokens": 0,
+                      "connections": 0, "abandoned": 0}
+        self._prefixes = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        """Base URL to pass as base_url to the clients"""
+        if self._server is None:
+            raise RuntimeError("Server not started")
+        return f"http://{self.host}:{self._server.server_address[1]}"
+    
+    def start(self) -> "FakeOpenAIServer":
+        """Start serving in a background thread"""
+        handler = type("Handler", (_FakeHandler,), {"fake": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler, bind_and_activate=False)
+        self._server.daemon_threads = True
+        # The default backlog of 5 drops connects of a burst of concurrent
+        # calls, and each dropped SYN costs a 1s retransmit: a fake tail
+        self._server.request_queue_size = 128
+        self._server.server_bind()
+        self._server.server_activate()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def _sample_latency(self) -> float:
+        """Draw the base latency of one request"""
+        with self._lock:
+            if self.latency == "constant":
+                return self.latency_mean
+            if self.latency == "uniform":
+                return max(0.0, self._random.uniform(
+                    self.latency_mean - self.latency_spread,
+                    self.latency_mean + self.latency_spread
+                ))
+            return self.latency_mean * math.exp(self._random.gauss(0.0, self.latency_spread))
+    
+    def _should_rate_limit(self) -> bool:
+        """Decide whether this request gets a 429"""
+        with self._lock:
+            self.stats["requests"] += 1
+            limited = self._random.random() < self.rate_limit_probability
+            if limited:
+                self.stats["rate_limited"] += 1
+            return limited
+    
+    def _completion_text(self) -> str:
+        """Random text of completion_tokens words"""
+        with self._lock:
+            self.stats["completions"] += 1
+            number = self.stats["completions"]
+            words = [self._random.choice(_VOCABULARY) for _ in range(self.completion_tokens)]
+        return f"Respuesta simulada {number}: " + " ".join(words)
+    
+    def _cached_tokens(self, prompt_text: str) -> int:
+        """Tokens of the longest block-aligned prefix seen before, then remember this prompt's prefixes"""
+        ends = range(PREFIX_BLOCK_CHARS, len(prompt_text) + 1, PREFIX_BLOCK_CHARS)
+        with self._lock:
+            cached_chars = 0
+            for end in ends:
+                if prompt_text[:end] not in self._prefixes:
+                    break
+                cached_chars = end
+            self._prefixes.update(prompt_text[:end] for end in ends)
+            self.stats["cached_tokens"] += cached_chars // 4
+        return cached_chars // 4
+    
+    def _generation_time(self, n: int) -> float:
+        """Time needed to generate n completions at the configured throughput"""
+        if not self.tokens_per_second:
+            return 0.0
+        return n * self.completion_tokens / self.tokens_per_second
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    """Request handler bound to a FakeOpenAIServer through the fake attribute"""
+    
+    fake: FakeOpenAIServer = None
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        """Silence the default per-request logging"""
+    
+    def setup(self):
+        """Count every new TCP connection (keep-alive reuses one for many requests)"""
+        super().setup()
+        with self.fake._lock:
+            self.fake.stats["connections"] += 1
+    
+    def handle(self):
+        """Serve the connection, counting requests the client gave up on (e.g. cancelled hedges)"""
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            with self.fake._lock:
+                self.fake.stats["abandoned"] += 1
+    
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        """Write a JSON response"""
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_chunk(self, data: str):
+        """Write one server-sent event as an HTTP chunk"""
+        payload = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+    
+    def do_POST(self):
+        """Serve /chat/completions"""
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        
+        fake = self.fake
+        time.sleep(fake._sample_latency())
+        
+        if fake._should_rate_limit():
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error", "code": "rate_limit"}},
+                {"Retry-After": str(fake.retry_after)}
+            )
+            return
+        
+        n = int(body.get("n", 1))
+        if n > fake.max_n:
+            self._send_json(400, {"error": {"message": f"n must be at most {fake.max_n}", "param": "n"}})
+            return
+        
+        prompt_text = "".join(
+            f"{m.get('role', '')}:{m.get('content', '')}\n" for m in body.get("messages", [])
+        )
+        usage = {
+            "prompt_tokens": len(prompt_text) // 4 + 1,
+            "completion_tokens": fake.completion_tokens * n,
+            "total_tokens": len(prompt_text) // 4 + 1 + fake.completion_tokens * n,
+            "prompt_tokens_details": {"cached_tokens": fake._cached_tokens(prompt_text)},
+        }
+        model = body.get("model", "fake")
+        
+        if body.get("stream"):
+            self._stream(model, usage)
+            return
+        
+        time.sleep(fake._generation_time(n))
+        choices = [
+            {
+                "index": i,
+                "message": {"role": "assistant", "content": fake._completion_text()},
+                "finish_reason": "stop",
+            }
+            for i in range(n)
+        ]
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": choices,
+            "usage": usage,
+        })
+    
+    def _stream(self, model: str, usage: Dict[str, int]):
+        """Send one completion word by word as server-sent events"""
+        fake = self.fake
+        with fake._lock:
+            fake.stats["streams"] += 1
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        
+        words = fake._completion_text().split(" ")
+        per_word = fake._generation_time(1) / max(1, len(words))
+        for i, word in enumerate(words):
+            if per_word:
+                time.sleep(per_word)
+            delta = {"content": word if i == 0 else " " + word}
+            self._send_chunk(json.dumps({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }))
+        self._send_chunk(json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage,
+        }))
+        self._send_chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
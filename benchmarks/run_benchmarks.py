@@ -0,0 +1,181 @@
+"""
+RSA Benchmark Suite
+Runs RSAOrchestrator end-to-end against the fake server over a parameter grid
+
+Usage:
+  python -m benchmarks.run_benchmarks
+  python -m benchmarks.run_benchmarks --modes sync async --population 8 16 --loops 2 3 --rate-limit-probability 0.05
+"""
+
+import sys
+import json
+import time
+import argparse
+import itertools
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_server import FakeOpenAIServer, LATENCY_DISTRIBUTIONS
+from src.aggregation import POPULATION_SCHEDULES, PROMPT_LAYOUTS
+from src.rsa_orchestrator import RSAOrchestrator
+from src.hedging import HedgePolicy
+
+
+BENCHMARK_PROMPT = "Escribe una función de búsqueda binaria en Python con manejo de casos límite."
+MODES = ("sync", "threads", "async", "dataflow")
+
+
+def run_case(server: FakeOpenAIServer, mode: str, population: int, group_size: int, loops: int,
+             concurrency: int, n_sampling: bool = True, prompt_layout: str = "classic",
+             population_schedule: str = "shrink", hedge: Optional[float] = None,
+             population_extra: int = 0) -> Dict[str, Any]:
+    """
+    Run one RSA pipeline against the fake server and collect its metrics
+    
+    Args:
+        server: Running fake server
+        mode: "sync" (serial), "threads" (thread pool groups), "async" or "dataflow"
+            (async without the barrier between loops)
+        population: Population size
+        group_size: Group size (k)
+        loops: Number of loops
+        concurrency: max_workers for threads / max_concurrency for async and dataflow
+        n_sampling: Request the initial population with n > 1
+        prompt_layout: Aggregation prompt layout ("classic" or "shared-prefix")
+        population_schedule: Population size per loop ("shrink", "constant" or "geometric")
+        hedge: Latency percentile after which calls are duplicated (None = no hedging)
+        population_extra: Spare initial samples; the first population ones to finish are kept
+        
+    Returns:
+        Benchmark record with wall time and per-phase metrics
+    """
+    orchestrator = RSAOrchestrator(
+        api_key="benchmark",
+        base_url=server.url,
+        population_size=population,
+        group_size=group_size,
+        loops=loops,
+        verbose=False,
+        max_concurrency=concurrency,
+        max_workers=concurrency if mode == "threads" else 1,
+        n_sampling=n_sampling,
+        prompt_layout=prompt_layout,
+        population_schedule=population_schedule,
+        dataflow=mode == "dataflow",
+        hedge=HedgePolicy(percentile=hedge) if hedge is not None else None,
+        population_extra=population_extra
+    )
+    requests_before = server.stats["requests"]
+    
+    start = time.perf_counter()
+    error = None
+    try:
+        if mode in ("async", "dataflow"):
+            orchestrator.run_concurrent(BENCHMARK_PROMPT)
+        else:
+            orchestrator.run(BENCHMARK_PROMPT)
+    except Exception as e:
+        error = str(e)
+    wall_time = time.perf_counter() - start
+    
+    summary = orchestrator.last_run_stats.get("metrics", {"totals": {}, "phases": {}})
+    return {
+        "mode": mode,
+        "population": population,
+        "group_size": group_size,
+        "loops": loops,
+        "concurrency": concurrency,
+        "schedule": population_schedule,
+        "wall_time": wall_time,
+        "http_requests": server.stats["requests"] - requests_before,
+        "calls": summary["totals"].get("calls", 0),
+        "retries": summary["totals"].get("retries", 0),
+        "prompt_tokens": summary["totals"].get("prompt_tokens", 0),
+        "cached_tokens": summary["totals"].get("cached_tokens", 0),
+        "cancelled": summary["totals"].get("cancelled", 0),
+        "hedges": orchestrator.last_run_stats.get("hedges", 0),
+        "phases": {
+            name: {"p50": phase["p50_latency"], "p95": phase["p95_latency"], "calls": phase["calls"]}
+            for name, phase in summary["phases"].items()
+        },
+        "error": error,
+    }
+
+
+def format_record(record: Dict[str, Any]) -> str:
+    """One-line human readable summary of a benchmark record"""
+    head = (
+        f"{record['mode']:<8} N={record['population']:<3} k={record['group_size']:<2} "
+        f"L={record['loops']:<2} c={record['concurrency']:<3} "
+        f"wall={record['wall_time']:7.2f}s calls={record['calls']:<3} "
+        f"http={record['http_requests']:<3} retries={record['retries']:<3} "
+        f"cached={record['cached_tokens']}/{record['prompt_tokens']} tok"
+    )
+    if record["hedges"] or record["cancelled"]:
+        head += f" hedges={record['hedges']} cancelled={record['cancelled']}"
+    phases = "  ".join(
+        f"{name}: p50={p['p50']:.2f}s p95={p['p95']:.2f}s" for name, p in record["phases"].items()
+    )
+    status = f"  ❌ {record['error']}" if record["error"] else ""
+    return f"{head}\n    {phases}{status}"
+
+
+def main():
+    """Benchmark CLI entry point"""
+    parser = argparse.ArgumentParser(description="Benchmarks offline del pipeline RSA contra un servidor simulado")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--population", nargs="+", type=int, default=[8, 16])
+    parser.add_argument("--group-size", nargs="+", type=int, default=[4])
+    parser.add_argument("--loops", nargs="+", type=int, default=[2])
+    parser.add_argument("--concurrency", type=int, default=8, help="max_workers / max_concurrency (default: 8)")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-mean", type=float, default=0.2, help="Latencia base en segundos (default: 0.2)")
+    parser.add_argument("--latency-spread", type=float, default=0.5, help="Dispersión de la latencia (default: 0.5)")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0, help="Probabilidad de responder 429")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Cabecera Retry-After de los 429 (segundos)")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Throughput simulado de generación")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-n-sampling", dest="n_sampling", action="store_false",
+                        help="Una petición por respuesta de la población inicial")
+    parser.add_argument("--prompt-layout", choices=PROMPT_LAYOUTS, default="classic",
+                        help="Disposición de los prompts de agregación (default: classic)")
+    parser.add_argument("--schedule", choices=POPULATION_SCHEDULES, default="shrink",
+                        help="Schedule de tamaño de la población por loop (default: shrink)")
+    parser.add_argument("--hedge", type=float, default=None, metavar="PERCENTIL",
+                        help="Duplica las llamadas más lentas que este percentil de latencia (solo async/dataflow)")
+    parser.add_argument("--population-extra", type=int, default=0, metavar="M",
+                        help="Pide N+M respuestas iniciales y usa las N primeras (solo async/dataflow)")
+    parser.add_argument("--output", type=str, default=None, help="Guarda los resultados en JSON")
+    args = parser.parse_args()
+    
+    server = FakeOpenAIServer(
+        latency=args.latency,
+        latency_mean=args.latency_mean,
+        latency_spread=args.latency_spread,
+        rate_limit_probability=args.rate_limit_probability,
+        retry_after=args.retry_after,
+        tokens_per_second=args.tokens_per_second,
+        seed=args.seed
+    )
+    
+    records: List[Dict[str, Any]] = []
+    with server:
+        print(f"🧪 Servidor simulado en {server.url} (latencia {args.latency}, media {args.latency_mean}s)\n")
+        grid = itertools.product(args.modes, args.population, args.group_size, args.loops)
+        for mode, population, group_size, loops in grid:
+            record = run_case(server, mode, population, group_size, loops, args.concurrency,
+                              args.n_sampling, args.prompt_layout, args.schedule, args.hedge,
+                              args.population_extra)
+            records.append(record)
+            print(format_record(record))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {args.output}")
+    
+    if any(r["error"] for r in records):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
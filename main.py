@@ -3,8 +3,58 @@ RSA System - Command Line Interface
 """
 
 import argparse
+import logging
 import sys
+from functools import partial
 from src.rsa_orchestrator import RSAOrchestrator
+from src.response_cache import ResponseCache, DEFAULT_CACHE_PATH
+from src.checkpoint import DEFAULT_CHECKPOINT_PATH
+from src.batch import run_batch
+from src.budget import RunBudget
+from src.hedging import HedgePolicy
+from src.degradation import FailurePolicy, STAGE_ACTIONS
+from src.events import EventBus, JSONLSink, LoggingSink, ProgressSink
+from src.backends import LocalStubBackend
+from src.endpoint_pool import BALANCING_STRATEGIES, Endpoint, PooledBackend
+from src.tiering import ModelLimits, TieredBackend
+from src.gemini_client import GITHUB_MODELS_BASE_URL
+from src.http_pool import HTTPPoolConfig, http2_available
+
+
+def print_result_header():
+    """Print the banner shown before the final solution"""
+    print("\n" + "="*60)
+    print("📌 SOLUCIÓN FINAL")
+    print("="*60 + "\n")
+
+
+def print_stream(chunks):
+    """Print final solution chunks as they arrive"""
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            print_result_header()
+        print(chunk, end="", flush=True)
+    print("\n\n" + "="*60 + "\n")
+
+
+async def print_stream_async(chunks):
+    """Print final solution chunks from an async iterator as they arrive"""
+    first = True
+    async for chunk in chunks:
+        if first:
+            print_result_header()
+            first = False
+        print(chunk, end="", flush=True)
+    print("\n\n" + "="*60 + "\n")
+
+
+def print_provisional(stage, answer, loops):
+    """Print an anytime answer unless it is the final one (printed as the result)"""
+    if stage >= loops:
+        return
+    print(f"\n🕒 Respuesta provisional (etapa {stage}):\n")
+    print(answer)
+    print("\n" + "-"*60)
 
 
 def main():
@@ -24,6 +74,15 @@ Ejemplos de uso:
   # Modo silencioso
   python main.py "Debug este código: [código aquí]" --quiet
 
+  # Reanudar una ejecución larga interrumpida
+  python main.py "Diseña una arquitectura de microservicios" --population 20 --loops 7 --resume
+
+  # Procesar muchos prompts en paralelo (resultados en results.jsonl)
+  python main.py --batch prompts.jsonl --output results.jsonl --max-concurrency 16 --quiet
+
+  # Todas las llamadas de cada fase en paralelo
+  python main.py "Diseña una API REST" --async --max-concurrency 10
+
 Para más información: https://github.com/yoiber-bot/rsaChaikaCode
         """
     )
@@ -31,7 +90,8 @@ Para más información: https://github.com/yoiber-bot/rsaChaikaCode
     parser.add_argument(
         'prompt',
         type=str,
-        help='Prompt o problema a resolver'
+        nargs='?',
+        help='Prompt o problema a resolver (omitir con --batch)'
     )
     
     parser.add_argument(
@@ -69,6 +129,126 @@ Para más información: https://github.com/yoiber-bot/rsaChaikaCode
         help='Modelo a usar (default: gpt-4o, disponibles: gpt-4o, gpt-4o-mini, gpt-4-turbo)'
     )
     
+    parser.add_argument(
+        '--population-model',
+        type=str,
+        default=None,
+        metavar='MODELO',
+        help='Modelo para la población inicial, p. ej. uno rápido y barato (default: --model)'
+    )
+    
+    parser.add_argument(
+        '--aggregation-model',
+        type=str,
+        default=None,
+        metavar='MODELO',
+        help='Modelo para los loops de agregación y la consolidación final (default: --model)'
+    )
+    
+    parser.add_argument(
+        '--final-model',
+        type=str,
+        default=None,
+        metavar='MODELO',
+        help='Modelo solo para la consolidación final (default: --aggregation-model)'
+    )
+    
+    parser.add_argument(
+        '--model-limit',
+        action='append',
+        default=None,
+        metavar='MODELO=CONCURRENCIA[,RPM[,TPM]]',
+        help='Concurrencia y límites por minuto propios de un modelo; repetir por modelo '
+             '(default: --max-concurrency, --rpm y --tpm para cada modelo por separado)'
+    )
+    
+    parser.add_argument(
+        '--grouping',
+        type=str,
+        choices=['sequential', 'balanced'],
+        default='sequential',
+        help='Estrategia de agrupación: por posición o equilibrando tokens estimados (default: sequential)'
+    )
+    
+    parser.add_argument(
+        '--max-group-tokens',
+        type=int,
+        default=None,
+        help='Presupuesto de tokens de las soluciones de un grupo con --grouping balanced'
+    )
+    
+    parser.add_argument(
+        '--convergence-threshold',
+        type=float,
+        default=None,
+        help='Detiene los loops cuando la diversidad de la población (0-1) cae por debajo de este valor'
+    )
+    
+    parser.add_argument(
+        '--budget-seconds',
+        type=float,
+        default=None,
+        metavar='S',
+        help='Límite de tiempo por ejecución: omite loops y cancela llamadas para consolidar a tiempo'
+    )
+    
+    parser.add_argument(
+        '--budget-tokens',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Límite de tokens (prompt + respuesta) por ejecución'
+    )
+    
+    parser.add_argument(
+        '--budget-calls',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Límite de llamadas al modelo por ejecución (sin contar la caché local)'
+    )
+    
+    parser.add_argument(
+        '--schedule',
+        type=str,
+        choices=['shrink', 'constant', 'geometric'],
+        default='shrink',
+        help='Tamaño de la población por loop: shrink (divide entre --group-size), constant (N salidas '
+             'de subconjuntos aleatorios de K) o geometric (multiplica por --schedule-ratio) (default: shrink)'
+    )
+    
+    parser.add_argument(
+        '--schedule-sizes',
+        type=int,
+        nargs='+',
+        default=None,
+        metavar='N',
+        help='Tamaños explícitos de la población tras cada loop (uno por loop, reemplaza --schedule)'
+    )
+    
+    parser.add_argument(
+        '--schedule-ratio',
+        type=float,
+        default=0.5,
+        help='Factor por loop del schedule geometric (default: 0.5)'
+    )
+    
+    parser.add_argument(
+        '--dedup',
+        type=float,
+        nargs='?',
+        const=0.9,
+        default=None,
+        metavar='THRESHOLD',
+        help='Elimina respuestas iniciales duplicadas o casi idénticas (similitud Jaccard >= THRESHOLD, default: 0.9)'
+    )
+    
+    parser.add_argument(
+        '--dedup-top-up',
+        action='store_true',
+        help='Genera respuestas adicionales para reponer la población tras eliminar duplicados'
+    )
+    
     parser.add_argument(
         '--quiet',
         action='store_true',
@@ -81,9 +261,375 @@ Para más información: https://github.com/yoiber-bot/rsaChaikaCode
         help='API key de Google Gemini (opcional, se puede usar .env)'
     )
     
+    parser.add_argument(
+        '--base-url',
+        type=str,
+        default=GITHUB_MODELS_BASE_URL,
+        help='Endpoint compatible con OpenAI (default: GitHub Models)'
+    )
+    
+    parser.add_argument(
+        '--endpoint',
+        action='append',
+        default=None,
+        metavar='URL[,API_KEY]',
+        help='Reparte las llamadas entre varios endpoints o claves; repetir por cada uno. '
+             'Sin API_KEY usa --api-key o GITHUB_TOKEN (sustituye a --base-url)'
+    )
+    
+    parser.add_argument(
+        '--balance',
+        type=str,
+        choices=list(BALANCING_STRATEGIES),
+        default='least-outstanding',
+        help='Reparto entre endpoints: round-robin o least-outstanding (default: least-outstanding)'
+    )
+    
+    parser.add_argument(
+        '--prompt-layout',
+        type=str,
+        choices=['classic', 'shared-prefix'],
+        default='classic',
+        help='Disposición de los prompts de agregación: classic o shared-prefix '
+             '(instrucciones y problema como prefijo común cacheable por el proveedor)'
+    )
+    
+    parser.add_argument(
+        '--no-n-sampling',
+        dest='n_sampling',
+        action='store_false',
+        help='Pide cada respuesta de la población inicial por separado en lugar de usar n > 1'
+    )
+    
+    parser.add_argument(
+        '--max-n',
+        type=int,
+        default=8,
+        help='Máximo de respuestas por petición con n-sampling (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--stub',
+        action='store_true',
+        help='Usa un backend local determinista sin red ni API key (pruebas y demos)'
+    )
+    
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Ejecuta las llamadas de cada fase en paralelo (asyncio)'
+    )
+    
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        default=8,
+        help='Máximo de llamadas simultáneas en modo --async (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--dataflow',
+        action='store_true',
+        help='Envía cada grupo en cuanto terminan sus respuestas, sin esperar al loop completo (implica --async)'
+    )
+    
+    parser.add_argument(
+        '--hedge',
+        type=float,
+        nargs='?',
+        const=95.0,
+        default=None,
+        metavar='PERCENTIL',
+        help='Duplica las llamadas más lentas que el percentil PERCENTIL de latencia y usa la primera respuesta (default: 95; implica --async)'
+    )
+    
+    parser.add_argument(
+        '--population-extra',
+        type=int,
+        default=0,
+        metavar='M',
+        help='Pide N+M respuestas iniciales y se queda con las N primeras en llegar (implica --async)'
+    )
+    
+    parser.add_argument(
+        '--on-population-failure',
+        type=str,
+        choices=list(STAGE_ACTIONS['population']),
+        default='drop',
+        help='Si falla una respuesta inicial: drop (seguir sin ella) o fail (abortar) (default: drop)'
+    )
+    
+    parser.add_argument(
+        '--on-loop-failure',
+        type=str,
+        choices=list(STAGE_ACTIONS['loop']),
+        default='drop',
+        help='Si falla la agregación de un grupo: drop (descartarlo), reuse (usar una de sus respuestas), '
+             'regroup (agregar otro grupo aleatorio) o fail (abortar) (default: drop)'
+    )
+    
+    parser.add_argument(
+        '--on-final-failure',
+        type=str,
+        choices=list(STAGE_ACTIONS['final']),
+        default='fail',
+        help='Si falla la consolidación final: reuse (devolver la primera respuesta refinada), '
+             'regroup (consolidar un grupo aleatorio) o fail (abortar) (default: fail)'
+    )
+    
+    parser.add_argument(
+        '--min-survival',
+        type=float,
+        default=0.0,
+        metavar='FRACCION',
+        help='Fracción mínima de llamadas con éxito por fase; por debajo la ejecución falla (default: 0, al menos una)'
+    )
+    
+    parser.add_argument(
+        '--max-workers',
+        type=int,
+        default=1,
+        help='Hilos para agregar grupos en paralelo en modo síncrono (default: 1, serial)'
+    )
+    
+    parser.add_argument(
+        '--max-connections',
+        type=int,
+        default=None,
+        help='Conexiones HTTP del pool compartido (default: el mayor de --max-concurrency y --max-workers)'
+    )
+    
+    parser.add_argument(
+        '--keepalive',
+        type=float,
+        default=30.0,
+        help='Segundos que una conexión inactiva se mantiene abierta (default: 30)'
+    )
+    
+    parser.add_argument(
+        '--http-timeout',
+        type=float,
+        default=120.0,
+        help='Timeout de lectura por petición en segundos (default: 120)'
+    )
+    
+    parser.add_argument(
+        '--http2',
+        action='store_true',
+        help='Fuerza HTTP/2 (requiere el paquete h2; por defecto se usa si está instalado)'
+    )
+    
+    parser.add_argument(
+        '--rpm',
+        type=float,
+        default=None,
+        help='Límite de peticiones por minuto compartido por todas las llamadas (default: sin límite)'
+    )
+    
+    parser.add_argument(
+        '--tpm',
+        type=float,
+        default=None,
+        help='Límite de tokens estimados por minuto (default: sin límite)'
+    )
+    
+    parser.add_argument(
+        '--cache',
+        nargs='?',
+        const=DEFAULT_CACHE_PATH,
+        default=None,
+        metavar='PATH',
+        help=f'Activa la caché persistente de respuestas (default: {DEFAULT_CACHE_PATH})'
+    )
+    
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=168.0,
+        help='Horas de validez de las entradas en caché (default: 168)'
+    )
+    
+    parser.add_argument(
+        '--cache-max-mb',
+        type=float,
+        default=100.0,
+        help='Tamaño máximo de la caché en MB antes de desalojar LRU (default: 100)'
+    )
+    
+    parser.add_argument(
+        '--checkpoint',
+        type=str,
+        default=None,
+        metavar='PATH',
+        help=f'Guarda la población tras cada etapa (con --resume, default: {DEFAULT_CHECKPOINT_PATH})'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Reanuda desde la última etapa completada del checkpoint'
+    )
+    
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Muestra la solución final token a token mientras se genera'
+    )
+    
+    parser.add_argument(
+        '--anytime',
+        action='store_true',
+        help='Consolida y muestra una respuesta provisional tras cada etapa mientras el refinamiento continúa'
+    )
+    
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Devuelve la mejor respuesta disponible al cumplirse el plazo (implica --anytime)'
+    )
+    
+    parser.add_argument(
+        '--metrics-json',
+        type=str,
+        default=None,
+        metavar='PATH',
+        help='Exporta latencias, esperas, reintentos y tokens por llamada y por fase a un JSON'
+    )
+    
+    parser.add_argument(
+        '--events-jsonl',
+        type=str,
+        default=None,
+        metavar='PATH',
+        help='Añade cada evento (ejecución, etapa, llamada encolada/iniciada/reintentada/terminada) como una línea JSON'
+    )
+    
+    parser.add_argument(
+        '--log-events',
+        action='store_true',
+        help='Envía los eventos estructurados al logger "rsa" (stderr)'
+    )
+    
+    parser.add_argument(
+        '--progress',
+        action='store_true',
+        help='Muestra una barra de progreso de las llamadas en stderr (implica --quiet)'
+    )
+    
+    parser.add_argument(
+        '--batch',
+        type=str,
+        default=None,
+        metavar='INPUT.jsonl',
+        help='Procesa un archivo JSONL de prompts ({"id": ..., "prompt": ...} por línea)'
+    )
+    
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='results.jsonl',
+        metavar='OUTPUT.jsonl',
+        help='Archivo JSONL donde se añaden los resultados en modo --batch (default: results.jsonl)'
+    )
+    
+    parser.add_argument(
+        '--max-active-prompts',
+        type=int,
+        default=4,
+        help='Prompts procesándose a la vez en modo --batch (default: 4)'
+    )
+    
     args = parser.parse_args()
     
     # Validate parameters
+    if (args.prompt is None) == (args.batch is None):
+        print("❌ Error: indica un prompt o --batch INPUT.jsonl (no ambos)")
+        sys.exit(1)
+    
+    if args.batch and (args.resume or args.checkpoint or args.stream):
+        print("❌ Error: --batch no admite --resume, --checkpoint ni --stream")
+        sys.exit(1)
+    
+    budgeted = any(v is not None for v in (args.budget_seconds, args.budget_tokens, args.budget_calls))
+    if budgeted and args.batch:
+        print("❌ Error: --budget-seconds/--budget-tokens/--budget-calls no admiten --batch")
+        sys.exit(1)
+    
+    if args.budget_seconds is not None and args.budget_seconds <= 0:
+        print("❌ Error: --budget-seconds debe ser positivo")
+        sys.exit(1)
+    
+    if (args.budget_tokens is not None and args.budget_tokens < 1) or (args.budget_calls is not None and args.budget_calls < 2):
+        print("❌ Error: --budget-tokens debe ser al menos 1 y --budget-calls al menos 2")
+        sys.exit(1)
+    
+    if args.deadline is not None and args.deadline <= 0:
+        print("❌ Error: --deadline debe ser positivo")
+        sys.exit(1)
+    
+    anytime = args.anytime or args.deadline is not None
+    # These options only act on the async pipeline
+    concurrent = args.use_async or args.dataflow or args.hedge is not None or args.population_extra > 0
+    if anytime and (args.batch or args.stream):
+        print("❌ Error: --anytime/--deadline no admiten --batch ni --stream")
+        sys.exit(1)
+    
+    if args.max_group_tokens is not None and args.max_group_tokens < 1:
+        print("❌ Error: --max-group-tokens debe ser al menos 1")
+        sys.exit(1)
+    
+    if args.schedule_sizes is not None and (len(args.schedule_sizes) != args.loops or min(args.schedule_sizes) < 1):
+        print("❌ Error: --schedule-sizes necesita un tamaño >= 1 por cada loop")
+        sys.exit(1)
+    
+    if not (0.0 < args.schedule_ratio <= 1.0):
+        print("❌ Error: --schedule-ratio debe estar entre 0.0 (excluido) y 1.0")
+        sys.exit(1)
+    
+    if args.grouping != 'sequential' and (args.schedule != 'shrink' or args.schedule_sizes):
+        print("❌ Error: --grouping solo se aplica al schedule shrink")
+        sys.exit(1)
+    
+    if args.dedup is not None and not (0.0 < args.dedup <= 1.0):
+        print("❌ Error: --dedup debe estar entre 0.0 (excluido) y 1.0")
+        sys.exit(1)
+    
+    if args.convergence_threshold is not None and not (0.0 <= args.convergence_threshold <= 1.0):
+        print("❌ Error: --convergence-threshold debe estar entre 0.0 y 1.0")
+        sys.exit(1)
+    
+    if args.dataflow and (args.grouping != 'sequential' or args.convergence_threshold is not None or budgeted):
+        print("❌ Error: --dataflow no admite --grouping balanced, --convergence-threshold ni presupuestos")
+        sys.exit(1)
+    
+    if args.hedge is not None and not (0.0 < args.hedge <= 100.0):
+        print("❌ Error: --hedge debe estar entre 0 (excluido) y 100")
+        sys.exit(1)
+    
+    if not (0.0 <= args.min_survival <= 1.0):
+        print("❌ Error: --min-survival debe estar entre 0.0 y 1.0")
+        sys.exit(1)
+    
+    if args.dataflow and args.on_loop_failure == 'regroup':
+        print("❌ Error: --dataflow no admite --on-loop-failure regroup")
+        sys.exit(1)
+    
+    if args.population_extra < 0:
+        print("❌ Error: --population-extra no puede ser negativo")
+        sys.exit(1)
+    
+    spending_budget = args.budget_tokens is not None or args.budget_calls is not None
+    if spending_budget and (args.hedge is not None or args.population_extra > 0 or anytime):
+        print("❌ Error: --budget-tokens/--budget-calls no admiten --hedge, --population-extra, --anytime ni --deadline")
+        sys.exit(1)
+    
+    if args.max_active_prompts < 1:
+        print("❌ Error: --max-active-prompts debe ser al menos 1")
+        sys.exit(1)
+    
     if args.population < 2:
         print("❌ Error: --population debe ser al menos 2")
         sys.exit(1)
@@ -100,7 +646,141 @@ Para más información: https://github.com/yoiber-bot/rsaChaikaCode
         print("❌ Error: --temperature debe estar entre 0.0 y 2.0")
         sys.exit(1)
     
+    if args.max_concurrency < 1:
+        print("❌ Error: --max-concurrency debe ser al menos 1")
+        sys.exit(1)
+    
+    if args.max_workers < 1:
+        print("❌ Error: --max-workers debe ser al menos 1")
+        sys.exit(1)
+    
+    if args.max_n < 1:
+        print("❌ Error: --max-n debe ser al menos 1")
+        sys.exit(1)
+    
+    if (args.rpm is not None and args.rpm <= 0) or (args.tpm is not None and args.tpm <= 0):
+        print("❌ Error: --rpm y --tpm deben ser positivos")
+        sys.exit(1)
+    
+    if args.max_connections is not None and args.max_connections < 1:
+        print("❌ Error: --max-connections debe ser al menos 1")
+        sys.exit(1)
+    
+    if args.keepalive < 0 or args.http_timeout <= 0:
+        print("❌ Error: --keepalive no puede ser negativo y --http-timeout debe ser positivo")
+        sys.exit(1)
+    
+    if args.endpoint and args.stub:
+        print("❌ Error: --endpoint no admite --stub")
+        sys.exit(1)
+    
+    endpoints = []
+    for value in args.endpoint or []:
+        url, _, key = value.partition(',')
+        if not url.strip():
+            print(f"❌ Error: --endpoint sin URL: {value!r}")
+            sys.exit(1)
+        endpoints.append(Endpoint(
+            url.strip(),
+            api_key=key.strip() or args.api_key,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm
+        ))
+    
+    phase_models = {}
+    if args.population_model:
+        phase_models['population'] = args.population_model
+    if args.aggregation_model:
+        phase_models['loop'] = phase_models['final'] = args.aggregation_model
+    if args.final_model:
+        phase_models['final'] = args.final_model
+    
+    model_limits = {}
+    for value in args.model_limit or []:
+        model, _, fields = value.partition('=')
+        try:
+            numbers = [float(field) if field.strip() else None for field in fields.split(',')]
+            if not model.strip() or not fields or len(numbers) > 3 or any(n is not None and n <= 0 for n in numbers):
+                raise ValueError(value)
+            numbers += [None] * (3 - len(numbers))
+            model_limits[model.strip()] = ModelLimits(
+                max_concurrency=int(numbers[0]) if numbers[0] is not None else None,
+                requests_per_minute=numbers[1],
+                tokens_per_minute=numbers[2]
+            )
+        except ValueError:
+            print(f"❌ Error: --model-limit espera MODELO=CONCURRENCIA[,RPM[,TPM]] con valores positivos: {value!r}")
+            sys.exit(1)
+    
+    if args.http2 and not http2_available():
+        print("❌ Error: --http2 requiere el paquete h2 (pip install h2)")
+        sys.exit(1)
+    
     try:
+        cache = None
+        if args.cache:
+            cache = ResponseCache(
+                path=args.cache,
+                ttl_seconds=args.cache_ttl * 3600,
+                max_bytes=int(args.cache_max_mb * 1024 * 1024)
+            )
+        
+        events = EventBus()
+        if args.events_jsonl:
+            events.subscribe(JSONLSink(args.events_jsonl))
+        if args.log_events:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            logger = logging.getLogger("rsa")
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            events.subscribe(LoggingSink(logger))
+        if args.progress:
+            events.subscribe(ProgressSink())
+        
+        http_pool = HTTPPoolConfig(
+            max_connections=args.max_connections,
+            keepalive_expiry=args.keepalive,
+            timeout=args.http_timeout,
+            http2=True if args.http2 else None
+        )
+        
+        def pooled_backend(model):
+            # Limits, cache and connections are per endpoint; failover happens in the pool
+            limits = model_limits.get(model) or ModelLimits()
+            return PooledBackend.from_endpoints(
+                [
+                    Endpoint(
+                        endpoint.base_url,
+                        api_key=endpoint.api_key,
+                        requests_per_minute=limits.requests_per_minute or endpoint.requests_per_minute,
+                        tokens_per_minute=limits.tokens_per_minute or endpoint.tokens_per_minute
+                    )
+                    for endpoint in endpoints
+                ],
+                model_name=model,
+                max_concurrency=limits.max_concurrency or args.max_concurrency,
+                cache=cache,
+                use_n_sampling=args.n_sampling,
+                max_n=args.max_n,
+                http_pool=http_pool,
+                strategy=args.balance
+            )
+        
+        # Without a stub or endpoints the orchestrator builds one backend per model itself
+        make_backend = None
+        if args.stub:
+            make_backend = lambda model: LocalStubBackend(model_name=model)
+        elif endpoints:
+            make_backend = pooled_backend
+        
+        backend = None
+        if make_backend is not None:
+            if phase_models:
+                backend = TieredBackend.from_models(phase_models, args.model, make_backend)
+            else:
+                backend = make_backend(args.model)
+        
         # Initialize orchestrator
         orchestrator = RSAOrchestrator(
             api_key=args.api_key,
@@ -109,17 +789,97 @@ Para más información: https://github.com/yoiber-bot/rsaChaikaCode
             group_size=args.group_size,
             loops=args.loops,
             temperature=args.temperature,
-            verbose=not args.quiet
+            verbose=not (args.quiet or args.progress),
+            events=events,
+            max_concurrency=args.max_concurrency,
+            max_workers=args.max_workers,
+            # With --stub or --endpoint the limits live in the backend (per endpoint)
+            requests_per_minute=args.rpm if backend is None else None,
+            tokens_per_minute=args.tpm if backend is None else None,
+            cache=cache,
+            checkpoint_path=args.checkpoint or (DEFAULT_CHECKPOINT_PATH if args.resume else None),
+            grouping_strategy=args.grouping,
+            max_group_tokens=args.max_group_tokens,
+            convergence_threshold=args.convergence_threshold,
+            budget=RunBudget(
+                deadline=args.budget_seconds,
+                max_tokens=args.budget_tokens,
+                max_calls=args.budget_calls
+            ) if budgeted else None,
+            dataflow=args.dataflow,
+            hedge=HedgePolicy(percentile=args.hedge) if args.hedge is not None else None,
+            population_extra=args.population_extra,
+            failure_policy=FailurePolicy(
+                population=args.on_population_failure,
+                loop=args.on_loop_failure,
+                final=args.on_final_failure,
+                min_survival=args.min_survival
+            ),
+            dedup_threshold=args.dedup,
+            population_schedule=args.schedule_sizes or args.schedule,
+            schedule_ratio=args.schedule_ratio,
+            dedup_top_up=args.dedup_top_up,
+            base_url=args.base_url,
+            backend=backend,
+            phase_models=phase_models if backend is None else None,
+            model_limits=model_limits,
+            n_sampling=args.n_sampling,
+            max_n=args.max_n,
+            prompt_layout=args.prompt_layout,
+            http_pool=http_pool
         )
         
         # Run RSA pipeline
-        result = orchestrator.run(args.prompt)
+        if args.batch:
+            summary = run_batch(orchestrator, args.batch, args.output, args.max_active_prompts)
+            if args.metrics_json:
+                orchestrator.metrics.export_json(args.metrics_json)
+            if summary["failed"]:
+                sys.exit(1)
+            return
+        
+        if args.stream:
+            if concurrent:
+                RSAOrchestrator._run_in_new_loop(
+                    print_stream_async(orchestrator.run_stream_async(args.prompt, resume=args.resume))
+                )
+            else:
+                print_stream(orchestrator.run_stream(args.prompt, resume=args.resume))
+            if orchestrator.last_run_stats.get("budget_fallback"):
+                print("\n⏱️  Sin presupuesto para la consolidación final: se muestra la primera respuesta refinada")
+            if orchestrator.last_run_stats.get("final_truncated"):
+                print("\n⏱️  Plazo agotado: la consolidación final transmitida quedó incompleta")
+            if args.metrics_json:
+                orchestrator.export_metrics(args.metrics_json)
+            return
+        
+        if anytime:
+            result = orchestrator.run_anytime(
+                args.prompt,
+                deadline=args.deadline,
+                on_answer=None if args.quiet else partial(print_provisional, loops=args.loops),
+                resume=args.resume
+            )
+        elif concurrent:
+            result = orchestrator.run_concurrent(args.prompt, resume=args.resume)
+        else:
+            result = orchestrator.run(args.prompt, resume=args.resume)
+        
+        if args.metrics_json:
+            orchestrator.export_metrics(args.metrics_json)
         
         # Print result
-        print("\n" + "="*60)
-        print("📌 SOLUCIÓN FINAL")
-        print("="*60 + "\n")
+        print_result_header()
         print(result)
+        if orchestrator.last_run_stats.get("converged_at_loop") is not None:
+            print(f"\n⚡ Convergió tras la etapa {orchestrator.last_run_stats['converged_at_loop']} de {args.loops}")
+        budget_stop = orchestrator.last_run_stats.get("budget_stop")
+        if budget_stop:
+            print(f"\n⏱️  Presupuesto agotado: loops completados {orchestrator.last_run_stats['loops_completed']} de {args.loops}")
+        if orchestrator.last_run_stats.get("budget_fallback"):
+            print("\n⏱️  Sin presupuesto para la consolidación final: se muestra la primera respuesta refinada")
+        if orchestrator.last_run_stats.get("deadline_hit"):
+            print(f"\n⏰ Plazo de {args.deadline:g}s agotado; se muestra la respuesta de la etapa {orchestrator.last_run_stats['anytime_answers'][-1]['stage']}")
         print("\n" + "="*60 + "\n")
         
     except ValueError as e:
@@ -2,14 +2,57 @@
 Package initialization for RSA System
 """
 
-from src.gemini_client import OpenAIClient
-from src.aggregation import create_groups, create_aggregation_prompt, create_final_aggregation_prompt
+from src.gemini_client import OpenAIClient, AsyncOpenAIClient
+from src.aggregation import (
+    create_groups,
+    create_aggregation_prompt,
+    create_final_aggregation_prompt,
+    create_aggregation_messages,
+    create_final_aggregation_messages,
+)
+from src.rate_limiter import RateLimiter
+from src.response_cache import ResponseCache
+from src.metrics import MetricsCollector
+from src.budget import RunBudget, BudgetExceeded
+from src.events import EventBus, LoggingSink, JSONLSink, ProgressSink
+from src.hedging import HedgePolicy
+from src.degradation import FailurePolicy, StageFailed
+from src.http_pool import HTTPPoolConfig
+from src.circuit_breaker import CircuitBreaker
+from src.backends import LLMBackend, OpenAICompatibleBackend, GitHubModelsBackend, LocalStubBackend
+from src.endpoint_pool import Endpoint, PooledBackend
+from src.tiering import ModelLimits, TieredBackend
 from src.rsa_orchestrator import RSAOrchestrator
 
 __all__ = [
     'OpenAIClient',
+    'AsyncOpenAIClient',
     'RSAOrchestrator',
+    'RateLimiter',
+    'ResponseCache',
+    'MetricsCollector',
+    'RunBudget',
+    'BudgetExceeded',
+    'EventBus',
+    'LoggingSink',
+    'JSONLSink',
+    'ProgressSink',
+    'HedgePolicy',
+    'FailurePolicy',
+    'StageFailed',
+    'HTTPPoolConfig',
+    'LLMBackend',
+    'OpenAICompatibleBackend',
+    'GitHubModelsBackend',
+    'LocalStubBackend',
+    'CircuitBreaker',
+    'Endpoint',
+    'PooledBackend',
+    'ModelLimits',
+    'TieredBackend',
     'create_groups',
     'create_aggregation_prompt',
     'create_final_aggregation_prompt',
+    'create_aggregation_messages',
+    'create_final_aggregation_messages',
 ]
@@ -3,20 +3,79 @@ Aggregation Module
 Handles grouping and aggregation of responses using RSA technique
 """
 
-from typing import List
+import random
+from typing import List, Optional, Sequence, Tuple, Union
 
 
-def create_groups(responses: List[str], group_size: int) -> List[List[str]]:
+GROUPING_STRATEGIES = ("sequential", "balanced")
+PROMPT_LAYOUTS = ("classic", "shared-prefix")
+POPULATION_SCHEDULES = ("shrink", "constant", "geometric")
+TRUNCATION_MARKER = "\n[... contenido truncado ...]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a text (~4 characters per token)
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Estimated token count
+    """
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shorten a text to roughly max_tokens, keeping its beginning and end
+    
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget for the result
+        
+    Returns:
+        The original text if it fits, otherwise head + marker + tail
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    keep_chars = max(0, max_tokens * 4 - len(TRUNCATION_MARKER))
+    head = keep_chars // 2
+    tail = keep_chars - head
+    return text[:head] + TRUNCATION_MARKER + (text[-tail:] if tail else "")
+
+
+def create_groups(
+    responses: List[str],
+    group_size: int,
+    strategy: str = "sequential",
+    max_group_tokens: Optional[int] = None
+) -> List[List[str]]:
     """
     Divide responses into groups of specified size
     
+    The "sequential" strategy slices responses by position. The "balanced"
+    strategy spreads members so every group carries a similar estimated token
+    count (longest-first onto the lightest group), opening extra groups when
+    max_group_tokens would be exceeded. Members longer than half of
+    max_group_tokens are truncated so they can share a group with another one.
+    
     Args:
         responses: List of response strings
         group_size: Size of each group
+        strategy: "sequential" or "balanced"
+        max_group_tokens: Per-call token budget for the members of a group (balanced only)
         
     Returns:
         List of groups, where each group is a list of responses
     """
+    if strategy not in GROUPING_STRATEGIES:
+        raise ValueError(f"Unknown grouping strategy '{strategy}', expected one of {GROUPING_STRATEGIES}")
+    
+    if strategy == "balanced":
+        return _create_balanced_groups(responses, group_size, max_group_tokens)
+    
     groups = []
     
     for i in range(0, len(responses), group_size):
@@ -26,6 +85,162 @@ def create_groups(responses: List[str], group_size: int) -> List[List[str]]:
     return groups
 
 
+def _create_balanced_groups(
+    responses: List[str],
+    group_size: int,
+    max_group_tokens: Optional[int]
+) -> List[List[str]]:
+    """Token-balanced grouping used by create_groups(strategy="balanced")"""
+    if not responses:
+        return []
+    
+    if max_group_tokens:
+        responses = [truncate_to_tokens(r, max_group_tokens // 2) for r in responses]
+    
+    sizes = [estimate_tokens(r) for r in responses]
+    num_groups = (len(responses) + group_size - 1) // group_size
+    if max_group_tokens:
+        num_groups = max(num_groups, (sum(sizes) + max_group_tokens - 1) // max_group_tokens)
+    
+    members: List[List[int]] = [[] for _ in range(num_groups)]
+    loads = [0] * num_groups
+    
+    for index in sorted(range(len(responses)), key=lambda i: sizes[i], reverse=True):
+        candidates = [g for g in range(len(members)) if len(members[g]) < group_size]
+        if max_group_tokens:
+            fitting = [g for g in candidates if loads[g] + sizes[index] <= max_group_tokens]
+            if not fitting:
+                members.append([])
+                loads.append(0)
+                fitting = [len(members) - 1]
+            candidates = fitting
+        target = min(candidates, key=lambda g: loads[g])
+        members[target].append(index)
+        loads[target] += sizes[index]
+    
+    # Keep the original relative order inside each group
+    return [[responses[i] for i in sorted(group)] for group in members if group]
+
+
+def schedule_sizes(
+    schedule: Union[str, Sequence[int]],
+    population_size: int,
+    loops: int,
+    ratio: float = 0.5
+) -> Optional[List[int]]:
+    """
+    Population size to produce in each loop for a population schedule
+    
+    "shrink" partitions the population into groups, so each loop divides it by
+    group_size and no target is needed. "constant" keeps population_size
+    outputs per loop, "geometric" multiplies the size by ratio each loop, and a
+    list gives explicit per-loop sizes.
+    
+    Args:
+        schedule: "shrink", "constant", "geometric" or a list of sizes (one per loop)
+        population_size: Initial population size
+        loops: Number of loops
+        ratio: Shrink factor per loop for "geometric"
+        
+    Returns:
+        List of target sizes, one per loop, or None for "shrink"
+    """
+    if isinstance(schedule, str):
+        if schedule not in POPULATION_SCHEDULES:
+            raise ValueError(f"Unknown population schedule '{schedule}', expected one of {POPULATION_SCHEDULES} or a list of sizes")
+        if schedule == "shrink":
+            return None
+        if schedule == "constant":
+            return [population_size] * loops
+        if not (0.0 < ratio <= 1.0):
+            raise ValueError("ratio must be in (0, 1]")
+        return [max(1, round(population_size * ratio ** loop)) for loop in range(1, loops + 1)]
+    
+    sizes = list(schedule)
+    if len(sizes) != loops:
+        raise ValueError(f"Custom schedule has {len(sizes)} sizes but there are {loops} loops")
+    if any(size < 1 for size in sizes):
+        raise ValueError("Every size in a custom schedule must be at least 1")
+    return sizes
+
+
+def create_subset_groups(
+    responses: List[str],
+    group_size: int,
+    count: int,
+    rng: Optional[random.Random] = None
+) -> List[List[str]]:
+    """
+    Build count groups, each a random subset of group_size distinct responses
+    
+    Members are drawn from a reshuffled deck so every response is used about
+    equally often (count * group_size / len(responses) times) instead of
+    leaving some out by chance.
+    
+    Args:
+        responses: Current population
+        group_size: Members per group (capped at the population size)
+        count: Number of groups, i.e. size of the next population
+        rng: Random generator (pass a seeded one for reproducible groups)
+        
+    Returns:
+        List of count groups, members in their population order
+    """
+    rng = rng or random.Random()
+    size = min(group_size, len(responses))
+    deck: List[int] = []
+    groups = []
+    
+    for _ in range(count):
+        members: List[int] = []
+        while len(members) < size:
+            if all(i in members for i in deck):
+                # Put a freshly shuffled deck underneath the leftovers
+                fresh = list(range(len(responses)))
+                rng.shuffle(fresh)
+                deck = fresh + deck
+            # Skip members already in this group; they go back to the bottom of the deck
+            candidate = deck.pop()
+            if candidate in members:
+                deck.insert(0, candidate)
+                continue
+            members.append(candidate)
+        groups.append([responses[i] for i in sorted(members)])
+    
+    return groups
+
+
+AGGREGATION_TASK = """1. Analiza cada solución cuidadosamente
+2. Identifica las partes correctas de cada una
+3. Detecta errores, inconsistencias o contradicciones
+4. Combina lo mejor de todas las soluciones
+5. Produce UNA solución superior que sea:
+   - Más correcta que cualquiera de las individuales
+   - Más coherente y completa
+   - Sin errores ni contradicciones
+   - Optimizada y bien estructurada
+
+Proporciona ÚNICAMENTE la solución mejorada, sin explicaciones sobre el proceso de agregación.
+"""
+
+FINAL_AGGREGATION_TASK = """De todas estas soluciones refinadas, produce la MEJOR VERSIÓN FINAL que sea:
+- Completamente corregida y sin errores
+- Optimizada al máximo
+- La más clara y coherente posible
+- La más completa y robusta
+
+Esta es la respuesta definitiva que se entregará al usuario. Hazla perfecta.
+"""
+
+
+def _format_solutions(responses: List[str], label: str) -> str:
+    """Render the numbered solution blocks of an aggregation prompt"""
+    return "".join(
+        f"\n{'='*60}\n{label} {i}:\n{'='*60}\n{response}\n"
+        for i, response in enumerate(responses, 1)
+    )
+
+
 def create_aggregation_prompt(responses: List[str], original_prompt: str) -> str:
     """
     Create a prompt for aggregating multiple responses
@@ -48,26 +263,14 @@ SOLUCIONES A ANALIZAR:
 
 """
     
-    for i, response in enumerate(responses, 1):
-        prompt += f"\n{'='*60}\nSOLUCIÓN {i}:\n{'='*60}\n{response}\n"
+    prompt += _format_solutions(responses, "SOLUCIÓN")
     
     prompt += f"""
 
 {'='*60}
 TU TAREA:
 
-1. Analiza cada solución cuidadosamente
-2. Identifica las partes correctas de cada una
-3. Detecta errores, inconsistencias o contradicciones
-4. Combina lo mejor de todas las soluciones
-5. Produce UNA solución superior que sea:
-   - Más correcta que cualquiera de las individuales
-   - Más coherente y completa
-   - Sin errores ni contradicciones
-   - Optimizada y bien estructurada
-
-Proporciona ÚNICAMENTE la solución mejorada, sin explicaciones sobre el proceso de agregación.
-"""
+{AGGREGATION_TASK}"""
     
     return prompt
 
@@ -94,21 +297,63 @@ SOLUCIONES REFINADAS (después de múltiples iteraciones):
 
 """
     
-    for i, response in enumerate(responses, 1):
-        prompt += f"\n{'='*60}\nSOLUCIÓN REFINADA {i}:\n{'='*60}\n{response}\n"
+    prompt += _format_solutions(responses, "SOLUCIÓN REFINADA")
     
     prompt += f"""
 
 {'='*60}
 TAREA FINAL:
 
-De todas estas soluciones refinadas, produce la MEJOR VERSIÓN FINAL que sea:
-- Completamente corregida y sin errores
-- Optimizada al máximo
-- La más clara y coherente posible
-- La más completa y robusta
+{FINAL_AGGREGATION_TASK}"""
+    
+    return prompt
 
-Esta es la respuesta definitiva que se entregará al usuario. Hazla perfecta.
+
+def create_aggregation_messages(responses: List[str], original_prompt: str) -> Tuple[str, str]:
+    """
+    Shared-prefix layout of the aggregation prompt
+    
+    The fixed instructions and the problem go in the system message and the
+    solutions last, so every aggregation call for the same problem starts
+    with an identical prefix that providers can serve from their prompt cache.
+    
+    Args:
+        responses: List of responses to aggregate
+        original_prompt: The original user prompt
+        
+    Returns:
+        Tuple (system message, user message)
+    """
+    system = f"""Recibirás varias soluciones diferentes a un problema y debes combinarlas.
+
+TU TAREA:
+
+{AGGREGATION_TASK}
+PROBLEMA ORIGINAL:
+{original_prompt}
 """
+    user = "SOLUCIONES A ANALIZAR:\n" + _format_solutions(responses, "SOLUCIÓN")
+    return system, user
+
+
+def create_final_aggregation_messages(responses: List[str], original_prompt: str) -> Tuple[str, str]:
+    """
+    Shared-prefix layout of the final consolidation prompt
     
-    return prompt
+    Args:
+        responses: List of final refined responses
+        original_prompt: The original user prompt
+        
+    Returns:
+        Tuple (system message, user message)
+    """
+    system = f"""Has completado múltiples rondas de refinamiento para un problema.
+
+TAREA FINAL:
+
+{FINAL_AGGREGATION_TASK}
+PROBLEMA ORIGINAL:
+{original_prompt}
+"""
+    user = "SOLUCIONES REFINADAS (después de múltiples iteraciones):\n" + _format_solutions(responses, "SOLUCIÓN REFINADA")
+    return system, user
@@ -0,0 +1,338 @@
+"""
+Backends Module
+Pluggable LLM backend interface used by RSAOrchestrator, with implementations
+for GitHub Models, any OpenAI-compatible endpoint and a deterministic local stub
+"""
+
+import time
+import asyncio
+import hashlib
+import random
+import threading
+from typing import AsyncIterator, Iterator, List, Optional, Protocol, runtime_checkable
+
+from src.gemini_client import OpenAIClient, AsyncOpenAIClient, GITHUB_MODELS_BASE_URL
+from src.rate_limiter import RateLimiter
+from src.response_cache import ResponseCache
+from src.metrics import MetricsCollector
+from src.events import EventBus, next_call_id
+from src.http_pool import HTTPPoolConfig
+
+
+@runtime_checkable
+class LLMBackend(Protocol):
+    """
+    Interface the orchestrator needs from a model provider
+    
+    Every method takes the RSA phase ("population", "loop N", "final") so
+    backends can attribute metrics; sample_index distinguishes repeated
+    samples of the same prompt. The optional system message is sent before
+    the prompt (shared-prefix layout).
+    """
+    
+    model_name: str
+    metrics: Optional[MetricsCollector]
+    events: Optional[EventBus]
+    
+    def generate(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                 system: Optional[str] = None) -> str:
+        """Generate one response"""
+        ...
+    
+    def generate_n(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        """Generate count independent responses to the same prompt"""
+        ...
+    
+    def stream(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+               system: Optional[str] = None) -> Iterator[str]:
+        """Stream one response as text chunks"""
+        ...
+    
+    async def generate_async(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                             system: Optional[str] = None) -> str:
+        """Async counterpart of generate"""
+        ...
+    
+    async def generate_n_async(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        """Async counterpart of generate_n (all samples in flight at once)"""
+        ...
+    
+    def stream_async(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+                     system: Optional[str] = None) -> AsyncIterator[str]:
+        """Async counterpart of stream"""
+        ...
+
+
+class OpenAICompatibleBackend:
+    """Backend for any OpenAI-compatible chat completions endpoint"""
+    
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        model_name: str = "gpt-4o",
+        max_concurrency: int = 8,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[MetricsCollector] = None,
+        request_delay: float = 1.0,
+        use_n_sampling: bool = True,
+        max_n: int = 8,
+        http_pool: Optional[HTTPPoolConfig] = None,
+        events: Optional[EventBus] = None,
+        max_retries: int = 5,
+        retry_delay: float = 5.0
+    ):
+        """
+        Initialize the sync and async clients for an endpoint
+        
+        Args:
+            base_url: Endpoint base URL (e.g. http://localhost:8000/v1)
+            api_key: API key / token. If None, GITHUB_TOKEN is loaded from .env
+            model_name: Model to request
+            max_concurrency: Maximum number of async requests in flight at once
+            rate_limiter: Optional limiter shared by every request
+            cache: Optional persistent response cache
+            metrics: Optional collector that records every call
+            request_delay: Pause between sequential population requests without a rate limiter
+            use_n_sampling: Request the population with n > 1 in a single call when supported
+            max_n: Largest n requested in one call
+            http_pool: Connection pool settings (default: pool sized to max_concurrency)
+            events: Optional bus that receives the events of every call
+            max_retries: Attempts per request before the call fails
+            retry_delay: Base delay between attempts in seconds
+        """
+        self.base_url = base_url
+        self.model_name = model_name
+        self.request_delay = request_delay
+        self.use_n_sampling = use_n_sampling
+        http_pool = (http_pool or HTTPPoolConfig()).sized_for(max_concurrency)
+        self.client = OpenAIClient(
+            api_key=api_key,
+            model_name=model_name,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            metrics=metrics,
+            base_url=base_url,
+            max_n=max_n,
+            http_pool=http_pool,
+            events=events,
+            max_retries=max_retries,
+            retry_delay=retry_delay
+        )
+        self.async_client = AsyncOpenAIClient(
+            api_key=api_key,
+            model_name=model_name,
+            max_concurrency=max_concurrency,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            metrics=metrics,
+            base_url=base_url,
+            max_n=max_n,
+            http_pool=http_pool,
+            events=events,
+            max_retries=max_retries,
+            retry_delay=retry_delay
+        )
+    
+    @property
+    def metrics(self) -> Optional[MetricsCollector]:
+        """Metrics collector shared by both clients"""
+        return self.client.metrics
+    
+    @metrics.setter
+    def metrics(self, collector: Optional[MetricsCollector]):
+        self.client.metrics = collector
+        self.async_client.metrics = collector
+    
+    @property
+    def events(self) -> Optional[EventBus]:
+        """Event bus shared by both clients"""
+        return self.client.events
+    
+    @events.setter
+    def events(self, bus: Optional[EventBus]):
+        self.client.events = bus
+        self.async_client.events = bus
+    
+    def generate(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                 system: Optional[str] = None) -> str:
+        return self.client.generate_response(prompt, temperature, sample_index=sample_index, phase=phase, system=system)
+    
+    def generate_n(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        if self.use_n_sampling:
+            return self.client.generate_n_responses(
+                prompt, count, temperature, delay=self.request_delay, phase=phase
+            )
+        return self.client.generate_multiple_responses(
+            prompt, count, temperature, delay=self.request_delay, phase=phase
+        )
+    
+    def stream(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+               system: Optional[str] = None) -> Iterator[str]:
+        return self.client.stream_response(prompt, temperature, phase=phase, system=system)
+    
+    async def generate_async(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                             system: Optional[str] = None) -> str:
+        return await self.async_client.generate_response(
+            prompt, temperature, sample_index=sample_index, phase=phase, system=system
+        )
+    
+    async def generate_n_async(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        if self.use_n_sampling:
+            return await self.async_client.generate_n_responses(prompt, count, temperature, phase=phase)
+        return await self.async_client.generate_multiple_responses(prompt, count, temperature, phase=phase)
+    
+    def stream_async(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+                     system: Optional[str] = None) -> AsyncIterator[str]:
+        return self.async_client.stream_response(prompt, temperature, phase=phase, system=system)
+
+
+class GitHubModelsBackend(OpenAICompatibleBackend):
+    """Backend for the GitHub Models endpoint (the default)"""
+    
+    def __init__(self, api_key: Optional[str] = None, model_name: str = "gpt-4o", **kwargs):
+        """
+        Initialize a backend pointing at GitHub Models
+        
+        Args:
+            api_key: GitHub Personal Access Token. If None, will load from .env
+            model_name: Model to request
+            **kwargs: Any other OpenAICompatibleBackend option
+        """
+        super().__init__(GITHUB_MODELS_BASE_URL, api_key=api_key, model_name=model_name, **kwargs)
+
+
+_STUB_VOCABULARY = (
+    "solución algoritmo función caso valor índice lista resultado paso "
+    "condición error prueba orden mitad límite entrada salida estructura"
+).split()
+
+
+class LocalStubBackend:
+    """
+    Deterministic in-process backend for tests, demos and dry runs
+    
+    Responses are derived from a hash of (prompt, temperature, sample_index,
+    seed), so reruns are reproducible and distinct samples stay distinct.
+    No network access or API key is needed.
+    """
+    
+    def __init__(
+        self,
+        model_name: str = "local-stub",
+        latency: float = 0.0,
+        words: int = 40,
+        seed: int = 0,
+        metrics: Optional[MetricsCollector] = None,
+        events: Optional[EventBus] = None
+    ):
+        """
+        Initialize the stub
+        
+        Args:
+            model_name: Name reported in metrics
+            latency: Simulated seconds per call
+            words: Words per generated response
+            seed: Seed mixed into every response
+            metrics: Optional collector that records every call
+            events: Optional bus that receives the events of every call
+        """
+        self.model_name = model_name
+        self.latency = latency
+        self.words = words
+        self.seed = seed
+        self.metrics = metrics
+        self.events = events
+        self.call_count = 0
+        self._lock = threading.Lock()
+    
+    def _respond(self, prompt: str, temperature: float, sample_index: int) -> str:
+        """Build the deterministic response text for a request (prompt includes any system message)"""
+        key = f"{self.seed}\x00{temperature:.4f}\x00{sample_index}\x00{prompt}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        rng = random.Random(digest)
+        body = " ".join(rng.choice(_STUB_VOCABULARY) for _ in range(self.words))
+        return f"[stub {digest[:8]}] {body}"
+    
+    def _latency(self, phase: str, sample_index: int) -> float:
+        """Simulated seconds of one call (override to model slow calls)"""
+        return self.latency
+    
+    def _start(self, phase: str) -> Optional[int]:
+        """Announce a call (stub calls never wait), returning its id (None without sinks)"""
+        if self.events is None or not self.events.active:
+            return None
+        call_id = next_call_id()
+        self.events.emit("call_queued", call_id=call_id, phase=phase, model=self.model_name, n=1)
+        self.events.emit("call_started", call_id=call_id, phase=phase, model=self.model_name, attempt=1, waited=0.0)
+        return call_id
+    
+    def _record(self, phase: str, prompt: str, response: Optional[str], started: float, call_id: Optional[int] = None):
+        """Count the call and record it in metrics and events (response None = cancelled)"""
+        with self._lock:
+            self.call_count += 1
+        finished = {
+            "phase": phase,
+            "wall_time": time.perf_counter() - started,
+            "prompt_tokens": len(prompt) // 4 + 1,
+            "completion_tokens": len(response) // 4 + 1 if response is not None else 0,
+            "cancelled": response is None,
+        }
+        if self.metrics is not None:
+            self.metrics.record(model=self.model_name, **finished)
+        if self.events is not None and self.events.active:
+            self.events.emit(
+                "call_finished", call_id=call_id, model=self.model_name, wait_time=0.0, retries=0,
+                cache_hit=False, error=None, **finished
+            )
+    
+    def generate(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                 system: Optional[str] = None) -> str:
+        started = time.perf_counter()
+        call_id = self._start(phase)
+        latency = self._latency(phase, sample_index)
+        if latency:
+            time.sleep(latency)
+        if system:
+            prompt = f"{system}\x00{prompt}"
+        response = self._respond(prompt, temperature, sample_index)
+        self._record(phase, prompt, response, started, call_id)
+        return response
+    
+    def generate_n(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        return [self.generate(prompt, temperature, sample_index=i, phase=phase) for i in range(count)]
+    
+    def stream(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+               system: Optional[str] = None) -> Iterator[str]:
+        response = self.generate(prompt, temperature, phase=phase, system=system)
+        for i, word in enumerate(response.split(" ")):
+            yield word if i == 0 else " " + word
+    
+    async def generate_async(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                             system: Optional[str] = None) -> str:
+        started = time.perf_counter()
+        call_id = self._start(phase)
+        latency = self._latency(phase, sample_index)
+        if latency:
+            try:
+                await asyncio.sleep(latency)
+            except asyncio.CancelledError:
+                self._record(phase, prompt, None, started, call_id)
+                raise
+        if system:
+            prompt = f"{system}\x00{prompt}"
+        response = self._respond(prompt, temperature, sample_index)
+        self._record(phase, prompt, response, started, call_id)
+        return response
+    
+    async def generate_n_async(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        return list(await asyncio.gather(*(
+            self.generate_async(prompt, temperature, sample_index=i, phase=phase) for i in range(count)
+        )))
+    
+    async def stream_async(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+                           system: Optional[str] = None) -> AsyncIterator[str]:
+        response = await self.generate_async(prompt, temperature, phase=phase, system=system)
+        for i, word in enumerate(response.split(" ")):
+            yield word if i == 0 else " " + word
@@ -0,0 +1,143 @@
+"""
+Batch Module
+Runs the RSA pipeline over a JSONL file of prompts with pipelined execution
+"""
+
+import os
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Set
+
+
+def load_prompts(input_path: str) -> List[Dict[str, Any]]:
+    """
+    Read prompts from a JSONL file
+    
+    Each line is either an object with a "prompt" key (and optional "id")
+    or a bare JSON string. Lines without an id get their line number.
+    
+    Args:
+        input_path: Path of the JSONL input file
+        
+    Returns:
+        List of {"id", "prompt"} items
+    """
+    items = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if isinstance(data, str):
+                data = {"prompt": data}
+            if "prompt" not in data:
+                raise ValueError(f"Line {line_num} of {input_path} has no 'prompt' field")
+            items.append({"id": data.get("id", line_num), "prompt": data["prompt"]})
+    return items
+
+
+def load_completed_ids(output_path: str) -> Set[Any]:
+    """
+    Collect ids already answered successfully in an existing output file
+    
+    Args:
+        output_path: Path of the JSONL results file
+        
+    Returns:
+        Set of ids to skip
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("error") is None and "id" in record:
+                done.add(record["id"])
+    return done
+
+
+async def run_batch_async(
+    orchestrator,
+    input_path: str,
+    output_path: str,
+    max_active_prompts: int = 4
+) -> Dict[str, int]:
+    """
+    Run every prompt of a JSONL file through the orchestrator concurrently
+    
+    Several prompts are in flight at once, so one prompt's aggregation calls
+    overlap with another's population generation. All of them share the
+    orchestrator's async client, whose max_concurrency is the global cap on
+    in-flight requests, while each prompt runs on its own fork of the
+    orchestrator so their run statistics stay apart. Results, with the
+    prompt's call and token totals, are appended to output_path as soon as
+    each prompt finishes; prompts already answered there are skipped.
+    
+    Args:
+        orchestrator: Configured RSAOrchestrator
+        input_path: JSONL file with the prompts
+        output_path: JSONL file where results are appended
+        max_active_prompts: Maximum number of prompts being processed at once
+        
+    Returns:
+        Summary with completed, failed and skipped counts
+    """
+    if max_active_prompts < 1:
+        raise ValueError("max_active_prompts must be at least 1")
+    
+    items = load_prompts(input_path)
+    done = load_completed_ids(output_path)
+    pending = [item for item in items if item["id"] not in done]
+    summary = {"completed": 0, "failed": 0, "skipped": len(items) - len(pending)}
+    
+    orchestrator._log(f"📦 Batch: {len(pending)} prompts pendientes ({summary['skipped']} ya completados)")
+    
+    semaphore = asyncio.Semaphore(max_active_prompts)
+    
+    with open(output_path, "a", encoding="utf-8") as out:
+        async def process(item: Dict[str, Any]):
+            async with semaphore:
+                start = time.monotonic()
+                record = {"id": item["id"], "prompt": item["prompt"], "result": None, "error": None}
+                runner = orchestrator.fork()
+                try:
+                    record["result"] = await runner.run_async(item["prompt"])
+                    record["metrics"] = runner.last_run_stats["metrics"]["totals"]
+                    summary["completed"] += 1
+                    orchestrator._log(f"   ✓ Prompt {item['id']} completado")
+                except Exception as e:
+                    record["error"] = str(e)
+                    summary["failed"] += 1
+                    orchestrator._log(f"   ✗ Prompt {item['id']} falló: {e}")
+                record["elapsed_seconds"] = round(time.monotonic() - start, 3)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+        
+        await asyncio.gather(*(process(item) for item in pending))
+    
+    orchestrator._log(f"✅ Batch terminado: {summary['completed']} completados, {summary['failed']} fallidos, {summary['skipped']} omitidos")
+    return summary
+
+
+def run_batch(
+    orchestrator,
+    input_path: str,
+    output_path: str,
+    max_active_prompts: int = 4
+) -> Dict[str, int]:
+    """
+    Synchronous wrapper around run_batch_async
+    
+    The batch gets its own event loop, whose pooled connections are closed
+    when it ends.
+    """
+    return orchestrator._run_in_new_loop(
+        run_batch_async(orchestrator, input_path, output_path, max_active_prompts)
+    )
@@ -0,0 +1,153 @@
+"""
+Budget Module
+Per-run wall-clock, token and call limits for the RSA pipeline
+"""
+
+import time
+from typing import Optional
+
+
+class BudgetExceeded(Exception):
+    """Raised when a run's budget runs out before any usable answer exists, or a stage is cut short"""
+    
+    def __init__(self, message: str, reason: Optional[str] = None):
+        super().__init__(message)
+        # "deadline", "tokens" or "calls" when a limit cut a stage short
+        self.reason = reason
+
+
+class RunBudget:
+    """
+    Limits for a single RSA run, enforced between and during stages
+    
+    The initial population is shrunk to the samples the token and call
+    limits can pay for next to the final aggregation. Before every loop the
+    orchestrator projects the cost of that loop plus the final aggregation;
+    if it would not fit, the remaining loops are skipped and the run goes
+    straight to the final aggregation, which is itself skipped (answering
+    with the first refined solution) when it no longer fits. A stage still
+    running when only the final reserve of time or tokens is left is
+    cancelled. Token and call limits count provider usage, so local cache
+    hits are free; token costs are projected from the completions seen so
+    far, so a completion far longer than those can still overshoot.
+    """
+    
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        max_calls: Optional[int] = None,
+        final_reserve: Optional[float] = None,
+        completion_estimate: int = 256
+    ):
+        """
+        Initialize the limits
+        
+        Args:
+            deadline: Wall-clock seconds per run (None = unlimited)
+            max_tokens: Prompt plus completion tokens per run (None = unlimited)
+            max_calls: Model calls per run, local cache hits excluded (None = unlimited)
+            final_reserve: Seconds kept for the final aggregation (None = twice the
+                longest stage so far, or half the deadline before any stage ends)
+            completion_estimate: Completion tokens assumed per call until the run has
+                measured some (sizes the initial population under max_tokens)
+        """
+        if deadline is not None and deadline <= 0:
+            raise ValueError("deadline must be positive")
+        if max_tokens is not None and max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        if max_calls is not None and max_calls < 2:
+            raise ValueError("max_calls must be at least 2 (population and final aggregation)")
+        if final_reserve is not None and final_reserve < 0:
+            raise ValueError("final_reserve cannot be negative")
+        if completion_estimate < 1:
+            raise ValueError("completion_estimate must be at least 1")
+        
+        self.deadline = deadline
+        self.max_tokens = max_tokens
+        self.max_calls = max_calls
+        self.final_reserve = final_reserve
+        self.completion_estimate = completion_estimate
+        self.start()
+    
+    def start(self):
+        """Restart the clock and forget stage timings (called at the start of every run)"""
+        self._started = time.monotonic()
+        self._longest_stage = 0.0
+    
+    def elapsed(self) -> float:
+        """Seconds since the run started"""
+        return time.monotonic() - self._started
+    
+    def time_left(self) -> Optional[float]:
+        """Seconds until the deadline (None without a deadline, never negative)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.elapsed())
+    
+    def record_stage(self, seconds: float):
+        """Remember how long a completed stage took (used to project the next ones)"""
+        self._longest_stage = max(self._longest_stage, seconds)
+    
+    def reserve(self) -> float:
+        """Seconds kept free for the final aggregation"""
+        if self.final_reserve is not None:
+            return self.final_reserve
+        if self._longest_stage == 0.0 and self.deadline is not None:
+            return self.deadline / 2
+        # The final prompt holds the whole population: leave room for a slow call
+        return 2 * self._longest_stage
+    
+    def stage_timeout(self) -> Optional[float]:
+        """Seconds the current stage may run before it is cancelled (None = no limit)"""
+        time_left = self.time_left()
+        if time_left is None:
+            return None
+        return max(0.0, time_left - self.reserve())
+    
+    def stop_reason(
+        self,
+        calls: int,
+        tokens: int,
+        next_calls: int,
+        next_tokens: int,
+        final_tokens: int
+    ) -> Optional[str]:
+        """
+        Check whether the next loop and the final aggregation still fit
+        
+        Args:
+            calls: Calls spent so far
+            tokens: Tokens spent so far
+            next_calls: Calls the next loop would make
+            next_tokens: Estimated tokens of the next loop
+            final_tokens: Estimated tokens of the final aggregation
+        
+        Returns:
+            "deadline", "tokens" or "calls" if the loop should be skipped, else None
+        """
+        time_left = self.time_left()
+        if time_left is not None and time_left < self._longest_stage + self.reserve():
+            return "deadline"
+        return self.overspend(calls + next_calls + 1, tokens + next_tokens + final_tokens)
+    
+    def overspend(self, calls: int, tokens: int) -> Optional[str]:
+        """
+        Check whether spending this much would break the token or call limit
+        
+        Args:
+            calls: Total calls of the run
+            tokens: Total tokens of the run
+        
+        Returns:
+            "tokens" or "calls" for the first limit broken, else None
+        """
+        if self.max_tokens is not None and tokens > self.max_tokens:
+            return "tokens"
+        if self.max_calls is not None and calls > self.max_calls:
+            return "calls"
+        return None
+    
+    def limits_spending(self) -> bool:
+        """Whether the budget limits tokens or calls (and not only time)"""
+        return self.max_tokens is not None or self.max_calls is not None
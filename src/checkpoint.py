@@ -0,0 +1,80 @@
+"""
+Checkpoint Module
+Persists RSA run state between stages so interrupted runs can resume
+"""
+
+import os
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_CHECKPOINT_PATH = ".rsa_checkpoint.json"
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(
+    path: str,
+    prompt: str,
+    config: Dict[str, Any],
+    stage: int,
+    population: List[str],
+    final_solution: Optional[str] = None,
+    loops: Optional[int] = None,
+    stopped: Optional[str] = None
+):
+    """
+    Atomically write the state of a run after a completed stage
+    
+    Args:
+        path: Checkpoint file path
+        prompt: Original user prompt
+        config: Parameters the population depends on (model, sizes, temperature)
+        stage: Last completed stage (0 = initial population, N = loop N)
+        population: Population after that stage
+        final_solution: Final answer, once the run has finished
+        loops: Loops the finished run was configured for
+        stopped: Why the finished run ended before its last loop ("converged" or "budget")
+    """
+    state = {
+        "version": CHECKPOINT_VERSION,
+        "saved_at": time.time(),
+        "prompt": prompt,
+        "config": config,
+        "stage": stage,
+        "population": population,
+        "final_solution": final_solution,
+        "loops": loops,
+        "stopped": stopped,
+    }
+    
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a checkpoint file
+    
+    Args:
+        path: Checkpoint file path
+        
+    Returns:
+        The saved state, or None if the file is missing, unreadable or from another version
+    """
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if state.get("version") != CHECKPOINT_VERSION:
+        return None
+    return state
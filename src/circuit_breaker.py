@@ -0,0 +1,97 @@
+"""
+Circuit Breaker Module
+Per-endpoint health tracking that stops sending calls to a failing endpoint
+"""
+
+import time
+import threading
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Three-state circuit breaker for one endpoint
+    
+    Closed: calls flow and consecutive failures are counted. After
+    failure_threshold of them the circuit opens and the endpoint gets no
+    calls for reset_timeout seconds (or the cooldown a 429 asked for). Then
+    it is half-open: calls are let through again, the first success closes
+    the circuit and the first failure opens it for another period.
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize a closed circuit
+        
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds an open circuit rejects calls
+            clock: Time source (injectable for tests)
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        if reset_timeout < 0:
+            raise ValueError("reset_timeout cannot be negative")
+        
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened = False
+        self._open_until = 0.0
+    
+    @property
+    def state(self) -> str:
+        """Current state: "closed", "open" or "half-open" """
+        with self._lock:
+            if not self._opened:
+                return CLOSED
+            return OPEN if self._clock() < self._open_until else HALF_OPEN
+    
+    def allows(self) -> bool:
+        """Return True if a call may be sent now"""
+        return self.state != OPEN
+    
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets calls through again (0.0 otherwise)"""
+        with self._lock:
+            if not self._opened:
+                return 0.0
+            return max(0.0, self._open_until - self._clock())
+    
+    def record_success(self):
+        """Close the circuit and forget past failures"""
+        with self._lock:
+            self._failures = 0
+            self._opened = False
+    
+    def record_failure(self, cooldown: Optional[float] = None) -> bool:
+        """
+        Count a failed call
+        
+        Args:
+            cooldown: Open the circuit right away for this many seconds
+                (e.g. a 429's Retry-After) instead of counting towards the threshold
+        
+        Returns:
+            True if this failure opened the circuit
+        """
+        with self._lock:
+            self._failures += 1
+            was_open = self._opened and self._clock() < self._open_until
+            half_open = self._opened and not was_open
+            if cooldown is None and not half_open and self._failures < self.failure_threshold:
+                return False
+            self._opened = True
+            self._open_until = max(self._open_until, self._clock() + (self.reset_timeout if cooldown is None else cooldown))
+            return not was_open
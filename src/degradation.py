@@ -0,0 +1,70 @@
+"""
+Degradation Module
+Per-stage policies for calls that still fail after all their retries
+"""
+
+import math
+
+FAILURE_ACTIONS = ("fail", "drop", "reuse", "regroup")
+
+# Actions that make sense for the calls of each stage
+STAGE_ACTIONS = {
+    "population": ("fail", "drop"),
+    "loop": FAILURE_ACTIONS,
+    "final": ("fail", "reuse", "regroup"),
+}
+
+
+class StageFailed(Exception):
+    """Raised when fewer calls of a stage succeed than the failure policy requires"""
+
+
+class FailurePolicy:
+    """
+    What a run does with calls that fail after exhausting their retries
+    
+    population: "drop" goes on with the samples that succeeded (a failed
+    population request is split into one call per sample first), "fail"
+    aborts the run.
+    loop: "drop" goes on with the groups that succeeded, "reuse" keeps the
+    first input of a failed group in its place, "regroup" aggregates a new
+    random group of the loop's inputs in its place (and drops it if that
+    fails too), "fail" aborts the run.
+    final: "reuse" answers with the first refined solution, "regroup"
+    consolidates a random group of group_size refined solutions instead,
+    "fail" aborts the run.
+    
+    Whatever the action, a population or loop stage fails when fewer than
+    min_survival of its calls succeeded (at least one always has to).
+    """
+    
+    def __init__(
+        self,
+        population: str = "drop",
+        loop: str = "drop",
+        final: str = "fail",
+        min_survival: float = 0.0
+    ):
+        """
+        Initialize the policy
+        
+        Args:
+            population: Action for failed initial samples ("drop" or "fail")
+            loop: Action for failed group aggregations ("drop", "reuse", "regroup" or "fail")
+            final: Action for a failed final aggregation ("reuse", "regroup" or "fail")
+            min_survival: Fraction of a stage's calls that must succeed
+        """
+        for stage, action in (("population", population), ("loop", loop), ("final", final)):
+            if action not in STAGE_ACTIONS[stage]:
+                raise ValueError(f"{stage} failure action must be one of {STAGE_ACTIONS[stage]}")
+        if not (0.0 <= min_survival <= 1.0):
+            raise ValueError("min_survival must be between 0.0 and 1.0")
+        
+        self.population = population
+        self.loop = loop
+        self.final = final
+        self.min_survival = min_survival
+    
+    def required(self, calls: int) -> int:
+        """Successful calls a stage of this many calls needs"""
+        return max(1, math.ceil(self.min_survival * calls))
@@ -0,0 +1,388 @@
+"""
+Endpoint Pool Module
+Spreads model calls across several endpoints or API keys, with per-endpoint
+circuit breakers and failover
+"""
+
+import time
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from src.gemini_client import _is_bad_request, _is_rate_limit_error, _retry_after_seconds
+from src.backends import LLMBackend, OpenAICompatibleBackend
+from src.circuit_breaker import CircuitBreaker
+from src.rate_limiter import RateLimiter
+from src.response_cache import ResponseCache
+from src.metrics import MetricsCollector
+from src.events import EventBus
+from src.http_pool import HTTPPoolConfig
+
+BALANCING_STRATEGIES = ("round-robin", "least-outstanding")
+
+
+class Endpoint:
+    """One OpenAI-compatible endpoint and key of a pool"""
+    
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        name: Optional[str] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+    ):
+        """
+        Describe an endpoint
+        
+        Args:
+            base_url: Endpoint base URL
+            api_key: Key for this endpoint (None = GITHUB_TOKEN from .env)
+            name: Label used in warnings and stats (default: base_url)
+            requests_per_minute: This key's request quota (None = unlimited)
+            tokens_per_minute: This key's estimated token quota (None = unlimited)
+        """
+        self.base_url = base_url
+        self.api_key = api_key
+        self.name = name or base_url
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+
+class _Member:
+    """A pooled backend with its health and load"""
+    
+    def __init__(self, backend: LLMBackend, name: str, breaker: CircuitBreaker):
+        self.backend = backend
+        self.name = name
+        self.breaker = breaker
+        self.outstanding = 0
+        self.calls = 0
+        self.failures = 0
+
+
+class PooledBackend:
+    """
+    Backend that spreads calls across several backends and fails over
+    
+    Every call goes to one healthy member, picked round-robin or by fewest
+    calls in flight. A member whose call fails gets a failure on its circuit
+    breaker and the call is retried on another member; a 429 opens the
+    circuit right away for the Retry-After the endpoint asked for. When
+    every circuit is open, calls wait for the first one to half-open.
+    Requests the endpoint rejects as invalid (400/422) fail at once, since
+    another endpoint would reject them too.
+    """
+    
+    def __init__(
+        self,
+        members: Sequence[LLMBackend],
+        strategy: str = "least-outstanding",
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        max_attempts: Optional[int] = None,
+        names: Optional[Sequence[str]] = None
+    ):
+        """
+        Initialize the pool
+        
+        Args:
+            members: Backends to spread calls across (same model)
+            strategy: "round-robin" or "least-outstanding"
+            failure_threshold: Consecutive failures that open a member's circuit
+            reset_timeout: Seconds an open circuit keeps a member out
+            max_attempts: Members tried per call before it fails (default: members + 1)
+            names: Labels of the members (default: their base_url or class name)
+        """
+        if not members:
+            raise ValueError("A pool needs at least one backend")
+        if strategy not in BALANCING_STRATEGIES:
+            raise ValueError(f"strategy must be one of {BALANCING_STRATEGIES}")
+        if names is not None and len(names) != len(members):
+            raise ValueError("names must have one label per member")
+        
+        names = names or [getattr(m, "base_url", type(m).__name__) for m in members]
+        self._members = [
+            _Member(backend, name, CircuitBreaker(failure_threshold, reset_timeout))
+            for backend, name in zip(members, names)
+        ]
+        self.strategy = strategy
+        self.max_attempts = max_attempts or len(members) + 1
+        self.model_name = members[0].model_name
+        self._lock = threading.Lock()
+        self._next = 0
+    
+    @classmethod
+    def from_endpoints(
+        cls,
+        endpoints: Sequence[Endpoint],
+        model_name: str = "gpt-4o",
+        max_concurrency: int = 8,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[MetricsCollector] = None,
+        request_delay: float = 1.0,
+        use_n_sampling: bool = True,
+        max_n: int = 8,
+        http_pool: Optional[HTTPPoolConfig] = None,
+        events: Optional[EventBus] = None,
+        member_retries: int = 1,
+        **pool_options
+    ) -> "PooledBackend":
+        """
+        Build a pool of OpenAI-compatible backends, one per endpoint
+        
+        Args:
+            endpoints: Endpoints and keys to use
+            model_name: Model requested from every endpoint
+            max_concurrency: Async requests in flight per endpoint
+            cache: Optional response cache shared by every endpoint
+            metrics: Optional collector that records every call
+            request_delay: Delay between sequential population calls in seconds
+            use_n_sampling: Request the population with n > 1 when supported
+            max_n: Largest n requested in one call
+            http_pool: Connection pool settings (default: sized for all endpoints)
+            events: Optional bus that receives the events of every call
+            member_retries: Attempts on one endpoint before failing over
+            **pool_options: strategy, failure_threshold, reset_timeout, max_attempts
+        
+        Returns:
+            The pooled backend
+        """
+        http_pool = (http_pool or HTTPPoolConfig()).sized_for(max_concurrency * len(endpoints))
+        members = [
+            OpenAICompatibleBackend(
+                base_url=endpoint.base_url,
+                api_key=endpoint.api_key,
+                model_name=model_name,
+                max_concurrency=max_concurrency,
+                rate_limiter=RateLimiter(
+                    requests_per_minute=endpoint.requests_per_minute,
+                    tokens_per_minute=endpoint.tokens_per_minute
+                ) if endpoint.requests_per_minute or endpoint.tokens_per_minute else None,
+                cache=cache,
+                metrics=metrics,
+                request_delay=request_delay,
+                use_n_sampling=use_n_sampling,
+                max_n=max_n,
+                http_pool=http_pool,
+                events=events,
+                max_retries=member_retries
+            )
+            for endpoint in endpoints
+        ]
+        return cls(members, names=[endpoint.name for endpoint in endpoints], **pool_options)
+    
+    @property
+    def metrics(self) -> Optional[MetricsCollector]:
+        """Metrics collector shared by every member"""
+        return self._members[0].backend.metrics
+    
+    @metrics.setter
+    def metrics(self, collector: Optional[MetricsCollector]):
+        for member in self._members:
+            member.backend.metrics = collector
+    
+    @property
+    def events(self) -> Optional[EventBus]:
+        """Event bus shared by every member"""
+        return self._members[0].backend.events
+    
+    @events.setter
+    def events(self, bus: Optional[EventBus]):
+        for member in self._members:
+            member.backend.events = bus
+    
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-member calls, failures, calls in flight and circuit state"""
+        with self._lock:
+            return [
+                {
+                    "name": m.name,
+                    "state": m.breaker.state,
+                    "calls": m.calls,
+                    "failures": m.failures,
+                    "outstanding": m.outstanding,
+                }
+                for m in self._members
+            ]
+    
+    def _acquire(self, tried: Set[_Member]) -> Tuple[Optional[_Member], float]:
+        """
+        Pick the member for the next attempt and count the call on it
+        
+        Members already tried by this call are skipped while others are healthy.
+        
+        Returns:
+            Tuple of (member, 0.0), or (None, seconds until a circuit half-opens)
+        """
+        with self._lock:
+            healthy = [m for m in self._members if m.breaker.allows()]
+            if not healthy:
+                return None, max(0.01, min(m.breaker.retry_in() for m in self._members))
+            candidates = [m for m in healthy if m not in tried] or healthy
+            
+            if self.strategy == "round-robin":
+                start = self._next % len(self._members)
+                self._next += 1
+                rotation = self._members[start:] + self._members[:start]
+                member = next(m for m in rotation if m in candidates)
+            else:
+                member = min(candidates, key=lambda m: (m.outstanding, m.calls))
+            
+            member.outstanding += 1
+            member.calls += 1
+            return member, 0.0
+    
+    def _release(self, member: _Member):
+        """Take a finished (or abandoned) call off its member"""
+        with self._lock:
+            member.outstanding -= 1
+    
+    def _failed(self, member: _Member, error: Exception) -> bool:
+        """
+        Record a failed call on its member's circuit
+        
+        Returns:
+            True if the call may be retried on another member
+        """
+        # Exhausted client retries wrap the last provider error
+        cause = error.__cause__ or error
+        if _is_bad_request(cause):
+            return False
+        
+        cooldown = None
+        if _is_rate_limit_error(cause):
+            retry_after = _retry_after_seconds(cause)
+            cooldown = retry_after if retry_after is not None else member.breaker.reset_timeout
+        with self._lock:
+            member.failures += 1
+        events = self.events
+        if member.breaker.record_failure(cooldown) and events is not None and events.active:
+            events.emit(
+                "warning",
+                message=f"Endpoint {member.name} unavailable for {member.breaker.retry_in():.0f}s: {cause}"
+            )
+        return True
+    
+    def _next_member(self, tried: Set[_Member]) -> _Member:
+        """Member for the next attempt of a call, waiting while every circuit is open"""
+        member, wait = self._acquire(tried)
+        while member is None:
+            time.sleep(wait)
+            member, wait = self._acquire(tried)
+        tried.add(member)
+        return member
+    
+    async def _next_member_async(self, tried: Set[_Member]) -> _Member:
+        """Async counterpart of _next_member"""
+        member, wait = self._acquire(tried)
+        while member is None:
+            await asyncio.sleep(wait)
+            member, wait = self._acquire(tried)
+        tried.add(member)
+        return member
+    
+    def _dispatch(self, call: Callable[[LLMBackend], Any]) -> Any:
+        """Run a call on one member after another until one succeeds"""
+        tried: Set[_Member] = set()
+        error = None
+        for _ in range(self.max_attempts):
+            member = self._next_member(tried)
+            try:
+                result = call(member.backend)
+            except Exception as e:
+                error = e
+                if not self._failed(member, e):
+                    raise
+                continue
+            finally:
+                self._release(member)
+            member.breaker.record_success()
+            return result
+        raise error
+    
+    async def _dispatch_async(self, call: Callable[[LLMBackend], Awaitable[Any]]) -> Any:
+        """Async counterpart of _dispatch"""
+        tried: Set[_Member] = set()
+        error = None
+        for _ in range(self.max_attempts):
+            member = await self._next_member_async(tried)
+            try:
+                result = await call(member.backend)
+            except Exception as e:
+                error = e
+                if not self._failed(member, e):
+                    raise
+                continue
+            finally:
+                self._release(member)
+            member.breaker.record_success()
+            return result
+        raise error
+    
+    def generate(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                 system: Optional[str] = None) -> str:
+        return self._dispatch(
+            lambda backend: backend.generate(prompt, temperature, sample_index=sample_index, phase=phase, system=system)
+        )
+    
+    def generate_n(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        return self._dispatch(lambda backend: backend.generate_n(prompt, count, temperature, phase=phase))
+    
+    def stream(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+               system: Optional[str] = None) -> Iterator[str]:
+        # Fail over only while nothing has been yielded yet
+        tried: Set[_Member] = set()
+        error = None
+        for _ in range(self.max_attempts):
+            member = self._next_member(tried)
+            started = False
+            try:
+                for chunk in member.backend.stream(prompt, temperature, phase=phase, system=system):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                error = e
+                if started or not self._failed(member, e):
+                    raise
+                continue
+            finally:
+                self._release(member)
+            member.breaker.record_success()
+            return
+        raise error
+    
+    async def generate_async(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                             system: Optional[str] = None) -> str:
+        return await self._dispatch_async(
+            lambda backend: backend.generate_async(
+                prompt, temperature, sample_index=sample_index, phase=phase, system=system
+            )
+        )
+    
+    async def generate_n_async(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        return await self._dispatch_async(
+            lambda backend: backend.generate_n_async(prompt, count, temperature, phase=phase)
+        )
+    
+    async def stream_async(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+                           system: Optional[str] = None) -> AsyncIterator[str]:
+        tried: Set[_Member] = set()
+        error = None
+        for _ in range(self.max_attempts):
+            member = await self._next_member_async(tried)
+            started = False
+            try:
+                async for chunk in member.backend.stream_async(prompt, temperature, phase=phase, system=system):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                error = e
+                if started or not self._failed(member, e):
+                    raise
+                continue
+            finally:
+                self._release(member)
+            member.breaker.record_success()
+            return
+        raise error
@@ -0,0 +1,262 @@
+"""
+Events Module
+Structured progress events of RSA runs and the sinks that consume them
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+# Event types, in the order a run emits them:
+#   run_started     mode
+#   stage_started   stage ("population", "loop N", "final"), size
+#   call_queued     call_id, phase, n
+#   call_started    call_id, phase, attempt, waited
+#   call_retried    call_id, phase, attempt, max_attempts, delay, error, rate_limited
+#   call_finished   call_id, phase, wall_time, wait_time, retries, cache_hit, error, cancelled, *_tokens
+#   stage_finished  stage, size, failed
+#   run_finished    elapsed, calls, prompt_tokens, completion_tokens
+#   warning         message
+#   log             message (human-readable progress, printed by console_sink)
+EVENT_TYPES = (
+    "run_started",
+    "stage_started",
+    "call_queued",
+    "call_started",
+    "call_retried",
+    "call_finished",
+    "stage_finished",
+    "run_finished",
+    "warning",
+    "log",
+)
+
+Sink = Callable[[Dict[str, Any]], None]
+
+# Run the current code belongs to; asyncio tasks inherit it, threads get a copy
+_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("rsa_run_id", default=None)
+_call_ids = itertools.count(1)
+
+
+def start_run() -> str:
+    """Give the current context a new run id and return it"""
+    run_id = uuid.uuid4().hex[:8]
+    _run_id.set(run_id)
+    return run_id
+
+
+def current_run_id() -> Optional[str]:
+    """Run id of the current context (None outside a run)"""
+    return _run_id.get()
+
+
+def next_call_id() -> int:
+    """Process-wide id correlating the events of one call"""
+    return next(_call_ids)
+
+
+class EventBus:
+    """
+    Fan-out of structured events to pluggable sinks
+    
+    A sink is any callable taking the event dict. Events carry their type,
+    a wall-clock timestamp and the run id of the emitting context, so the
+    calls of concurrent runs can be told apart. Emitters check active
+    first: without sinks no event is ever built.
+    """
+    
+    def __init__(self, sinks: Optional[List[Sink]] = None):
+        """
+        Initialize the bus
+        
+        Args:
+            sinks: Sinks to attach right away
+        """
+        self._sinks: List[Sink] = []
+        self._lock = threading.Lock()
+        self.active = False
+        for sink in sinks or []:
+            self.subscribe(sink)
+    
+    def subscribe(self, sink: Sink) -> Sink:
+        """Attach a sink (attaching the same sink twice has no effect) and return it"""
+        with self._lock:
+            if sink not in self._sinks:
+                self._sinks = self._sinks + [sink]
+            self.active = True
+        return sink
+    
+    def unsubscribe(self, sink: Sink):
+        """Detach a sink"""
+        with self._lock:
+            self._sinks = [s for s in self._sinks if s != sink]
+            self.active = bool(self._sinks)
+    
+    def emit(self, event_type: str, **fields):
+        """
+        Deliver one event to every sink
+        
+        A failing sink is logged and skipped so tracing never breaks a run.
+        
+        Args:
+            event_type: One of EVENT_TYPES
+            **fields: Event payload
+        """
+        sinks = self._sinks
+        if not sinks:
+            return
+        event = {"type": event_type, "time": time.time(), "run_id": _run_id.get(), **fields}
+        for sink in sinks:
+            try:
+                sink(event)
+            except Exception:
+                logging.getLogger(__name__).exception("Event sink %r failed", sink)
+
+
+def console_sink(event: Dict[str, Any]):
+    """Print progress messages, retries and warnings to stdout (used by verbose orchestrators)"""
+    if event["type"] == "log":
+        print(event["message"])
+    elif event["type"] == "call_retried":
+        if event["rate_limited"]:
+            print(f"⚠️  Rate limit hit (429). Retrying in {event['delay']}s... "
+                  f"(Attempt {event['attempt']}/{event['max_attempts']})")
+        else:
+            print(f"⚠️  Attempt {event['attempt']} failed: {event['error']}. Retrying in {event['delay']}s...")
+    elif event["type"] == "warning":
+        print(f"⚠️  {event['message']}")
+
+
+class LoggingSink:
+    """Forward events to a standard library logger"""
+    
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        """
+        Initialize the adapter
+        
+        Args:
+            logger: Target logger (default: the "rsa" logger)
+            level: Level of regular events; retries and warnings use WARNING
+        """
+        self.logger = logger or logging.getLogger("rsa")
+        self.level = level
+    
+    def __call__(self, event: Dict[str, Any]):
+        level = logging.WARNING if event["type"] in ("call_retried", "warning") else self.level
+        if not self.logger.isEnabledFor(level):
+            return
+        fields = " ".join(
+            f"{key}={value}" for key, value in event.items() if key not in ("type", "time", "run_id")
+        )
+        self.logger.log(level, "[%s] %s %s", event["run_id"] or "-", event["type"], fields, extra={"rsa_event": event})
+
+
+class JSONLSink:
+    """Append every event as one JSON line to a file"""
+    
+    def __init__(self, path: str):
+        """
+        Open the file for appending
+        
+        Args:
+            path: JSONL file path
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+    
+    def __call__(self, event: Dict[str, Any]):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+    
+    def close(self):
+        """Close the file"""
+        with self._lock:
+            self._file.close()
+    
+    def __enter__(self) -> "JSONLSink":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ProgressSink:
+    """
+    Live one-line progress bar of the calls of all running runs
+    
+    Redraws at most every min_interval seconds (and on stage changes), so it
+    stays cheap under high call volume.
+    """
+    
+    def __init__(self, stream: Optional[TextIO] = None, width: int = 30, min_interval: float = 0.1):
+        """
+        Initialize the bar
+        
+        Args:
+            stream: Output stream (default: stderr)
+            width: Bar width in characters
+            min_interval: Minimum seconds between redraws
+        """
+        self.stream = stream or sys.stderr
+        self.width = width
+        self.min_interval = min_interval
+        self.queued = 0
+        self.finished = 0
+        self.retries = 0
+        self.failures = 0
+        self.stage = ""
+        self._runs = set()
+        self._last_draw = 0.0
+        self._lock = threading.Lock()
+    
+    def __call__(self, event: Dict[str, Any]):
+        kind = event["type"]
+        with self._lock:
+            if kind == "run_started":
+                self._runs.add(event["run_id"])
+            elif kind == "call_queued":
+                self.queued += 1
+            elif kind == "call_retried":
+                self.retries += 1
+            elif kind == "call_finished":
+                self.finished += 1
+                # Cache hits finish without being queued
+                self.queued += event["cache_hit"]
+                self.failures += event["error"] is not None
+            elif kind == "stage_started":
+                self.stage = event["stage"]
+            elif kind != "run_finished":
+                return
+            
+            if kind == "run_finished":
+                self._runs.discard(event["run_id"])
+                self._draw()
+                if not self._runs:
+                    self.stream.write("\n")
+                    self.stream.flush()
+            elif kind == "stage_started" or time.monotonic() - self._last_draw >= self.min_interval:
+                self._draw()
+    
+    def _draw(self):
+        """Redraw the bar in place"""
+        self._last_draw = time.monotonic()
+        done = int(self.width * self.finished / self.queued) if self.queued else 0
+        bar = "█" * done + "░" * (self.width - done)
+        line = f"\r⏳ {self.stage:<8} [{bar}] {self.finished}/{self.queued} llamadas"
+        if len(self._runs) > 1:
+            line += f" · {len(self._runs)} ejecuciones"
+        if self.retries:
+            line += f" · {self.retries} reintentos"
+        if self.failures:
+            line += f" · {self.failures} fallidas"
+        self.stream.write(line)
+        self.stream.flush()
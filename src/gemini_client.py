@@ -5,43 +5,353 @@ Handles all interactions with GitHub Models API (compatible with Copilot)
 
 import os
 import time
-from typing import List, Optional
-from openai import OpenAI
+import asyncio
+import weakref
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+from src.aggregation import estimate_tokens
+from src.rate_limiter import RateLimiter
+from src.response_cache import ResponseCache
+from src.metrics import MetricsCollector, usage_tokens
+from src.events import EventBus, next_call_id
+from src.http_pool import HTTPPoolConfig, get_http_client, get_async_http_client
 
 
-class OpenAIClient:
-    """Client for interacting with GitHub Models API"""
+GITHUB_MODELS_BASE_URL = "https://models.inference.ai.azure.com"
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Return True if the exception looks like a 429 / rate limit error"""
+    error_str = str(error)
+    return "429" in error_str or "rate_limit" in error_str.lower()
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Extract the server-requested wait from Retry-After headers, if any
+    
+    Args:
+        error: Exception raised by the OpenAI SDK
+        
+    Returns:
+        Seconds to wait, or None if the error carries no usable header
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
     
-    def __init__(self, api_key: Optional[str] = None, model_name: str = "gpt-4o"):
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            return None
+    return None
+
+
+def _backoff_delay(
+    error: Exception,
+    attempt: int,
+    max_retries: int,
+    retry_delay: float,
+    rate_limiter: Optional[RateLimiter] = None
+) -> float:
+    """
+    Decide how long to wait before retrying a failed call
+    
+    Args:
+        error: Exception raised by the failed attempt
+        attempt: Zero-based attempt number
+        max_retries: Maximum number of attempts
+        retry_delay: Base delay between retries in seconds
+        rate_limiter: Limiter to pause for every caller on rate limit errors
+        
+    Returns:
+        Seconds to sleep before the next attempt
+        
+    Raises:
+        Exception: If no attempts are left
+    """
+    if _is_rate_limit_error(error):
+        # Incremento exponencial del retardo para 429, salvo que el servidor indique Retry-After
+        retry_after = _retry_after_seconds(error)
+        current_delay = retry_after if retry_after is not None else retry_delay * (2 ** attempt)
+        if rate_limiter:
+            rate_limiter.pause(current_delay)
+        if attempt < max_retries - 1:
+            return current_delay
+    
+    if attempt < max_retries - 1:
+        return retry_delay
+    raise Exception(f"Failed to generate response after {max_retries} attempts: {error}") from error
+
+
+class NSamplingUnsupported(Exception):
+    """Raised when the endpoint rejects a request with n > 1"""
+
+
+def _is_bad_request(error: Exception) -> bool:
+    """Return True for 400/422 errors, which retrying will not fix"""
+    return getattr(error, "status_code", None) in (400, 422)
+
+
+def _build_messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+    """Chat messages for a prompt, with an optional leading system message"""
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _request_text(prompt: str, system: Optional[str] = None) -> str:
+    """Text identifying a request for the cache and the token estimate"""
+    return prompt if not system else f"[system]\n{system}\n[user]\n{prompt}"
+
+
+def _total_tokens(response) -> Optional[int]:
+    """Return total tokens reported in a completion's usage, if present"""
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage else None
+
+
+class _BaseClient:
+    """Configuration and bookkeeping shared by the sync and async clients"""
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: str = "gpt-4o",
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[MetricsCollector] = None,
+        max_n: int = 8,
+        events: Optional[EventBus] = None,
+        max_retries: int = 5,
+        retry_delay: float = 5.0
+    ):
         """
-        Initialize GitHub Models client
+        Validate credentials and store the configuration shared by both clients
         
         Args:
             api_key: GitHub Personal Access Token. If None, will load from .env
             model_name: Name of the model to use (gpt-4o, gpt-4o-mini, etc.)
+            rate_limiter: Optional limiter every request goes through
+            cache: Optional persistent cache consulted before every request
+            metrics: Optional collector that records every call
+            max_n: Largest n requested in one call by generate_n_responses
+            events: Optional bus that receives call_queued/started/retried/finished events
+            max_retries: Default attempts per request
+            retry_delay: Default base delay between attempts in seconds
         """
+        if max_retries < 1:
+            raise ValueError("max_retries must be at least 1")
+        
         load_dotenv()
         self.api_key = api_key or os.getenv("GITHUB_TOKEN")
         self.model_name = model_name
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metrics = metrics
+        self.events = events
+        self.max_n = max(1, max_n)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        # Flipped to False the first time the endpoint rejects or ignores n > 1
+        self.supports_n = True
         
         if not self.api_key:
             raise ValueError(
                 "GITHUB_TOKEN not found. Please set it in .env file or pass it as parameter"
             )
+    
+    def _cached(self, prompt: str, temperature: float, sample_index: int, phase: str) -> Optional[str]:
+        """Return a cached response (recording the hit), or None"""
+        if self.cache is None:
+            return None
+        start = time.perf_counter()
+        cached = self.cache.get(self.model_name, prompt, temperature, sample_index)
+        if cached is not None:
+            self._record_call(phase, start, cache_hit=True)
+        return cached
+    
+    def _store(self, prompt: str, temperature: float, content: Optional[str], sample_index: int):
+        """Save a response in the cache, if enabled"""
+        if self.cache is not None and content is not None:
+            self.cache.put(self.model_name, prompt, temperature, content, sample_index)
+    
+    def _record_usage(self, estimated: int, response):
+        """Correct the rate limiter's token estimate with the reported usage"""
+        if self.rate_limiter and _total_tokens(response) is not None:
+            self.rate_limiter.record_usage(estimated, _total_tokens(response))
+    
+    def _collect_choices(self, prompt: str, temperature: float, slots: List[int], response, results: List[Optional[str]]):
+        """
+        Store the choices of an n-sampling response into their population slots
+        
+        Detects endpoints that silently ignore n (a single choice for n > 1).
+        """
+        choices = sorted(response.choices, key=lambda c: c.index)
+        if len(slots) > 1 and len(choices) <= 1:
+            self.supports_n = False
+        for slot, choice in zip(slots, choices):
+            results[slot] = choice.message.content
+            self._store(prompt, temperature, choice.message.content, slot)
+    
+    def _reduce_max_n(self, rejected_n: int, error: Exception):
+        """Halve max_n after the endpoint rejected rejected_n, disabling n-sampling below 2"""
+        self.max_n = max(1, min(self.max_n, rejected_n // 2))
+        if self.max_n < 2:
+            self.supports_n = False
+            self._emit("warning", message=f"Endpoint does not support n > 1 ({error}). Falling back to one request per response")
+        else:
+            self._emit("warning", message=f"Endpoint rejected n={rejected_n}, retrying with n={self.max_n}")
+    
+    def _cached_slots(self, prompt: str, temperature: float, count: int, phase: str) -> List[Optional[str]]:
+        """Look up every population slot in the cache (None for misses)"""
+        return [self._cached(prompt, temperature, i, phase) for i in range(count)]
+    
+    def _emit(self, event_type: str, **fields):
+        """Publish an event if a sink is listening"""
+        if self.events is not None and self.events.active:
+            self.events.emit(event_type, model=self.model_name, **fields)
+    
+    def _call_queued(self, phase: str, n: int = 1) -> Optional[int]:
+        """Announce a call about to wait for its turn, returning its id (None without sinks)"""
+        if self.events is None or not self.events.active:
+            return None
+        call_id = next_call_id()
+        self._emit("call_queued", call_id=call_id, phase=phase, n=n)
+        return call_id
+    
+    def _retry_delay(
+        self,
+        error: Exception,
+        attempt: int,
+        max_retries: int,
+        retry_delay: float,
+        phase: str,
+        call_id: Optional[int]
+    ) -> float:
+        """Backoff before retrying a failed attempt (see _backoff_delay), announcing the retry"""
+        delay = _backoff_delay(error, attempt, max_retries, retry_delay, self.rate_limiter)
+        self._emit(
+            "call_retried",
+            call_id=call_id,
+            phase=phase,
+            attempt=attempt + 1,
+            max_attempts=max_retries,
+            delay=delay,
+            error=str(error),
+            rate_limited=_is_rate_limit_error(error)
+        )
+        return delay
+    
+    def _record_call(
+        self,
+        phase: str,
+        start: float,
+        wait_time: float = 0.0,
+        retries: int = 0,
+        response=None,
+        cache_hit: bool = False,
+        error: Optional[Exception] = None,
+        call_id: Optional[int] = None,
+        cancelled: bool = False,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0
+    ):
+        """
+        Record one finished (or cancelled) call in the metrics collector and announce it, if anyone listens
         
-        # GitHub Models endpoint
+        prompt_tokens and completion_tokens are estimates for calls without a
+        usage report, such as a request cancelled after it was sent.
+        """
+        emitting = self.events is not None and self.events.active
+        if self.metrics is None and not emitting:
+            return
+        if response is not None:
+            tokens = usage_tokens(response)
+        else:
+            tokens = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        finished = {
+            "phase": phase,
+            "wall_time": time.perf_counter() - start,
+            "wait_time": wait_time,
+            "retries": retries,
+            "cache_hit": cache_hit,
+            "error": str(error) if error is not None else None,
+            "cancelled": cancelled,
+            **tokens
+        }
+        if self.metrics is not None:
+            self.metrics.record(model=self.model_name, **finished)
+        if emitting:
+            self._emit("call_finished", call_id=call_id, **finished)
+
+
+class OpenAIClient(_BaseClient):
+    """Client for interacting with GitHub Models API"""
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: str = "gpt-4o",
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[MetricsCollector] = None,
+        base_url: str = GITHUB_MODELS_BASE_URL,
+        max_n: int = 8,
+        http_pool: Optional[HTTPPoolConfig] = None,
+        events: Optional[EventBus] = None,
+        max_retries: int = 5,
+        retry_delay: float = 5.0
+    ):
+        """
+        Initialize GitHub Models client
+        
+        Args:
+            api_key: GitHub Personal Access Token. If None, will load from .env
+            model_name: Name of the model to use (gpt-4o, gpt-4o-mini, etc.)
+            rate_limiter: Optional limiter every request goes through
+            cache: Optional persistent cache consulted before every request
+            metrics: Optional collector that records every call
+            base_url: OpenAI-compatible endpoint (default: GitHub Models)
+            max_n: Largest n requested in one call by generate_n_responses
+            http_pool: Connection pool settings (clients with equal settings share a pool)
+            events: Optional bus that receives call_queued/started/retried/finished events
+            max_retries: Default attempts per request
+            retry_delay: Default base delay between attempts in seconds
+        """
+        super().__init__(api_key, model_name, rate_limiter, cache, metrics, max_n, events, max_retries, retry_delay)
+        self.base_url = base_url
+        self.http_pool = http_pool or HTTPPoolConfig()
+        
+        # SDK-level retries are disabled: generate_response retries itself so
+        # every attempt goes through the rate limiter and is counted in metrics
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url="https://models.inference.ai.azure.com"
+            base_url=base_url,
+            max_retries=0,
+            http_client=get_http_client(self.http_pool)
         )
     
     def generate_response(
         self, 
         prompt: str, 
         temperature: float = 1.0,
-        max_retries: int = 5,
-        retry_delay: float = 5.0
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        sample_index: int = 0,
+        phase: str = "call",
+        system: Optional[str] = None
     ) -> str:
         """
         Generate a single response from OpenAI
@@ -49,44 +359,174 @@ class OpenAIClient:
         Args:
             prompt: The prompt to send to OpenAI
             temperature: Controls randomness (0.0 to 2.0)
-            max_retries: Maximum number of retries on failure
-            retry_delay: Delay between retries in seconds
+            max_retries: Maximum number of retries on failure (default: the client's max_retries)
+            retry_delay: Delay between retries in seconds (default: the client's retry_delay)
+            sample_index: Slot of this sample among responses to the same prompt (cache key)
+            phase: RSA phase the call belongs to (for metrics)
+            system: Optional system message sent before the prompt
             
         Returns:
             Generated response text
         """
+        request_text = _request_text(prompt, system)
+        cached = self._cached(request_text, temperature, sample_index, phase)
+        if cached is not None:
+            return cached
+        
+        response = self._create_with_retries(
+            prompt,
+            temperature,
+            self.max_retries if max_retries is None else max_retries,
+            self.retry_delay if retry_delay is None else retry_delay,
+            phase,
+            system=system
+        )
+        content = response.choices[0].message.content
+        self._store(request_text, temperature, content, sample_index)
+        return content
+    
+    def _create_with_retries(
+        self,
+        prompt: str,
+        temperature: float,
+        max_retries: int,
+        retry_delay: float,
+        phase: str,
+        n: int = 1,
+        system: Optional[str] = None
+    ):
+        """
+        Send one chat completion request, retrying with backoff
+        
+        Args:
+            prompt: The prompt to send
+            temperature: Controls randomness
+            max_retries: Maximum number of attempts
+            retry_delay: Base delay between retries in seconds
+            phase: RSA phase the call belongs to (for metrics)
+            n: Number of completions requested in this single call
+            system: Optional system message sent before the prompt
+            
+        Returns:
+            The SDK chat completion response
+            
+        Raises:
+            NSamplingUnsupported: If n > 1 and the endpoint rejects the request
+        """
+        call_id = self._call_queued(phase, n)
+        start = time.perf_counter()
+        estimated = estimate_tokens(_request_text(prompt, system))
+        waited = 0.0
+        extra = {"n": n} if n > 1 else {}
+        
         for attempt in range(max_retries):
             try:
+                if self.rate_limiter:
+                    waited += self.rate_limiter.acquire(estimated)
+                self._emit("call_started", call_id=call_id, phase=phase, attempt=attempt + 1, waited=waited)
                 response = self.client.chat.completions.create(
                     model=self.model_name,
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=temperature
+                    messages=_build_messages(prompt, system),
+                    temperature=temperature,
+                    **extra
                 )
-                return response.choices[0].message.content
+                self._record_usage(estimated, response)
+                self._record_call(phase, start, waited, attempt, response, call_id=call_id)
+                return response
             except Exception as e:
-                error_str = str(e)
-                if "429" in error_str or "rate_limit" in error_str.lower():
-                    # Incremento exponencial del retardo para 429
-                    current_delay = retry_delay * (2 ** attempt)
-                    if attempt < max_retries - 1:
-                        print(f"⚠️  Rate limit hit (429). Retrying in {current_delay}s... (Attempt {attempt + 1}/{max_retries})")
-                        time.sleep(current_delay)
+                if n > 1 and _is_bad_request(e):
+                    self._record_call(phase, start, waited, attempt, error=e, call_id=call_id)
+                    raise NSamplingUnsupported(str(e)) from e
+                try:
+                    delay = self._retry_delay(e, attempt, max_retries, retry_delay, phase, call_id)
+                except Exception as final_error:
+                    self._record_call(phase, start, waited, attempt, error=final_error, call_id=call_id)
+                    raise
+                time.sleep(delay)
+    
+    def stream_response(
+        self,
+        prompt: str,
+        temperature: float = 1.0,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        sample_index: int = 0,
+        phase: str = "call",
+        system: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Stream a single response as text chunks arrive
+        
+        Failed attempts are retried only if no chunk has been yielded yet.
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            temperature: Controls randomness (0.0 to 2.0)
+            max_retries: Maximum number of retries on failure (default: the client's max_retries)
+            retry_delay: Delay between retries in seconds (default: the client's retry_delay)
+            sample_index: Slot of this sample among responses to the same prompt (cache key)
+            phase: RSA phase the call belongs to (for metrics)
+            system: Optional system message sent before the prompt
+            
+        Yields:
+            Text chunks of the generated response
+        """
+        request_text = _request_text(prompt, system)
+        cached = self._cached(request_text, temperature, sample_index, phase)
+        if cached is not None:
+            yield cached
+            return
+        
+        max_retries = self.max_retries if max_retries is None else max_retries
+        retry_delay = self.retry_delay if retry_delay is None else retry_delay
+        call_id = self._call_queued(phase)
+        start = time.perf_counter()
+        estimated = estimate_tokens(_request_text(prompt, system))
+        waited = 0.0
+        chunks: List[str] = []
+        last_chunk = None
+        
+        for attempt in range(max_retries):
+            try:
+                if self.rate_limiter:
+                    waited += self.rate_limiter.acquire(estimated)
+                self._emit("call_started", call_id=call_id, phase=phase, attempt=attempt + 1, waited=waited)
+                stream = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=_build_messages(prompt, system),
+                    temperature=temperature,
+                    stream=True
+                )
+                for chunk in stream:
+                    last_chunk = chunk
+                    if not chunk.choices:
                         continue
-                
-                if attempt < max_retries - 1:
-                    print(f"⚠️  Attempt {attempt + 1} failed: {e}. Retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
-                else:
-                    raise Exception(f"Failed to generate response after {max_retries} attempts: {e}")
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+                break
+            except Exception as e:
+                if chunks:
+                    self._record_call(phase, start, waited, attempt, error=e, call_id=call_id)
+                    raise
+                try:
+                    delay = self._retry_delay(e, attempt, max_retries, retry_delay, phase, call_id)
+                except Exception as final_error:
+                    self._record_call(phase, start, waited, attempt, error=final_error, call_id=call_id)
+                    raise
+                time.sleep(delay)
+        
+        self._record_call(phase, start, waited, attempt, last_chunk, call_id=call_id)
+        self._store(request_text, temperature, "".join(chunks), sample_index)
     
     def generate_multiple_responses(
         self,
         prompt: str,
         count: int,
         temperature: float = 1.0,
-        delay: float = 0.5
+        delay: float = 0.5,
+        phase: str = "population"
     ) -> List[str]:
         """
         Generate multiple diverse responses for the same prompt
@@ -95,7 +535,8 @@ class OpenAIClient:
             prompt: The prompt to send to OpenAI
             count: Number of responses to generate
             temperature: Controls randomness
-            delay: Delay between requests to avoid rate limiting
+            delay: Delay between requests, only used without a rate limiter
+            phase: RSA phase the calls belong to (for metrics)
             
         Returns:
             List of generated responses
@@ -103,12 +544,439 @@ class OpenAIClient:
         responses = []
         
         for i in range(count):
-            print(f"🔄 Generating response {i + 1}/{count}...")
-            response = self.generate_response(prompt, temperature)
+            response = self.generate_response(prompt, temperature, sample_index=i, phase=phase)
             responses.append(response)
             
-            # Add delay to avoid rate limiting
-            if i < count - 1:
+            # Add delay to avoid rate limiting (the limiter paces calls itself)
+            if i < count - 1 and self.rate_limiter is None:
                 time.sleep(delay)
         
         return responses
+    
+    def generate_n_responses(
+        self,
+        prompt: str,
+        count: int,
+        temperature: float = 1.0,
+        delay: float = 0.5,
+        phase: str = "population"
+    ) -> List[str]:
+        """
+        Generate count responses using server-side n-sampling
+        
+        The prompt is sent once per chunk of up to max_n completions, so it is
+        transmitted and prefilled once instead of count times. Falls back to
+        one request per response if the endpoint rejects or ignores n, or
+        after a round that filled no slot.
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            count: Number of responses to generate
+            temperature: Controls randomness
+            delay: Delay between fallback requests, only used without a rate limiter
+            phase: RSA phase the calls belong to (for metrics)
+            
+        Returns:
+            List of generated responses (slot i is cached as sample i)
+        """
+        results = self._cached_slots(prompt, temperature, count, phase)
+        missing = [i for i, r in enumerate(results) if r is None]
+        
+        while missing and self.supports_n and len(missing) > 1:
+            chunk = missing[:self.max_n]
+            try:
+                response = self._create_with_retries(prompt, temperature, self.max_retries, self.retry_delay, phase, n=len(chunk))
+            except NSamplingUnsupported as e:
+                self._reduce_max_n(len(chunk), e)
+                continue
+            self._collect_choices(prompt, temperature, chunk, response, results)
+            still_missing = [i for i in missing if results[i] is None]
+            if len(still_missing) == len(missing):
+                # Choices without content: asking again would loop forever
+                break
+            missing = still_missing
+        
+        for position, slot in enumerate(missing):
+            results[slot] = self.generate_response(prompt, temperature, sample_index=slot, phase=phase)
+            if position < len(missing) - 1 and self.rate_limiter is None:
+                time.sleep(delay)
+        
+        return results
+
+
+class AsyncOpenAIClient(_BaseClient):
+    """Asyncio client for GitHub Models API with bounded concurrency"""
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: str = "gpt-4o",
+        max_concurrency: int = 8,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[MetricsCollector] = None,
+        base_url: str = GITHUB_MODELS_BASE_URL,
+        max_n: int = 8,
+        http_pool: Optional[HTTPPoolConfig] = None,
+        events: Optional[EventBus] = None,
+        max_retries: int = 5,
+        retry_delay: float = 5.0
+    ):
+        """
+        Initialize async GitHub Models client
+        
+        Args:
+            api_key: GitHub Personal Access Token. If None, will load from .env
+            model_name: Name of the model to use (gpt-4o, gpt-4o-mini, etc.)
+            max_concurrency: Maximum number of requests in flight at once
+            rate_limiter: Optional limiter every request goes through
+            cache: Optional persistent cache consulted before every request
+            metrics: Optional collector that records every call
+            base_url: OpenAI-compatible endpoint (default: GitHub Models)
+            max_n: Largest n requested in one call by generate_n_responses
+            http_pool: Connection pool settings (clients with equal settings share a pool)
+            events: Optional bus that receives call_queued/started/retried/finished events
+            max_retries: Default attempts per request
+            retry_delay: Default base delay between attempts in seconds
+        """
+        super().__init__(api_key, model_name, rate_limiter, cache, metrics, max_n, events, max_retries, retry_delay)
+        
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        self.base_url = base_url
+        self.http_pool = (http_pool or HTTPPoolConfig()).sized_for(max_concurrency)
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+    
+    def _get_client(self) -> AsyncOpenAI:
+        """Return the SDK client bound to the running event loop's connection pool"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=get_async_http_client(self.http_pool)
+            )
+            self._clients[loop] = client
+        return client
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the concurrency semaphore bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    async def generate_response(
+        self,
+        prompt: str,
+        temperature: float = 1.0,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        sample_index: int = 0,
+        phase: str = "call",
+        system: Optional[str] = None
+    ) -> str:
+        """
+        Generate a single response, waiting for a free concurrency slot
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            temperature: Controls randomness (0.0 to 2.0)
+            max_retries: Maximum number of retries on failure (default: the client's max_retries)
+            retry_delay: Delay between retries in seconds (default: the client's retry_delay)
+            sample_index: Slot of this sample among responses to the same prompt (cache key)
+            phase: RSA phase the call belongs to (for metrics)
+            system: Optional system message sent before the prompt
+            
+        Returns:
+            Generated response text
+        """
+        request_text = _request_text(prompt, system)
+        cached = self._cached(request_text, temperature, sample_index, phase)
+        if cached is not None:
+            return cached
+        
+        response = await self._create_with_retries(
+            prompt,
+            temperature,
+            self.max_retries if max_retries is None else max_retries,
+            self.retry_delay if retry_delay is None else retry_delay,
+            phase,
+            system=system
+        )
+        content = response.choices[0].message.content
+        self._store(request_text, temperature, content, sample_index)
+        return content
+    
+    async def _create_with_retries(
+        self,
+        prompt: str,
+        temperature: float,
+        max_retries: int,
+        retry_delay: float,
+        phase: str,
+        n: int = 1,
+        system: Optional[str] = None
+    ):
+        """
+        Send one chat completion request, retrying with backoff
+        
+        Args:
+            prompt: The prompt to send
+            temperature: Controls randomness
+            max_retries: Maximum number of attempts
+            retry_delay: Base delay between retries in seconds
+            phase: RSA phase the call belongs to (for metrics)
+            n: Number of completions requested in this single call
+            system: Optional system message sent before the prompt
+            
+        Returns:
+            The SDK chat completion response
+            
+        Raises:
+            NSamplingUnsupported: If n > 1 and the endpoint rejects the request
+        """
+        semaphore = self._get_semaphore()
+        call_id = self._call_queued(phase, n)
+        start = time.perf_counter()
+        estimated = estimate_tokens(_request_text(prompt, system))
+        waited = 0.0
+        sent = False
+        extra = {"n": n} if n > 1 else {}
+        
+        for attempt in range(max_retries):
+            try:
+                if self.rate_limiter:
+                    waited += await self.rate_limiter.acquire_async(estimated)
+                queued_at = time.perf_counter()
+                async with semaphore:
+                    waited += time.perf_counter() - queued_at
+                    self._emit("call_started", call_id=call_id, phase=phase, attempt=attempt + 1, waited=waited)
+                    sent = True
+                    response = await self._get_client().chat.completions.create(
+                        model=self.model_name,
+                        messages=_build_messages(prompt, system),
+                        temperature=temperature,
+                        **extra
+                    )
+                self._record_usage(estimated, response)
+                self._record_call(phase, start, waited, attempt, response, call_id=call_id)
+                return response
+            except asyncio.CancelledError:
+                # Abandoned by the caller, e.g. a hedged call that lost its race; a sent
+                # prompt is billed all the same, so count the limiter's estimate of it
+                self._record_call(
+                    phase, start, waited, attempt, call_id=call_id, cancelled=True,
+                    prompt_tokens=estimated if sent else 0
+                )
+                raise
+            except Exception as e:
+                if n > 1 and _is_bad_request(e):
+                    self._record_call(phase, start, waited, attempt, error=e, call_id=call_id)
+                    raise NSamplingUnsupported(str(e)) from e
+                # Backoff sleeps happen outside the semaphore so other calls can proceed
+                try:
+                    delay = self._retry_delay(e, attempt, max_retries, retry_delay, phase, call_id)
+                except Exception as final_error:
+                    self._record_call(phase, start, waited, attempt, error=final_error, call_id=call_id)
+                    raise
+                await asyncio.sleep(delay)
+    
+    async def stream_response(
+        self,
+        prompt: str,
+        temperature: float = 1.0,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        sample_index: int = 0,
+        phase: str = "call",
+        system: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a single response as text chunks arrive
+        
+        Failed attempts are retried only if no chunk has been yielded yet.
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            temperature: Controls randomness (0.0 to 2.0)
+            max_retries: Maximum number of retries on failure (default: the client's max_retries)
+            retry_delay: Delay between retries in seconds (default: the client's retry_delay)
+            sample_index: Slot of this sample among responses to the same prompt (cache key)
+            phase: RSA phase the call belongs to (for metrics)
+            system: Optional system message sent before the prompt
+            
+        Yields:
+            Text chunks of the generated response
+        """
+        request_text = _request_text(prompt, system)
+        cached = self._cached(request_text, temperature, sample_index, phase)
+        if cached is not None:
+            yield cached
+            return
+        
+        max_retries = self.max_retries if max_retries is None else max_retries
+        retry_delay = self.retry_delay if retry_delay is None else retry_delay
+        semaphore = self._get_semaphore()
+        call_id = self._call_queued(phase)
+        start = time.perf_counter()
+        estimated = estimate_tokens(_request_text(prompt, system))
+        waited = 0.0
+        chunks: List[str] = []
+        last_chunk = None
+        sent = False
+        
+        for attempt in range(max_retries):
+            try:
+                if self.rate_limiter:
+                    waited += await self.rate_limiter.acquire_async(estimated)
+                queued_at = time.perf_counter()
+                async with semaphore:
+                    waited += time.perf_counter() - queued_at
+                    self._emit("call_started", call_id=call_id, phase=phase, attempt=attempt + 1, waited=waited)
+                    sent = True
+                    stream = await self._get_client().chat.completions.create(
+                        model=self.model_name,
+                        messages=_build_messages(prompt, system),
+                        temperature=temperature,
+                        stream=True
+                    )
+                    async for chunk in stream:
+                        last_chunk = chunk
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            chunks.append(delta)
+                            yield delta
+                break
+            except (asyncio.CancelledError, GeneratorExit):
+                # Abandoned by the caller, e.g. a stream cut short by the run's deadline
+                self._record_call(
+                    phase, start, waited, attempt, call_id=call_id, cancelled=True,
+                    prompt_tokens=estimated if sent else 0,
+                    completion_tokens=estimate_tokens("".join(chunks)) if chunks else 0
+                )
+                raise
+            except Exception as e:
+                if chunks:
+                    self._record_call(phase, start, waited, attempt, error=e, call_id=call_id)
+                    raise
+                try:
+                    delay = self._retry_delay(e, attempt, max_retries, retry_delay, phase, call_id)
+                except Exception as final_error:
+                    self._record_call(phase, start, waited, attempt, error=final_error, call_id=call_id)
+                    raise
+                await asyncio.sleep(delay)
+        
+        self._record_call(phase, start, waited, attempt, last_chunk, call_id=call_id)
+        self._store(request_text, temperature, "".join(chunks), sample_index)
+    
+    async def generate_many(
+        self,
+        prompts: List[str],
+        temperature: float = 1.0,
+        phase: str = "call"
+    ) -> List[str]:
+        """
+        Generate one response per prompt concurrently, preserving order
+        
+        Args:
+            prompts: Prompts to send; the position is used as the cache sample slot
+            temperature: Controls randomness
+            phase: RSA phase the calls belong to (for metrics)
+            
+        Returns:
+            List of responses in the same order as prompts
+        """
+        tasks = [
+            self.generate_response(prompt, temperature, sample_index=i, phase=phase)
+            for i, prompt in enumerate(prompts)
+        ]
+        return list(await asyncio.gather(*tasks))
+    
+    async def generate_multiple_responses(
+        self,
+        prompt: str,
+        count: int,
+        temperature: float = 1.0,
+        phase: str = "population"
+    ) -> List[str]:
+        """
+        Generate multiple diverse responses for the same prompt concurrently
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            count: Number of responses to generate
+            temperature: Controls randomness
+            phase: RSA phase the calls belong to (for metrics)
+            
+        Returns:
+            List of generated responses
+        """
+        return await self.generate_many([prompt] * count, temperature, phase=phase)
+    
+    async def generate_n_responses(
+        self,
+        prompt: str,
+        count: int,
+        temperature: float = 1.0,
+        phase: str = "population"
+    ) -> List[str]:
+        """
+        Generate count responses using server-side n-sampling
+        
+        Chunks of up to max_n completions are requested concurrently, one
+        request per chunk. Falls back to one request per response if the
+        endpoint rejects or ignores n, or after a round that filled no slot.
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            count: Number of responses to generate
+            temperature: Controls randomness
+            phase: RSA phase the calls belong to (for metrics)
+            
+        Returns:
+            List of generated responses (slot i is cached as sample i)
+        """
+        results = self._cached_slots(prompt, temperature, count, phase)
+        missing = [i for i, r in enumerate(results) if r is None]
+        
+        while self.supports_n and len(missing) > 1:
+            chunks = [missing[i:i + self.max_n] for i in range(0, len(missing), self.max_n)]
+            responses = await asyncio.gather(
+                *(self._create_with_retries(prompt, temperature, self.max_retries, self.retry_delay, phase, n=len(chunk)) for chunk in chunks),
+                return_exceptions=True
+            )
+            rejected = None
+            for chunk, response in zip(chunks, responses):
+                if isinstance(response, NSamplingUnsupported):
+                    rejected = (len(chunk), response)
+                elif isinstance(response, BaseException):
+                    raise response
+                else:
+                    self._collect_choices(prompt, temperature, chunk, response, results)
+            if rejected is not None:
+                self._reduce_max_n(*rejected)
+            still_missing = [i for i in missing if results[i] is None]
+            if rejected is None and len(still_missing) == len(missing):
+                # Choices without content: asking again would loop forever
+                break
+            missing = still_missing
+        
+        if missing:
+            fallback = await asyncio.gather(*(
+                self.generate_response(prompt, temperature, sample_index=slot, phase=phase) for slot in missing
+            ))
+            for slot, response in zip(missing, fallback):
+                results[slot] = response
+        
+        return results
@@ -0,0 +1,124 @@
+"""
+Hedging Module
+Tail-latency mitigation: duplicate calls that run past a latency percentile
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from src.metrics import percentile
+
+T = TypeVar("T")
+
+# How often a call without enough latency samples checks the threshold again
+_RECHECK_SECONDS = 0.05
+
+
+class HedgePolicy:
+    """
+    Send a duplicate of a call that is slower than most calls of its kind
+    
+    Latencies are tracked at runtime per call kind ("population", "loop",
+    "final") over a sliding window. A call still running after the chosen
+    percentile of its kind gets a duplicate, up to max_hedges of them, and
+    the first answer wins; the copies still running are cancelled. Until a
+    kind has min_samples latencies its calls are never hedged, but they keep
+    checking, so the last stragglers of a stage are hedged once the faster
+    calls of that stage have finished. Latencies are measured around the
+    whole call, waits for a free concurrency slot included, so leave room
+    in max_concurrency for the duplicates.
+    """
+    
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_samples: int = 5,
+        max_hedges: int = 1,
+        min_delay: float = 0.0,
+        window: int = 200
+    ):
+        """
+        Initialize the policy
+        
+        Args:
+            percentile: Latency percentile after which a call is duplicated
+            min_samples: Latencies of a kind needed before its calls are hedged
+            max_hedges: Maximum duplicates per call
+            min_delay: Never hedge before this many seconds
+            window: Latencies kept per kind
+        """
+        if not (0.0 < percentile <= 100.0):
+            raise ValueError("percentile must be in (0, 100]")
+        if min_samples < 1:
+            raise ValueError("min_samples must be at least 1")
+        if max_hedges < 1:
+            raise ValueError("max_hedges must be at least 1")
+        if min_delay < 0:
+            raise ValueError("min_delay cannot be negative")
+        
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.min_delay = min_delay
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+    
+    def observe(self, kind: str, seconds: float):
+        """Record the latency of a finished call"""
+        self._latencies.setdefault(kind, deque(maxlen=self.window)).append(seconds)
+    
+    def delay(self, kind: str) -> Optional[float]:
+        """Seconds after which a call of this kind is duplicated (None = not enough samples yet)"""
+        latencies = self._latencies.get(kind)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(list(latencies), self.percentile))
+    
+    async def race(self, kind: str, call: Callable[[], Awaitable[T]]) -> Tuple[T, int, bool]:
+        """
+        Run a call, duplicating it while it is slower than the threshold
+        
+        A failed copy only fails the call once no other copy is running.
+        
+        Args:
+            kind: Call kind whose latencies set the threshold
+            call: Starts one copy of the call
+        
+        Returns:
+            Tuple of (first answer, duplicates sent, whether a duplicate won)
+        """
+        started = time.monotonic()
+        copies = [asyncio.ensure_future(call())]
+        running = set(copies)
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                timeout = None
+                hedge_due = False
+                if len(copies) <= self.max_hedges:
+                    threshold = self.delay(kind)
+                    if threshold is None:
+                        timeout = _RECHECK_SECONDS
+                    else:
+                        # The n-th duplicate goes out after n thresholds
+                        timeout = max(0.0, threshold * len(copies) - (time.monotonic() - started))
+                        hedge_due = True
+                
+                done, running = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for copy in done:
+                    if copy.exception() is None:
+                        self.observe(kind, time.monotonic() - started)
+                        return copy.result(), len(copies) - 1, copy is not copies[0]
+                    error = error or copy.exception()
+                if not running:
+                    raise error
+                if hedge_due and not done:
+                    hedge = asyncio.ensure_future(call())
+                    copies.append(hedge)
+                    running.add(hedge)
+        finally:
+            for copy in copies:
+                copy.cancel()
+            await asyncio.gather(*copies, return_exceptions=True)
@@ -0,0 +1,167 @@
+"""
+HTTP Pool Module
+Pooled HTTP clients shared by every OpenAI client in the process
+"""
+
+import atexit
+import asyncio
+import threading
+import importlib.util
+import weakref
+from typing import Dict, Optional, Tuple
+
+from openai import DefaultHttpxClient, DefaultAsyncHttpxClient, Timeout, DEFAULT_CONNECTION_LIMITS
+
+# Limits class of the httpx flavour the installed SDK is built on
+Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+
+def http2_available() -> bool:
+    """Return True if the optional h2 package needed for HTTP/2 is installed"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class HTTPPoolConfig:
+    """
+    Connection pool and timeout settings for the OpenAI HTTP clients
+    
+    Clients built from equal configs share one pool per process (one per event
+    loop for async clients), so orchestrators talking to the same endpoint
+    reuse warm keep-alive connections instead of paying a TLS handshake each.
+    """
+    
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 120.0,
+        connect_timeout: float = 10.0,
+        http2: Optional[bool] = None
+    ):
+        """
+        Initialize the pool settings
+        
+        Args:
+            max_connections: Maximum open connections (None = sized from the concurrency limit)
+            max_keepalive_connections: Idle connections kept open (None = max_connections)
+            keepalive_expiry: Seconds an idle connection stays open
+            timeout: Read/write/pool timeout in seconds
+            connect_timeout: Timeout for establishing a connection in seconds
+            http2: Negotiate HTTP/2 (None = only if the h2 package is installed)
+        """
+        if max_connections is not None and max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        if http2 and not http2_available():
+            raise ValueError("http2=True requires the h2 package (pip install h2)")
+        
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.http2 = http2_available() if http2 is None else http2
+    
+    def sized_for(self, concurrency: int) -> "HTTPPoolConfig":
+        """Return this config with max_connections defaulted to the concurrency limit"""
+        if self.max_connections is not None:
+            return self
+        return HTTPPoolConfig(
+            max_connections=max(1, concurrency),
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+            timeout=self.timeout,
+            connect_timeout=self.connect_timeout,
+            http2=self.http2
+        )
+    
+    def key(self) -> Tuple:
+        """Hashable identity of the settings (equal keys share a pool)"""
+        return (
+            self.max_connections,
+            self.max_keepalive_connections,
+            self.keepalive_expiry,
+            self.timeout,
+            self.connect_timeout,
+            self.http2,
+        )
+    
+    def client_kwargs(self) -> Dict:
+        """Keyword arguments for the SDK's httpx client classes"""
+        max_connections = self.max_connections or DEFAULT_CONNECTION_LIMITS.max_connections
+        return {
+            "limits": Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=self.max_keepalive_connections or max_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            "timeout": Timeout(self.timeout, connect=self.connect_timeout),
+            "http2": self.http2,
+        }
+
+
+_lock = threading.Lock()
+_sync_clients: Dict[Tuple, DefaultHttpxClient] = {}
+# Async connections belong to the event loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, DefaultAsyncHttpxClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client(config: HTTPPoolConfig) -> DefaultHttpxClient:
+    """
+    Return the process-wide sync HTTP client for a config, creating it once
+    
+    Args:
+        config: Pool settings
+        
+    Returns:
+        Shared httpx client (thread-safe)
+    """
+    with _lock:
+        client = _sync_clients.get(config.key())
+        if client is None or client.is_closed:
+            client = DefaultHttpxClient(**config.client_kwargs())
+            _sync_clients[config.key()] = client
+        return client
+
+
+def get_async_http_client(config: HTTPPoolConfig) -> DefaultAsyncHttpxClient:
+    """
+    Return the async HTTP client for a config on the running event loop
+    
+    Args:
+        config: Pool settings
+        
+    Returns:
+        Async httpx client shared by every caller on this loop
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(config.key())
+        if client is None or client.is_closed:
+            client = DefaultAsyncHttpxClient(**config.client_kwargs())
+            clients[config.key()] = client
+        return client
+
+
+async def aclose_http_clients():
+    """Close the async clients opened on the running event loop"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = list(_async_clients.pop(loop, {}).values())
+    for client in clients:
+        await client.aclose()
+
+
+def close_http_clients():
+    """Close every shared sync client"""
+    with _lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_http_clients)
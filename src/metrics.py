@@ -0,0 +1,193 @@
+"""
+Metrics Module
+Per-call latency, wait time, retries and token usage, summarized per RSA phase
+"""
+
+import json
+import math
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.events import current_run_id
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of values
+    
+    Args:
+        values: Sample values
+        pct: Percentile in [0, 100]
+        
+    Returns:
+        The percentile value (0.0 for an empty list)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def usage_tokens(response) -> Dict[str, int]:
+    """
+    Extract token counts from a completion's usage block
+    
+    Args:
+        response: Chat completion (or final stream chunk) returned by the SDK
+        
+    Returns:
+        Dict with prompt_tokens, completion_tokens and cached_tokens (the part
+        of the prompt served from the provider's prefix cache), 0 when not reported
+    """
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+    }
+
+
+class MetricsCollector:
+    """
+    Thread-safe recorder of per-call metrics
+    
+    Every client call appends one record tagged with the RSA phase it belongs
+    to ("population", "loop N", "final") and the id of the run that made it;
+    summary() aggregates them, per run if asked to.
+    """
+    
+    def __init__(self):
+        """Initialize an empty collector"""
+        self._records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+    
+    def record(
+        self,
+        phase: str,
+        model: str,
+        wall_time: float,
+        wait_time: float = 0.0,
+        retries: int = 0,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        cache_hit: bool = False,
+        error: Optional[str] = None,
+        cancelled: bool = False
+    ):
+        """
+        Append the metrics of one finished call
+        
+        Args:
+            phase: RSA phase the call belongs to
+            model: Model that served the call
+            wall_time: Seconds from the call's start to its end, waits included
+            wait_time: Seconds spent queued on the rate limiter or concurrency cap
+            retries: Number of failed attempts before the final one
+            prompt_tokens: Prompt tokens reported by the provider
+            completion_tokens: Completion tokens reported by the provider
+            cached_tokens: Prompt tokens the provider served from its prefix cache
+            cache_hit: Whether the response came from the local cache
+            error: Error message if the call ultimately failed
+            cancelled: Whether the call was abandoned before it finished (e.g. a
+                hedged call that lost its race); its cost is counted all the same
+        """
+        entry = {
+            "run_id": current_run_id(),
+            "phase": phase,
+            "model": model,
+            "finished_at": time.time(),
+            "wall_time": wall_time,
+            "wait_time": wait_time,
+            "retries": retries,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "cache_hit": cache_hit,
+            "error": error,
+            "cancelled": cancelled,
+        }
+        with self._lock:
+            self._records.append(entry)
+    
+    def mark(self) -> int:
+        """Return a position to summarize only the calls recorded after it"""
+        with self._lock:
+            return len(self._records)
+    
+    def records(self, since: int = 0, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return a copy of the records from position since onwards (only those of run_id if given)"""
+        with self._lock:
+            records = list(self._records[since:])
+        if run_id is not None:
+            records = [e for e in records if e["run_id"] == run_id]
+        return records
+    
+    def summary(self, since: int = 0, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aggregate the records into totals, per-phase and per-model statistics
+        
+        Args:
+            since: Position returned by mark() at the start of the run
+            run_id: Only aggregate the calls of this run (None = every call),
+                which keeps the runs of one collector apart when they overlap
+            
+        Returns:
+            Dict with "totals", "phases" and "models" (in first-seen order)
+        """
+        records = self.records(since, run_id)
+        phases = {}
+        
+        for name in dict.fromkeys(e["phase"] for e in records):
+            entries = [e for e in records if e["phase"] == name]
+            latencies = [e["wall_time"] for e in entries]
+            phases[name] = self._aggregate(entries)
+            phases[name]["p50_latency"] = percentile(latencies, 50)
+            phases[name]["p95_latency"] = percentile(latencies, 95)
+        
+        models = {
+            name: self._aggregate([e for e in records if e["model"] == name])
+            for name in dict.fromkeys(e["model"] for e in records)
+        }
+        
+        return {"totals": self._aggregate(records), "phases": phases, "models": models}
+    
+    @staticmethod
+    def _aggregate(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sum the counters of a list of records"""
+        return {
+            "calls": len(entries),
+            "failures": sum(1 for e in entries if e["error"] is not None),
+            "cache_hits": sum(1 for e in entries if e["cache_hit"]),
+            "cancelled": sum(1 for e in entries if e["cancelled"]),
+            "retries": sum(e["retries"] for e in entries),
+            "prompt_tokens": sum(e["prompt_tokens"] for e in entries),
+            "completion_tokens": sum(e["completion_tokens"] for e in entries),
+            "cached_tokens": sum(e["cached_tokens"] for e in entries),
+            "call_time": sum(e["wall_time"] for e in entries),
+            "wait_time": sum(e["wait_time"] for e in entries),
+            "elapsed": (
+                max(e["finished_at"] for e in entries)
+                - min(e["finished_at"] - e["wall_time"] for e in entries)
+            ) if entries else 0.0,
+        }
+    
+    def export_json(self, path: str, since: int = 0, run_id: Optional[str] = None):
+        """
+        Write the summary and the raw records to a JSON file
+        
+        Args:
+            path: Output file path
+            since: Position returned by mark() at the start of the run
+            run_id: Only export the calls of this run (None = every call)
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"summary": self.summary(since, run_id), "calls": self.records(since, run_id)},
+                f,
+                ensure_ascii=False,
+                indent=2
+            )
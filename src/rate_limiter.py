@@ -0,0 +1,170 @@
+"""
+Rate Limiter Module
+Proactive token-bucket limiting of requests and tokens per minute
+"""
+
+import time
+import asyncio
+import threading
+from typing import Callable, List, Optional
+
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously at a fixed rate
+    
+    Reservations may take the level below zero; the deficit is the time the
+    caller has to wait, which keeps concurrent callers in arrival order.
+    """
+    
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        """
+        Initialize a full bucket
+        
+        Args:
+            capacity: Maximum number of units the bucket holds
+            refill_per_second: Units added back per second
+            now: Current clock reading
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated_at = now
+    
+    def _refill(self, now: float):
+        """Add the units accumulated since the last update"""
+        elapsed = max(0.0, now - self.updated_at)
+        self.level = min(self.capacity, self.level + elapsed * self.refill_per_second)
+        self.updated_at = now
+    
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Take amount units from the bucket
+        
+        Args:
+            amount: Units to consume
+            now: Current clock reading
+            
+        Returns:
+            Seconds the caller must wait before the units are available
+        """
+        self._refill(now)
+        self.level -= amount
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.refill_per_second
+    
+    def refund(self, amount: float, now: float):
+        """Return units to the bucket (negative amount consumes more)"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter shared by all calls
+    
+    Safe to use from several threads and from asyncio tasks: the lock is held
+    only while computing a reservation, never while sleeping.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize rate limiter
+        
+        Args:
+            requests_per_minute: Request budget per minute (None = unlimited)
+            tokens_per_minute: Estimated token budget per minute (None = unlimited)
+            clock: Monotonic clock function, injectable for testing
+        """
+        if requests_per_minute is not None and requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        if tokens_per_minute is not None and tokens_per_minute <= 0:
+            raise ValueError("tokens_per_minute must be positive")
+        
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        
+        now = clock()
+        self._request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60.0, now)
+            if requests_per_minute else None
+        )
+        self._token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, now)
+            if tokens_per_minute else None
+        )
+    
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve one request and the given tokens without sleeping
+        
+        Args:
+            tokens: Estimated tokens the request will consume
+            
+        Returns:
+            Seconds the caller must wait before sending the request
+        """
+        with self._lock:
+            now = self._clock()
+            waits: List[float] = [self._blocked_until - now]
+            if self._request_bucket:
+                waits.append(self._request_bucket.reserve(1, now))
+            if self._token_bucket and tokens:
+                waits.append(self._token_bucket.reserve(tokens, now))
+            return max(0.0, *waits)
+    
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Block the current thread until the request may be sent
+        
+        Returns:
+            Seconds waited
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        Suspend the current task until the request may be sent
+        
+        Returns:
+            Seconds waited
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+    
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """
+        Correct the token bucket once the real usage of a call is known
+        
+        Args:
+            estimated_tokens: Tokens reserved before the call
+            actual_tokens: Tokens reported by the provider
+        """
+        if not self._token_bucket:
+            return
+        with self._lock:
+            self._token_bucket.refund(estimated_tokens - actual_tokens, self._clock())
+    
+    def pause(self, seconds: float):
+        """
+        Hold every caller back for the given time (e.g. from a Retry-After header)
+        
+        Args:
+            seconds: Time during which no request may be sent
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
@@ -0,0 +1,154 @@
+"""
+Response Cache Module
+Persistent SQLite cache of model responses with TTL and size-based LRU eviction
+"""
+
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Callable, Optional
+
+
+DEFAULT_CACHE_PATH = ".rsa_cache.sqlite3"
+
+
+class ResponseCache:
+    """
+    On-disk cache keyed by (model, prompt, temperature, sample slot)
+    
+    The sample slot keeps distinct population members distinct: the i-th
+    response to a prompt is cached separately from the j-th one.
+    """
+    
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_bytes: Optional[int] = 100 * 1024 * 1024,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Open (or create) the cache database
+        
+        Args:
+            path: SQLite file path (":memory:" for a process-local cache)
+            ttl_seconds: Entry lifetime in seconds (None = never expires)
+            max_bytes: Total response size kept before evicting least recently used
+            clock: Wall clock function, injectable for testing
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, sample_index: int = 0) -> str:
+        """
+        Build the cache key for a request
+        
+        Args:
+            model: Model name
+            prompt: Full prompt text
+            temperature: Sampling temperature
+            sample_index: Slot of this sample among responses to the same prompt
+            
+        Returns:
+            Hex digest identifying the request
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        raw = f"{model}\x00{prompt_hash}\x00{temperature:.4f}\x00{sample_index}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def get(self, model: str, prompt: str, temperature: float, sample_index: int = 0) -> Optional[str]:
+        """
+        Look up a cached response
+        
+        Returns:
+            The cached response, or None on miss or expiry
+        """
+        key = self.make_key(model, prompt, temperature, sample_index)
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return response
+    
+    def put(self, model: str, prompt: str, temperature: float, response: str, sample_index: int = 0):
+        """
+        Store a response and evict old entries if over the size limit
+        """
+        key = self.make_key(model, prompt, temperature, sample_index)
+        now = self._clock()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+    
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        if self.max_bytes is None:
+            return
+        
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        stale = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+    
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
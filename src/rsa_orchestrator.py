@@ -3,9 +3,46 @@ RSA (Recursive Self-Aggregation) Orchestrator
 Main class that implements the complete RSA pipeline
 """
 
-from typing import List, Optional
-from src.gemini_client import OpenAIClient
-from src.aggregation import create_groups, create_aggregation_prompt, create_final_aggregation_prompt
+import asyncio
+import contextvars
+import copy
+import random
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from src.gemini_client import GITHUB_MODELS_BASE_URL
+from src.backends import LLMBackend, OpenAICompatibleBackend
+from src.rate_limiter import RateLimiter
+from src.response_cache import ResponseCache
+from src.checkpoint import save_checkpoint, load_checkpoint
+from src.similarity import population_diversity, deduplicate
+from src.metrics import MetricsCollector
+from src.budget import RunBudget, BudgetExceeded
+from src.events import EventBus, console_sink, start_run, current_run_id
+from src.hedging import HedgePolicy
+from src.degradation import FailurePolicy, StageFailed
+from src.tiering import ModelLimits, TieredBackend, phase_kind
+from src.http_pool import HTTPPoolConfig, aclose_http_clients
+from src.aggregation import (
+    GROUPING_STRATEGIES,
+    PROMPT_LAYOUTS,
+    estimate_tokens,
+    create_groups,
+    create_subset_groups,
+    schedule_sizes,
+    create_aggregation_prompt,
+    create_final_aggregation_prompt,
+    create_aggregation_messages,
+    create_final_aggregation_messages,
+)
+
+
+# Extra generation rounds used to refill a deduplicated population
+MAX_TOP_UP_ROUNDS = 3
+
+# How often an async stage checks the run's spending against its token and call limits
+SPENDING_CHECK_SECONDS = 0.05
 
 
 class RSAOrchestrator:
@@ -21,7 +58,38 @@ class RSAOrchestrator:
         group_size: int = 4,
         loops: int = 3,
         temperature: float = 1.0,
-        verbose: bool = True
+        verbose: bool = True,
+        max_concurrency: int = 8,
+        max_workers: int = 1,
+        executor: Optional[Executor] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        checkpoint_path: Optional[str] = None,
+        grouping_strategy: str = "sequential",
+        max_group_tokens: Optional[int] = None,
+        convergence_threshold: Optional[float] = None,
+        metrics: Optional[MetricsCollector] = None,
+        base_url: str = GITHUB_MODELS_BASE_URL,
+        backend: Optional[LLMBackend] = None,
+        n_sampling: bool = True,
+        max_n: int = 8,
+        prompt_layout: str = "classic",
+        http_pool: Optional[HTTPPoolConfig] = None,
+        dedup_threshold: Optional[float] = None,
+        dedup_top_up: bool = False,
+        population_schedule: Union[str, Sequence[int]] = "shrink",
+        schedule_ratio: float = 0.5,
+        schedule_seed: int = 0,
+        budget: Optional[RunBudget] = None,
+        events: Optional[EventBus] = None,
+        dataflow: bool = False,
+        hedge: Optional[HedgePolicy] = None,
+        population_extra: int = 0,
+        failure_policy: Optional[FailurePolicy] = None,
+        phase_models: Optional[Dict[str, str]] = None,
+        model_limits: Optional[Dict[str, ModelLimits]] = None
     ):
         """
         Initialize RSA Orchestrator
@@ -33,53 +101,311 @@ class RSAOrchestrator:
             group_size: Size of groups for aggregation (k parameter)
             loops: Number of RSA iteration rounds
             temperature: Temperature for response generation (diversity)
-            verbose: Whether to print progress messages
+            verbose: Whether to print progress messages (subscribes console_sink to the event bus;
+                without it they are only log events for the bus's other sinks)
+            max_concurrency: Maximum number of requests in flight for run_async
+            max_workers: Number of threads used to aggregate groups in run (1 = serial)
+            executor: Optional executor for group aggregation (overrides max_workers)
+            requests_per_minute: Request budget shared by all calls (None = unlimited)
+            tokens_per_minute: Estimated token budget shared by all calls (None = unlimited)
+            rate_limiter: Existing limiter to share (overrides the per-minute budgets)
+            cache: Optional persistent response cache shared by sync and async calls
+            checkpoint_path: File where the population is saved after every stage (None = disabled)
+            grouping_strategy: "sequential" (by position) or "balanced" (by estimated tokens)
+            max_group_tokens: Token budget for the solutions of one aggregation call (balanced only)
+            convergence_threshold: Stop looping once population diversity drops below this (None = always run all loops)
+            metrics: Collector for per-call metrics (a new one is created if None)
+            base_url: OpenAI-compatible endpoint for both clients (default: GitHub Models)
+            backend: Model backend to use instead of building one from api_key/base_url (it applies its
+                own rate limits, so rate_limiter and the per-minute budgets cannot be combined with it)
+            n_sampling: Request the initial population with server-side n-sampling when supported
+            max_n: Largest n requested in one call (ignored with an injected backend)
+            prompt_layout: "classic" (one user message) or "shared-prefix" (instructions and
+                problem in a system message, solutions last) to exploit provider prompt caching
+            http_pool: Connection pool settings shared with other orchestrators using equal settings
+                (default: pool sized to the larger of max_concurrency and max_workers)
+            dedup_threshold: Drop initial responses whose shingle Jaccard similarity to an earlier
+                one is at least this (exact duplicates always; None = keep every response)
+            dedup_top_up: Generate extra samples to restore population_size after deduplication
+            population_schedule: "shrink" (partition into groups, dividing the population by group_size
+                each loop), "constant" (population_size outputs per loop, each from a random k-subset),
+                "geometric" (size multiplied by schedule_ratio each loop) or a list of per-loop sizes
+            schedule_ratio: Per-loop shrink factor of the "geometric" schedule
+            schedule_seed: Seed for the random k-subsets (groups are reproducible per prompt and loop)
+            budget: Per-run deadline, token and call limits; when the next loop would not fit the
+                remaining loops are skipped and a stage running into the deadline is cancelled
+            events: Bus receiving structured run, stage and call events (a new one is created if None);
+                attach sinks such as LoggingSink, JSONLSink or ProgressSink to trace runs
+            dataflow: In async runs, send each group as soon as the responses it aggregates are
+                done instead of waiting for the whole previous loop (same groups and results)
+            hedge: In async runs, send a duplicate of any call slower than a latency percentile
+                tracked at runtime and keep the first answer (the losing copy is cancelled); the
+                initial population stays one n-sampling request, hedged as a whole
+            population_extra: In async runs, request population_size + population_extra initial
+                samples, one call each, and keep the first population_size to finish
+            failure_policy: What to do with calls that fail after their retries: drop them, reuse
+                an input of the failed group, regroup, or fail the run (default: drop failed samples
+                and groups, fail on a failed final aggregation); see last_run_stats["degradation"]
+            phase_models: Model per phase ("population", "loop", "final" or "loop N"); phases without
+                an entry use model_name. Every model gets its own backend, concurrency and rate budget
+            model_limits: Concurrency and rate budget per model name (default: max_concurrency,
+                requests_per_minute and tokens_per_minute, separately for every model)
         """
-        self.client = OpenAIClient(api_key=api_key, model_name=model_name)
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        
+        if grouping_strategy not in GROUPING_STRATEGIES:
+            raise ValueError(f"grouping_strategy must be one of {GROUPING_STRATEGIES}")
+        
+        if prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"prompt_layout must be one of {PROMPT_LAYOUTS}")
+        
+        if dedup_threshold is not None and not (0.0 < dedup_threshold <= 1.0):
+            raise ValueError("dedup_threshold must be in (0, 1]")
+        
+        # Validates the schedule; None means the classic shrinking partition
+        self.schedule_targets = schedule_sizes(population_schedule, population_size, loops, schedule_ratio)
+        if self.schedule_targets is not None and grouping_strategy != "sequential":
+            raise ValueError("grouping_strategy only applies to the 'shrink' population schedule")
+        
+        if population_extra < 0:
+            raise ValueError("population_extra cannot be negative")
+        
+        # Dataflow groups are fixed by position before any response exists
+        if dataflow and (grouping_strategy != "sequential" or convergence_threshold is not None or budget is not None):
+            raise ValueError("dataflow requires sequential grouping and no convergence_threshold or budget")
+        
+        if dataflow and failure_policy is not None and failure_policy.loop == "regroup":
+            raise ValueError("dataflow cannot regroup failed groups (groups are fixed before any response exists)")
+        
+        if budget is not None and budget.limits_spending() and (hedge is not None or population_extra):
+            raise ValueError("token and call budgets cannot plan for hedged or spare calls: use a deadline-only budget")
+        
+        if phase_models and (backend is not None or rate_limiter is not None):
+            raise ValueError("phase_models builds one backend and limiter per model: pass a TieredBackend as backend instead")
+        
+        if backend is not None and (rate_limiter is not None or requests_per_minute or tokens_per_minute):
+            raise ValueError("an injected backend applies its own rate limits: configure them on the backend instead")
+        
+        if backend is None and rate_limiter is None and (requests_per_minute or tokens_per_minute) and not phase_models:
+            rate_limiter = RateLimiter(
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute
+            )
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metrics = metrics or (backend.metrics if backend is not None else None) or MetricsCollector()
+        self.events = events or getattr(backend, "events", None) or EventBus()
+        if verbose:
+            # Progress messages, retries and client warnings reach the console through the event bus
+            self.events.subscribe(console_sink)
+        self._metrics_mark = 0
+        self.checkpoint_path = checkpoint_path
+        self.grouping_strategy = grouping_strategy
+        self.prompt_layout = prompt_layout
+        self.dedup_threshold = dedup_threshold
+        self.dedup_top_up = dedup_top_up
+        self.population_schedule = population_schedule if isinstance(population_schedule, str) else list(population_schedule)
+        self.schedule_ratio = schedule_ratio
+        self.schedule_seed = schedule_seed
+        self.max_group_tokens = max_group_tokens
+        self.convergence_threshold = convergence_threshold
+        self.budget = budget
+        self.dataflow = dataflow
+        self.hedge = hedge
+        self.population_extra = population_extra
+        self.failure_policy = failure_policy or FailurePolicy()
+        self._stage_cancelled = threading.Event()
+        self._stage_final_tokens: Optional[int] = None
+        self.last_run_stats: Dict[str, Any] = {}
+        
+        model_limits = model_limits or {}
+        if backend is None:
+            models = dict.fromkeys([model_name, *(phase_models or {}).values()])
+            connections = sum(
+                (model_limits.get(model) or ModelLimits()).max_concurrency or max_concurrency for model in models
+            )
+            pool_config = (http_pool or HTTPPoolConfig()).sized_for(max(connections, max_workers))
+            
+            def make_backend(model: str) -> OpenAICompatibleBackend:
+                limiter = rate_limiter
+                limits = model_limits.get(model) or ModelLimits()
+                if phase_models or limits.requests_per_minute or limits.tokens_per_minute:
+                    rpm = limits.requests_per_minute or requests_per_minute
+                    tpm = limits.tokens_per_minute or tokens_per_minute
+                    limiter = RateLimiter(requests_per_minute=rpm, tokens_per_minute=tpm) if rpm or tpm else None
+                return OpenAICompatibleBackend(
+                    base_url=base_url,
+                    api_key=api_key,
+                    model_name=model,
+                    max_concurrency=limits.max_concurrency or max_concurrency,
+                    rate_limiter=limiter,
+                    cache=cache,
+                    metrics=self.metrics,
+                    use_n_sampling=n_sampling,
+                    max_n=max_n,
+                    http_pool=pool_config,
+                    events=self.events
+                )
+            
+            if phase_models:
+                backend = TieredBackend.from_models(phase_models, model_name, make_backend)
+            else:
+                backend = make_backend(model_name)
+        else:
+            backend.metrics = self.metrics
+            backend.events = self.events
+            model_name = backend.model_name
+        self.backend = backend
+        self.model_name = model_name
         self.population_size = population_size
         self.group_size = group_size
         self.loops = loops
         self.temperature = temperature
         self.verbose = verbose
+        self.max_concurrency = max_concurrency
+        self.max_workers = max_workers
+        self.executor = executor
         
-        if self.verbose:
-            print(f"🚀 RSA Orchestrator initialized:")
-            print(f"   - Model: {model_name}")
-            print(f"   - Population size: {population_size}")
-            print(f"   - Group size: {group_size}")
-            print(f"   - Loops: {loops}")
-            print(f"   - Temperature: {temperature}")
+        if self.events.active:
+            self._log(f"🚀 RSA Orchestrator initialized:")
+            self._log(f"   - Model: {model_name} ({type(backend).__name__})")
+            if isinstance(backend, TieredBackend):
+                self._log(f"   - Models per phase: {', '.join(f'{phase}={model}' for phase, model in backend.models().items())}")
+                for model, limits in model_limits.items():
+                    self._log(f"   - {model}: {limits.max_concurrency or max_concurrency} concurrentes, "
+                              f"{limits.requests_per_minute or requests_per_minute or '∞'} RPM, "
+                              f"{limits.tokens_per_minute or tokens_per_minute or '∞'} TPM")
+            self._log(f"   - Population size: {population_size}")
+            self._log(f"   - Group size: {group_size}")
+            self._log(f"   - Loops: {loops}")
+            if self.schedule_targets is not None:
+                self._log(f"   - Population schedule: {self.population_schedule} → {self.schedule_targets}")
+            self._log(f"   - Temperature: {temperature}")
+            self._log(f"   - Max concurrency (async): {max_concurrency}")
+            self._log(f"   - Max workers (sync): {max_workers}")
+            if rate_limiter:
+                self._log(f"   - Rate limit: {rate_limiter.requests_per_minute or '∞'} RPM, {rate_limiter.tokens_per_minute or '∞'} TPM")
+            if cache is not None:
+                self._log(f"   - Response cache: {cache.path}")
+            if checkpoint_path:
+                self._log(f"   - Checkpoint: {checkpoint_path}")
+            if grouping_strategy != "sequential":
+                self._log(f"   - Grouping: {grouping_strategy} (max {max_group_tokens or '∞'} tokens/grupo)")
+            if convergence_threshold is not None:
+                self._log(f"   - Convergence threshold (diversity): {convergence_threshold}")
+            if dataflow:
+                self._log(f"   - Execution (async): dataflow (sin barrera entre loops)")
+            if hedge is not None:
+                self._log(f"   - Hedging (async): duplicado tras p{hedge.percentile:g} de latencia (máx. {hedge.max_hedges})")
+            if population_extra:
+                self._log(f"   - Population (async): {population_size}+{population_extra} muestras, se usan las {population_size} primeras")
+            if failure_policy is not None:
+                self._log(f"   - Failure policy: población {failure_policy.population}, loops {failure_policy.loop}, "
+                          f"final {failure_policy.final} (mín. {failure_policy.min_survival:.0%} de llamadas con éxito)")
+            if budget is not None:
+                self._log(f"   - Budget: {budget.deadline or '∞'}s, {budget.max_tokens or '∞'} tokens, {budget.max_calls or '∞'} llamadas")
     
     def _log(self, message: str):
-        """Print message if verbose mode is enabled"""
-        if self.verbose:
-            print(message)
+        """Publish a progress message as a log event (console_sink prints it in verbose mode)"""
+        self._emit("log", message=message)
+    
+    def _emit(self, event_type: str, **fields):
+        """Publish a structured event if a sink is listening"""
+        if self.events.active:
+            self.events.emit(event_type, **fields)
     
-    def generate_initial_population(self, prompt: str) -> List[str]:
+    def generate_initial_population(self, prompt: str, count: Optional[int] = None) -> List[str]:
         """
         Generate initial population of diverse responses
         
         Args:
             prompt: User's original prompt
+            count: Responses to generate (default: population_size)
             
         Returns:
             List of initial responses
         """
+        count = self.population_size if count is None else count
         self._log(f"\n{'='*60}")
         self._log(f"📝 FASE 1: Generación de población inicial")
         self._log(f"{'='*60}")
-        self._log(f"Generando {self.population_size} respuestas diversas...\n")
+        self._log(f"Generando {count} respuestas diversas...\n")
+        self._emit("stage_started", stage="population", size=count)
         
-        responses = self.client.generate_multiple_responses(
-            prompt=prompt,
-            count=self.population_size,
-            temperature=self.temperature,
-            delay=1.0
-        )
+        try:
+            responses = self.backend.generate_n(
+                prompt,
+                count=count,
+                temperature=self.temperature,
+                phase="population"
+            )
+        except Exception as e:
+            if self.failure_policy.population == "fail":
+                raise
+            self._log(f"⚠️  La generación de la población falló ({e}): pidiendo las respuestas una a una")
+            results = []
+            for i in range(count):
+                try:
+                    results.append(
+                        self.backend.generate(prompt, temperature=self.temperature, sample_index=i, phase="population")
+                    )
+                except Exception as error:
+                    results.append(error)
+            responses = self._settle_stage("population", results, "drop")
         
         self._log(f"\n✅ Población inicial generada: {len(responses)} respuestas")
+        self._emit("stage_finished", stage="population", size=len(responses), failed=count - len(responses))
         return responses
     
+    def _remove_duplicates(self, population: List[str]) -> List[str]:
+        """Drop exact and near-duplicate responses, keeping first occurrences"""
+        kept = [population[i] for i in deduplicate(population, self.dedup_threshold)]
+        removed = len(population) - len(kept)
+        if removed:
+            self.last_run_stats["duplicates_removed"] += removed
+            self._log(f"🧹 {removed} respuestas duplicadas o casi idénticas eliminadas ({len(kept)} únicas)")
+        return kept
+    
+    def _missing_samples(self, prompt: str, population: List[str], next_index: int, size: int) -> range:
+        """Sample indices to request so the population gets back to size (as many as the budget allows)"""
+        missing = size - len(population)
+        return range(next_index, next_index + self._affordable_samples(prompt, population, missing))
+    
+    def _deduplicate_population(self, prompt: str, population: List[str], size: Optional[int] = None) -> List[str]:
+        """
+        Deduplicate the initial population, topping it up with new samples if enabled
+        
+        Top-up samples use sample indices past population_size, so cached
+        duplicates are not served again. Gives up after MAX_TOP_UP_ROUNDS
+        rounds when the model keeps producing the same answer.
+        
+        Args:
+            prompt: User's original prompt
+            population: Freshly generated population
+            size: Population size to top up to (default: population_size)
+            
+        Returns:
+            Population without duplicates
+        """
+        if self.dedup_threshold is None:
+            return population
+        
+        population = self._remove_duplicates(population)
+        next_index = self.population_size
+        for _ in range(MAX_TOP_UP_ROUNDS if self.dedup_top_up else 0):
+            missing = self._missing_samples(prompt, population, next_index, size or self.population_size)
+            if not missing:
+                break
+            self._log(f"➕ Generando {len(missing)} respuestas adicionales para reponer la población...")
+            extra = [
+                self.backend.generate(prompt, temperature=self.temperature, sample_index=i, phase="population")
+                for i in missing
+            ]
+            next_index = missing.stop
+            population = self._remove_duplicates(population + extra)
+        return population
+    
     def aggregate_population(self, responses: List[str], original_prompt: str, loop_num: int) -> List[str]:
         """
         Perform one round of aggregation on the population
@@ -97,65 +423,1623 @@ class RSAOrchestrator:
         self._log(f"{'='*60}")
         
         # Create groups
-        groups = create_groups(responses, self.group_size)
+        groups = self._create_groups(responses, original_prompt, loop_num)
         self._log(f"Dividiendo {len(responses)} respuestas en {len(groups)} grupos de tamaño ~{self.group_size}")
         
         # Aggregate each group
-        new_population = []
-        for i, group in enumerate(groups, 1):
-            self._log(f"\n🔀 Agregando grupo {i}/{len(groups)} ({len(group)} respuestas)...")
+        requests = [self._aggregation_request(group, original_prompt) for group in groups]
+        self._emit("stage_started", stage=f"loop {loop_num}", size=len(groups))
+        results = self._generate_groups(
+            requests,
+            temperature=0.7,  # Lower temperature for aggregation
+            phase=f"loop {loop_num}"
+        )
+        if self._stage_cancelled.is_set():
+            # The run already moved on: these results are discarded
+            raise BudgetExceeded("Stage cancelled by the run budget")
+        self._raise_spending_stop(results)
+        
+        failed = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+        for i in failed:
+            self._log(f"   ✗ Grupo {i + 1} falló: {results[i]}")
+        
+        recovered = 0
+        if failed and self.failure_policy.loop == "regroup":
+            self._log(f"🔁 Reagrupando {len(failed)} grupos fallidos...")
+            regroups = self._affordable_regroups(
+                self._regroup(responses, original_prompt, loop_num, len(failed)), responses, original_prompt
+            )
+            retried = self._generate_groups(
+                [self._aggregation_request(group, original_prompt) for group in regroups],
+                temperature=0.7,
+                phase=f"loop {loop_num}"
+            )
+            self._raise_spending_stop(retried)
+            for i, result in zip(failed, retried):
+                if not isinstance(result, Exception):
+                    results[i] = result
+                    recovered += 1
+        
+        new_population = self._settle_stage(
+            f"loop {loop_num}", results, self.failure_policy.loop, groups=groups, recovered=recovered
+        )
+        
+        self._log(f"\n✅ Loop {loop_num} completado: {len(new_population)} respuestas agregadas")
+        self._emit("stage_finished", stage=f"loop {loop_num}", size=len(new_population), failed=len(failed) - recovered)
+        return new_population
+    
+    def _create_groups(self, responses: List[str], original_prompt: str, loop_num: int) -> List[List[str]]:
+        """
+        Group the population for one loop according to the population schedule
+        
+        Args:
+            responses: Current population
+            original_prompt: Original user prompt (seeds the random subsets)
+            loop_num: Current loop number
             
-            # Create aggregation prompt
-            agg_prompt = create_aggregation_prompt(group, original_prompt)
+        Returns:
+            One group per aggregation call of this loop
+        """
+        if self.schedule_targets is not None:
+            rng = random.Random(f"{self.schedule_seed}:{loop_num}:{original_prompt}")
+            return create_subset_groups(responses, self.group_size, self.schedule_targets[loop_num - 1], rng)
+        return create_groups(
+            responses,
+            self.group_size,
+            strategy=self.grouping_strategy,
+            max_group_tokens=self.max_group_tokens
+        )
+    
+    def _aggregation_request(self, group: List[str], original_prompt: str) -> Tuple[Optional[str], str]:
+        """(system message, prompt) of one group's aggregation call in the configured layout"""
+        if self.prompt_layout == "shared-prefix":
+            return create_aggregation_messages(group, original_prompt)
+        return None, create_aggregation_prompt(group, original_prompt)
+    
+    def _final_request(self, population: List[str], original_prompt: str) -> Tuple[Optional[str], str]:
+        """(system message, prompt) of the final aggregation call in the configured layout"""
+        if self.prompt_layout == "shared-prefix":
+            return create_final_aggregation_messages(population, original_prompt)
+        return None, create_final_aggregation_prompt(population, original_prompt)
+    
+    def _generate_groups(self, requests: List[Tuple[Optional[str], str]], temperature: float, phase: str) -> List[object]:
+        """
+        Generate one response per group prompt, serially or on an executor
+        
+        Errors are isolated per group: a failing group yields its exception
+        in the result list instead of aborting the others.
+        
+        Args:
+            requests: One (system message, prompt) pair per group
+            temperature: Temperature for the aggregation calls
+            phase: RSA phase the calls belong to (for metrics)
             
-            # Get aggregated response
-            aggregated = self.client.generate_response(
-                prompt=agg_prompt,
-                temperature=0.7  # Lower temperature for aggregation
+        Returns:
+            List in group order holding either the response text or the exception
+        """
+        cancelled = self._stage_cancelled
+        
+        def call(index: int, request: Tuple[Optional[str], str]) -> str:
+            if cancelled.is_set():
+                raise BudgetExceeded("Stage cancelled by the run budget")
+            reason = self._spending_stop()
+            if reason is not None:
+                raise BudgetExceeded(f"Stage cut short: the {reason} budget is spent", reason)
+            self._log(f"\n🔀 Agregando grupo {index}/{len(requests)}...")
+            system, group_prompt = request
+            response = self.backend.generate(
+                group_prompt,
+                temperature=temperature,
+                sample_index=index - 1,
+                phase=phase,
+                system=system
             )
+            self._log(f"   ✓ Grupo {index} agregado exitosamente")
+            return response
+        
+        if self.executor is None and self.max_workers == 1:
+            results = []
+            for i, request in enumerate(requests, 1):
+                try:
+                    results.append(call(i, request))
+                except Exception as e:
+                    results.append(e)
+            return results
+        
+        # Worker threads carry the run id of the calling context
+        if self.executor is not None:
+            futures = [
+                self.executor.submit(contextvars.copy_context().run, call, i, r) for i, r in enumerate(requests, 1)
+            ]
+            return [self._future_result(f) for f in futures]
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(requests))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, call, i, r) for i, r in enumerate(requests, 1)]
+            return [self._future_result(f) for f in futures]
+    
+    @staticmethod
+    def _future_result(future) -> object:
+        """Return a future's result, or its exception if it failed"""
+        try:
+            return future.result()
+        except Exception as e:
+            return e
+    
+    def _regroup(self, responses: List[str], original_prompt: str, loop_num: int, count: int) -> List[List[str]]:
+        """New random groups of a loop's inputs, aggregated in place of the loop's failed groups"""
+        rng = random.Random(f"{self.schedule_seed}:{loop_num}:regroup:{original_prompt}")
+        return create_subset_groups(responses, self.group_size, count, rng)
+    
+    def _settle_stage(
+        self,
+        stage: str,
+        results: List[object],
+        action: str,
+        groups: Optional[List[List[str]]] = None,
+        recovered: int = 0,
+        reused: int = 0
+    ) -> List[str]:
+        """
+        Turn the results of a stage's calls into its population, applying the failure policy
+        
+        Failed calls are dropped, or replaced by the first input of their
+        group with the "reuse" action. Stages with failures are added to
+        last_run_stats["degradation"].
+        
+        Args:
+            stage: Stage name ("population", "loop N")
+            results: Response text or exception of every call, in order
+            action: Failure action of the stage
+            groups: Inputs of every call (needed by "reuse")
+            recovered: Failed calls already answered by a regrouped call
+            reused: Failed calls already replaced by one of their inputs
+            
+        Returns:
+            The stage's responses, in call order
             
-            new_population.append(aggregated)
-            self._log(f"   ✓ Grupo {i} agregado exitosamente")
+        Raises:
+            StageFailed: If fewer calls succeeded than the policy requires
+        """
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if not errors and not recovered and not reused:
+            return list(results)
         
-        self._log(f"\n✅ Loop {loop_num} completado: {len(new_population)} respuestas agregadas")
-        return new_population
+        population = []
+        for i, result in enumerate(results):
+            if not isinstance(result, BaseException):
+                population.append(result)
+            elif action == "reuse":
+                population.append(groups[i][0])
+        
+        succeeded = len(results) - len(errors) - reused
+        required = self.failure_policy.required(len(results))
+        if (errors and action == "fail") or succeeded < required:
+            cause = f": {errors[0]}" if errors else ""
+            raise StageFailed(
+                f"{succeeded} of {len(results)} calls succeeded in {stage} (at least {required} required){cause}"
+            ) from (errors[0] if errors else None)
+        
+        if action == "reuse":
+            reused += len(errors)
+        self._report_degradation(stage, len(results), recovered, reused, dropped=len(results) - len(population))
+        return population
     
-    def run(self, prompt: str) -> str:
+    def _report_degradation(self, stage: str, calls: int, recovered: int, reused: int, dropped: int):
+        """Add a stage whose calls failed to last_run_stats["degradation"]"""
+        report = {
+            "stage": stage,
+            "calls": calls,
+            "failed": recovered + reused + dropped,
+            "recovered": recovered,
+            "reused": reused,
+            "dropped": dropped,
+        }
+        self.last_run_stats["degradation"].append(report)
+        self._log(
+            f"🩹 {stage}: {report['failed']} de {calls} llamadas fallaron "
+            f"({recovered} reagrupadas, {reused} reutilizadas, {dropped} descartadas)"
+        )
+    
+    def _final_retry_request(
+        self,
+        population: List[str],
+        original_prompt: str,
+        error: Exception
+    ) -> Optional[Tuple[Optional[str], str]]:
         """
-        Run the complete RSA pipeline
+        Apply the failure policy to a failed final aggregation
+        
+        Returns:
+            (system message, prompt) of the regrouped final call, or None to
+            answer with the first refined solution
+        
+        Raises:
+            Exception: The final aggregation's error with the "fail" action
+        """
+        self._log(f"   ✗ La consolidación final falló: {error}")
+        if self.failure_policy.final == "fail":
+            raise error
+        if self.failure_policy.final == "reuse":
+            return None
+        group = self._regroup(population, original_prompt, self.loops + 1, 1)[0]
+        if self._final_overspend(group, original_prompt) is not None:
+            self._log("   ⏱️  Sin presupuesto para reintentar la consolidación final")
+            return None
+        self._log(f"🔁 Reintentando la consolidación final con {len(group)} de {len(population)} soluciones...")
+        return self._final_request(group, original_prompt)
+    
+    def _final_degraded(self, population: List[str], answer: Optional[str]) -> str:
+        """Report a failed final aggregation and return the run's answer (None = regrouping failed too)"""
+        recovered = answer is not None
+        self._report_degradation("final", 1, recovered=int(recovered), reused=int(not recovered), dropped=0)
+        return answer if recovered else population[0]
+    
+    def _recover_final(self, population: List[str], original_prompt: str, error: Exception) -> str:
+        """Answer of a run whose final aggregation failed, according to the failure policy"""
+        request = self._final_retry_request(population, original_prompt, error)
+        answer = None
+        if request is not None:
+            system, final_prompt = request
+            try:
+                answer = self._call_with_timeout(
+                    lambda: self.backend.generate(final_prompt, temperature=0.3, phase="final", system=system),
+                    self._time_left()
+                )
+            except Exception as e:
+                self._log(f"   ✗ La consolidación reagrupada también falló: {e}")
+        return self._final_degraded(population, answer)
+    
+    def _checkpoint_config(self) -> Dict[str, Any]:
+        """Parameters a saved population depends on"""
+        return {
+            "model_name": self.model_name,
+            "population_size": self.population_size,
+            "group_size": self.group_size,
+            "temperature": self.temperature,
+            "grouping_strategy": self.grouping_strategy,
+            "prompt_layout": self.prompt_layout,
+            "dedup_threshold": self.dedup_threshold,
+            "population_schedule": self.population_schedule,
+            "schedule_ratio": self.schedule_ratio,
+            "schedule_seed": self.schedule_seed,
+            "max_group_tokens": self.max_group_tokens,
+            "phase_models": self.backend.models() if isinstance(self.backend, TieredBackend) else None,
+        }
+    
+    def _save_stage(self, prompt: str, stage: int, population: List[str], final_solution: Optional[str] = None):
+        """Checkpoint the population after a completed stage, if enabled"""
+        if not self.checkpoint_path:
+            return
+        stopped = None
+        if final_solution is not None and stage < self.loops:
+            if self.last_run_stats.get("converged_at_loop") is not None:
+                stopped = "converged"
+            elif self.last_run_stats.get("budget_stop") is not None:
+                stopped = "budget"
+        save_checkpoint(
+            self.checkpoint_path,
+            prompt=prompt,
+            config=self._checkpoint_config(),
+            stage=stage,
+            population=population,
+            final_solution=final_solution,
+            loops=self.loops if final_solution is not None else None,
+            stopped=stopped
+        )
+    
+    def _resume_point(self, prompt: str, resume: bool) -> Tuple[Optional[List[str]], int, Optional[str]]:
+        """
+        Find where a run can restart from its checkpoint
         
         Args:
-            prompt: User's original prompt/problem
+            prompt: User's original prompt
+            resume: Whether resuming was requested
             
         Returns:
-            Final refined solution
+            Tuple of (saved population or None, first loop to run, saved final solution or None)
         """
+        if not (resume and self.checkpoint_path):
+            return None, 1, None
+        
+        state = load_checkpoint(self.checkpoint_path)
+        if state is None:
+            self._log(f"ℹ️  No hay checkpoint válido en {self.checkpoint_path}, empezando desde cero")
+            return None, 1, None
+        
+        if state["prompt"] != prompt or state["config"] != self._checkpoint_config() or state["stage"] > self.loops:
+            self._log(f"⚠️  El checkpoint {self.checkpoint_path} no corresponde a esta ejecución, empezando desde cero")
+            return None, 1, None
+        
+        # A saved final solution is only the answer of a run that really finished: one that
+        # ran all of this run's loops, or converged with the same loops; otherwise refine on
+        stage = state["stage"]
+        final_solution = state.get("final_solution")
+        finished = stage == self.loops or (state.get("loops") == self.loops and state.get("stopped") == "converged")
+        if not finished:
+            final_solution = None
+        self._log(f"♻️  Reanudando desde checkpoint: etapa {stage} completada ({len(state['population'])} respuestas)")
+        return state["population"], stage + 1, final_solution
+    
+    def _start_run_stats(self, start_loop: int):
+        """Reset the per-run statistics exposed in last_run_stats"""
+        self.last_run_stats = {
+            "run_id": current_run_id(),
+            "loops_completed": start_loop - 1,
+            "converged_at_loop": None,
+            "diversity": [],
+            "duplicates_removed": 0,
+            "budget_stop": None,
+            "budget_fallback": False,
+            "final_truncated": False,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "discarded_samples": 0,
+            "degradation": [],
+        }
+        if self.budget is not None:
+            self.budget.start()
+        self._metrics_mark = self.metrics.mark()
+        self.last_run_stats["metrics"] = self._run_metrics()
+    
+    def _run_metrics(self) -> Dict[str, Any]:
+        """Metrics summary of the calls made by the current (or last) run"""
+        return self.metrics.summary(since=self._metrics_mark, run_id=self.last_run_stats.get("run_id"))
+    
+    def _has_converged(self, population: List[str], stage: int) -> bool:
+        """
+        Check whether the population has collapsed to near-identical answers
+        
+        Args:
+            population: Population after the given stage
+            stage: Completed stage (0 = initial population, N = loop N)
+            
+        Returns:
+            True if diversity is below convergence_threshold (never for fewer than two answers)
+        """
+        if self.convergence_threshold is None or len(population) < 2:
+            return False
+        
+        diversity = population_diversity(population)
+        self.last_run_stats["diversity"].append({"stage": stage, "diversity": diversity})
+        self._log(f"📉 Diversidad de la población tras etapa {stage}: {diversity:.3f}")
+        
+        if diversity < self.convergence_threshold:
+            self.last_run_stats["converged_at_loop"] = stage
+            self._log(f"⚡ Convergencia alcanzada tras etapa {stage} (diversidad < {self.convergence_threshold}), omitiendo loops restantes")
+            return True
+        return False
+    
+    def _spent(self) -> Tuple[int, int, float]:
+        """Calls and tokens spent in this run, and the mean completion tokens per call"""
+        totals = self._run_metrics()["totals"]
+        calls = totals["calls"] - totals["cache_hits"]
+        completion = totals["completion_tokens"]
+        return calls, totals["prompt_tokens"] + completion, completion / calls if calls else 0.0
+    
+    def _budget_allows_loop(self, population: List[str], original_prompt: str, loop_num: int) -> bool:
+        """
+        Check that a loop and the final aggregation after it fit in the run budget
+        
+        Args:
+            population: Population the loop would aggregate
+            original_prompt: Original user prompt
+            loop_num: Loop about to start
+            
+        Returns:
+            False if the loop should be skipped in favour of the final aggregation
+        """
+        if self.budget is None:
+            return True
+        
+        calls, tokens, _ = self._spent()
+        requests = [
+            self._aggregation_request(group, original_prompt)
+            for group in self._create_groups(population, original_prompt, loop_num)
+        ]
+        next_tokens = sum(self._request_tokens(request) for request in requests)
+        final_tokens = self._final_tokens(population, original_prompt)
+        
+        reason = self.budget.stop_reason(calls, tokens, len(requests), next_tokens, final_tokens)
+        if reason is None:
+            return True
+        self._stop_for_budget(loop_num, reason)
+        return False
+    
+    def _expected_completion(self) -> float:
+        """Completion tokens expected per call: the run's mean so far, else the budget's estimate"""
+        _, _, per_call = self._spent()
+        return per_call or self.budget.completion_estimate
+    
+    def _request_tokens(self, request: Tuple[Optional[str], str]) -> int:
+        """Estimated prompt plus completion tokens of one (system message, prompt) call"""
+        system, text = request
+        return int(estimate_tokens((system or "") + text) + self._expected_completion())
+    
+    def _final_tokens(self, population: List[str], original_prompt: str) -> int:
+        """Estimated tokens of the final aggregation of a population"""
+        return self._request_tokens(self._final_request(population, original_prompt))
+    
+    def _stage_reserve(self, population: List[str], original_prompt: str) -> Optional[int]:
+        """Tokens a loop must leave for the final aggregation (None without token or call limits)"""
+        if self.budget is None or not self.budget.limits_spending():
+            return None
+        return self._final_tokens(population, original_prompt)
+    
+    def _final_overspend(self, population: List[str], original_prompt: str) -> Optional[str]:
+        """"tokens" or "calls" if the final aggregation of a population would break that limit, else None"""
+        if self.budget is None or not self.budget.limits_spending():
+            return None
+        calls, tokens, _ = self._spent()
+        return self.budget.overspend(calls + 1, tokens + self._final_tokens(population, original_prompt))
+    
+    def _affordable(self, count: int, call_tokens: float, final_tokens: float, final_growth: float = 0.0) -> int:
+        """
+        How many of count more calls the token and call limits can pay for, keeping the final aggregation
+        
+        Args:
+            count: Calls wanted
+            call_tokens: Estimated tokens of each call
+            final_tokens: Estimated tokens of the final aggregation
+            final_growth: Tokens each call's response adds to the final aggregation
+        
+        Returns:
+            Calls that fit, from 0 to count
+        """
+        if self.budget is None or not self.budget.limits_spending():
+            return count
+        calls, tokens, _ = self._spent()
+        while count and self.budget.overspend(
+            calls + count + 1, int(tokens + count * (call_tokens + final_growth) + final_tokens)
+        ):
+            count -= 1
+        return count
+    
+    def _affordable_samples(self, prompt: str, population: List[str], count: int) -> int:
+        """How many of count more initial samples the budget can pay for, next to the final aggregation"""
+        if self.budget is None or not self.budget.limits_spending():
+            return count
+        completion = self._expected_completion()
+        return self._affordable(
+            count, estimate_tokens(prompt) + completion, self._final_tokens(population, prompt), final_growth=completion
+        )
+    
+    def _budgeted_population_size(self, prompt: str) -> int:
+        """
+        Initial population size the token and call limits can pay for
+        
+        Every sample is counted as one call, as without n-sampling.
+        
+        Raises:
+            BudgetExceeded: If not even one sample and the final aggregation fit
+        """
+        size = self._affordable_samples(prompt, [], self.population_size)
+        if size == 0:
+            calls, tokens, _ = self._spent()
+            sample_tokens = 2 * self._expected_completion() + estimate_tokens(prompt)
+            raise BudgetExceeded(
+                "Run budget too small for one initial sample and the final aggregation",
+                self.budget.overspend(calls + 2, int(tokens + sample_tokens + self._final_tokens([], prompt)))
+            )
+        if size < self.population_size:
+            self.last_run_stats["budget_population"] = size
+            self._log(f"💸 Presupuesto: población inicial reducida a {size} de {self.population_size} respuestas")
+        return size
+    
+    def _affordable_regroups(self, regroups: List[List[str]], population: List[str], original_prompt: str) -> List[List[str]]:
+        """The regrouped aggregations of a loop the budget can pay for, next to the final aggregation"""
+        if not regroups or self.budget is None or not self.budget.limits_spending():
+            return regroups
+        call_tokens = max(self._request_tokens(self._aggregation_request(group, original_prompt)) for group in regroups)
+        return regroups[:self._affordable(len(regroups), call_tokens, self._final_tokens(population, original_prompt))]
+    
+    def _spending_stop(self) -> Optional[str]:
+        """"tokens" or "calls" once the run's spending leaves no room for the current stage's final reserve"""
+        final_tokens = self._stage_final_tokens
+        if final_tokens is None:
+            return None
+        calls, tokens, _ = self._spent()
+        return self.budget.overspend(calls + 1, tokens + final_tokens)
+    
+    @staticmethod
+    def _raise_spending_stop(results: List[object]):
+        """Abandon a stage some of whose calls were refused because the budget was spent"""
+        for result in results:
+            if isinstance(result, BudgetExceeded) and result.reason is not None:
+                raise result
+    
+    def _stop_for_budget(self, loop_num: int, reason: str):
+        """Record that the budget ended refinement before loop loop_num completed"""
+        self.last_run_stats["budget_stop"] = {"loop": loop_num, "reason": reason}
+        limit = {"deadline": "tiempo", "tokens": "tokens", "calls": "llamadas"}[reason]
+        self._log(f"⏱️  Presupuesto de {limit} insuficiente para el loop {loop_num}: pasando a la consolidación final")
+    
+    def _budget_fallback(self, population: List[str], reason: str = "deadline") -> str:
+        """Answer returned when the deadline passes during the final aggregation, or it no longer fits the budget"""
+        self.last_run_stats["budget_fallback"] = True
+        if reason == "deadline":
+            self._log("⏱️  Plazo agotado durante la consolidación final: devolviendo la primera respuesta refinada")
+        else:
+            limit = {"tokens": "tokens", "calls": "llamadas"}[reason]
+            self._log(f"⏱️  Presupuesto de {limit} insuficiente para la consolidación final: devolviendo la primera respuesta refinada")
+        self._log_run_end()
+        return population[0]
+    
+    def _final_budget_fallback(self, population: List[str], original_prompt: str) -> Optional[str]:
+        """The budget fallback answer if the final aggregation no longer fits the token or call limit, else None"""
+        reason = self._final_overspend(population, original_prompt)
+        return None if reason is None else self._budget_fallback(population, reason)
+    
+    @staticmethod
+    def _call_with_timeout(fn: Callable[[], Any], timeout: Optional[float]) -> Any:
+        """
+        Call fn, giving up after timeout seconds (None = wait for it)
+        
+        A sync call cannot be interrupted: on timeout it keeps running on its
+        helper thread and its result is discarded.
+        
+        Raises:
+            FutureTimeoutError: If fn did not finish in time
+        """
+        if timeout is None:
+            return fn()
+        pool = ThreadPoolExecutor(max_workers=1)
+        try:
+            return pool.submit(contextvars.copy_context().run, fn).result(timeout=timeout)
+        finally:
+            pool.shutdown(wait=False)
+    
+    def _stream_until_deadline(self, stream: Iterator[str]) -> Iterator[str]:
+        """
+        Relay a sync stream's chunks while the budget's deadline allows
+        
+        Each chunk is awaited on a helper thread; on timeout the stream keeps
+        running there and the rest of it is discarded.
+        
+        Raises:
+            FutureTimeoutError: If the deadline passed before the stream ended
+        """
+        if self._time_left() is None:
+            yield from stream
+            return
+        
+        finished = object()
+        pool = ThreadPoolExecutor(max_workers=1)
+        try:
+            while True:
+                chunk = pool.submit(contextvars.copy_context().run, next, stream, finished).result(
+                    timeout=max(self._time_left(), 0.0)
+                )
+                if chunk is finished:
+                    return
+                yield chunk
+        finally:
+            pool.shutdown(wait=False)
+    
+    async def _stream_until_deadline_async(self, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Async counterpart of _stream_until_deadline: the stream is cancelled at the deadline
+        
+        Raises:
+            asyncio.TimeoutError: If the deadline passed before the stream ended
+        """
+        chunks = stream.__aiter__()
+        try:
+            while True:
+                time_left = self._time_left()
+                try:
+                    chunk = await asyncio.wait_for(
+                        chunks.__anext__(), None if time_left is None else max(time_left, 0.0)
+                    )
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+    
+    def _truncate_final(self):
+        """End a run whose streamed final consolidation was cut off by the deadline"""
+        self.last_run_stats["final_truncated"] = True
+        self._log("\n⏱️  Plazo agotado durante la consolidación final: la respuesta transmitida queda incompleta")
+        self._log_run_end()
+    
+    def _run_stage(self, stage: Callable[[], List[str]], final_tokens: Optional[int] = None) -> List[str]:
+        """
+        Run one stage, abandoning it if it runs into the budget's final reserve
+        
+        An abandoned stage starts no new calls; the ones in flight finish in
+        the background and are discarded.
+        
+        Args:
+            stage: Runs the stage
+            final_tokens: Tokens to keep for the final aggregation; once the run's
+                spending leaves less, the stage's remaining group calls are refused
+        
+        Raises:
+            FutureTimeoutError: If the stage was abandoned at the deadline
+            BudgetExceeded: If the stage was cut short by the token or call limit
+        """
+        if self.budget is None:
+            return stage()
+        
+        self._stage_final_tokens = final_tokens if self.budget.limits_spending() else None
+        try:
+            timeout = self.budget.stage_timeout()
+            if timeout is None:
+                return stage()
+        
+            started = time.monotonic()
+            self._stage_cancelled = threading.Event()
+            try:
+                population = self._call_with_timeout(stage, timeout)
+            except FutureTimeoutError:
+                self._stage_cancelled.set()
+                raise
+            self.budget.record_stage(time.monotonic() - started)
+            return population
+        finally:
+            self._stage_final_tokens = None
+    
+    def _time_left(self) -> Optional[float]:
+        """Seconds until the budget's deadline (None = no deadline)"""
+        return self.budget.time_left() if self.budget is not None else None
+    
+    def _log_final_phase(self, population: List[str]):
+        """Print the final consolidation banner"""
+        self._log(f"\n{'='*60}")
+        self._log(f"🏁 FASE FINAL: Consolidación")
+        self._log(f"{'='*60}")
+        self._log(f"Consolidando {len(population)} soluciones refinadas en solución final...")
+        self._emit("stage_started", stage="final", size=1)
+    
+    def _log_run_start(self, prompt: str, mode: str = ""):
+        """Give the run an id for its events and print the pipeline start banner"""
+        start_run()
+        self._emit(
+            "run_started",
+            mode=mode.strip(" ()") or "sync",
+            model=self.model_name,
+            population_size=self.population_size,
+            loops=self.loops
+        )
         self._log(f"\n{'#'*60}")
-        self._log(f"🎯 INICIANDO PIPELINE RSA")
+        self._log(f"🎯 INICIANDO PIPELINE RSA{mode}")
         self._log(f"{'#'*60}")
         self._log(f"\nPrompt original:\n{prompt}\n")
+    
+    def _log_run_end(self):
+        """Store the run's metrics summary and print the completion banner"""
+        summary = self._run_metrics()
+        self.last_run_stats["metrics"] = summary
+        totals = summary["totals"]
+        self._emit(
+            "run_finished",
+            elapsed=totals["elapsed"],
+            calls=totals["calls"],
+            prompt_tokens=totals["prompt_tokens"],
+            completion_tokens=totals["completion_tokens"],
+            loops_completed=self.last_run_stats["loops_completed"]
+        )
+        self._log(
+            f"\n📊 {totals['calls']} llamadas ({totals['cache_hits']} en caché, {totals['retries']} reintentos), "
+            f"{totals['prompt_tokens']} tokens de prompt ({totals['cached_tokens']} cacheados por el proveedor), "
+            f"{totals['completion_tokens']} de respuesta, "
+            f"{totals['elapsed']:.1f}s"
+        )
+        if self.last_run_stats["hedges"] or totals["cancelled"]:
+            self._log(
+                f"🛡️  {self.last_run_stats['hedges']} llamadas duplicadas ({self.last_run_stats['hedge_wins']} ganaron), "
+                f"{totals['cancelled']} canceladas"
+            )
+        if len(summary["models"]) > 1:
+            self._log("🧮 " + " · ".join(
+                f"{model}: {stats['calls']} llamadas, {stats['prompt_tokens'] + stats['completion_tokens']} tokens"
+                for model, stats in summary["models"].items()
+            ))
+        degradation = self.last_run_stats["degradation"]
+        if degradation:
+            self._log(
+                f"🩹 Ejecución degradada: {sum(stage['failed'] for stage in degradation)} llamadas fallidas "
+                f"en {len(degradation)} etapas ({', '.join(stage['stage'] for stage in degradation)})"
+            )
+        self._log(f"\n{'#'*60}")
+        self._log(f"✨ PIPELINE RSA COMPLETADO")
+        self._log(f"{'#'*60}\n")
+    
+    def _refine(self, prompt: str, resume: bool) -> Tuple[List[str], Optional[str]]:
+        """
+        Run the initial generation and all loops, checkpointing each stage
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Returns:
+            Tuple of (refined population, final solution if already in the checkpoint)
+        """
+        population, start_loop, final_solution = self._resume_point(prompt, resume)
+        self._start_run_stats(start_loop)
+        if final_solution is not None:
+            return population, final_solution
         
         # Step 1: Generate initial population
-        population = self.generate_initial_population(prompt)
+        if population is None:
+            size = self._budgeted_population_size(prompt)
+            try:
+                population = self._run_stage(
+                    lambda: self._deduplicate_population(prompt, self.generate_initial_population(prompt, size), size)
+                )
+            except FutureTimeoutError:
+                raise BudgetExceeded("Deadline reached before the initial population was generated")
+            self._save_stage(prompt, 0, population)
+        
+        # Step 2: Perform RSA loops, stopping early if the population converged or the budget runs low
+        for loop_num in range(start_loop, self.loops + 1):
+            if self._has_converged(population, loop_num - 1):
+                break
+            if not self._budget_allows_loop(population, prompt, loop_num):
+                break
+            final_tokens = self._stage_reserve(population, prompt)
+            try:
+                population = self._run_stage(
+                    lambda: self.aggregate_population(population, prompt, loop_num), final_tokens
+                )
+            except FutureTimeoutError:
+                self._stop_for_budget(loop_num, "deadline")
+                break
+            except BudgetExceeded as e:
+                self._stop_for_budget(loop_num, e.reason or "deadline")
+                break
+            self._save_stage(prompt, loop_num, population)
+            self.last_run_stats["loops_completed"] = loop_num
         
-        # Step 2: Perform RSA loops
-        for loop_num in range(1, self.loops + 1):
-            population = self.aggregate_population(population, prompt, loop_num)
+        return population, None
+    
+    def run(self, prompt: str, resume: bool = False) -> str:
+        """
+        Run the complete RSA pipeline
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Returns:
+            Final refined solution
+        """
+        self._log_run_start(prompt)
+        
+        population, final_solution = self._refine(prompt, resume)
+        if final_solution is not None:
+            return final_solution
         
         # Step 3: Final aggregation
+        fallback = self._final_budget_fallback(population, prompt)
+        if fallback is not None:
+            return fallback
+        self._log_final_phase(population)
+        
+        system, final_prompt = self._final_request(population, prompt)
+        try:
+            final_solution = self._call_with_timeout(
+                lambda: self.backend.generate(
+                    final_prompt,
+                    temperature=0.3,  # Low temperature for final refinement
+                    phase="final",
+                    system=system
+                ),
+                self._time_left()
+            )
+        except FutureTimeoutError:
+            return self._budget_fallback(population)
+        except Exception as e:
+            final_solution = self._recover_final(population, prompt, e)
+        self._save_stage(prompt, self.last_run_stats["loops_completed"], population, final_solution)
+        
+        self._log_run_end()
+        return final_solution
+    
+    def run_with_stats(self, prompt: str, resume: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """
+        Run the pipeline and return the final solution with the run summary
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Returns:
+            Tuple of (final solution, last_run_stats with per-phase metrics)
+        """
+        final_solution = self.run(prompt, resume=resume)
+        return final_solution, self.last_run_stats
+    
+    def export_metrics(self, path: str):
+        """
+        Write the metrics of the last run (summary and per-call records) as JSON
+        
+        Args:
+            path: Output file path
+        """
+        self.metrics.export_json(path, since=self._metrics_mark, run_id=self.last_run_stats.get("run_id"))
+    
+    def fork(self) -> "RSAOrchestrator":
+        """
+        Orchestrator for one of several overlapping runs
+        
+        The fork shares the backend (with its clients, concurrency cap, rate
+        limiter and cache), metrics, events and hedge latencies, but has its
+        own last_run_stats, budget and stage state, so concurrent runs do not
+        overwrite each other's.
+        
+        Returns:
+            The forked orchestrator
+        """
+        forked = copy.copy(self)
+        forked.budget = copy.copy(self.budget)
+        forked._stage_cancelled = threading.Event()
+        forked._stage_final_tokens = None
+        forked._metrics_mark = self.metrics.mark()
+        forked.last_run_stats = {}
+        return forked
+    
+    def run_stream(self, prompt: str, resume: bool = False) -> Iterator[str]:
+        """
+        Run the RSA pipeline and stream the final consolidation as it is generated
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Yields:
+            Text chunks of the final solution
+        """
+        self._log_run_start(prompt)
+        
+        population, final_solution = self._refine(prompt, resume)
+        if final_solution is not None:
+            yield final_solution
+            return
+        
+        fallback = self._final_budget_fallback(population, prompt)
+        if fallback is not None:
+            yield fallback
+            return
+        self._log_final_phase(population)
+        
+        system, final_prompt = self._final_request(population, prompt)
+        chunks = []
+        try:
+            for chunk in self._stream_until_deadline(
+                self.backend.stream(final_prompt, temperature=0.3, phase="final", system=system)
+            ):
+                chunks.append(chunk)
+                yield chunk
+        except FutureTimeoutError:
+            if not chunks:
+                yield self._budget_fallback(population)
+            else:
+                self._truncate_final()
+            return
+        except Exception as e:
+            # Only a stream that failed before its first chunk can still be answered in full
+            if chunks:
+                raise
+            chunks.append(self._recover_final(population, prompt, e))
+            yield chunks[0]
+        self._save_stage(prompt, self.last_run_stats["loops_completed"], population, "".join(chunks))
+        
+        self._log_run_end()
+    
+    async def generate_initial_population_async(self, prompt: str, count: Optional[int] = None) -> List[str]:
+        """
+        Generate initial population with all requests in flight at once
+        
+        Args:
+            prompt: User's original prompt
+            count: Responses to generate (default: population_size)
+            
+        Returns:
+            List of initial responses
+        """
+        count = self.population_size if count is None else count
         self._log(f"\n{'='*60}")
-        self._log(f"🏁 FASE FINAL: Consolidación")
+        self._log(f"📝 FASE 1: Generación de población inicial (async)")
         self._log(f"{'='*60}")
-        self._log(f"Consolidando {len(population)} soluciones refinadas en solución final...")
+        self._log(f"Generando {count} respuestas diversas...\n")
+        self._emit("stage_started", stage="population", size=count)
         
-        final_prompt = create_final_aggregation_prompt(population, prompt)
-        final_solution = self.client.generate_response(
-            prompt=final_prompt,
-            temperature=0.3  # Low temperature for final refinement
+        if self.population_extra:
+            responses = await self._first_population_async(prompt)
+        else:
+            try:
+                responses = await self._generate_n_async(prompt, count)
+            except Exception as e:
+                if self.failure_policy.population == "fail":
+                    raise
+                self._log(f"⚠️  La generación de la población falló ({e}): pidiendo las respuestas una a una")
+                results = await asyncio.gather(*(
+                    self._generate_async(prompt, self.temperature, sample_index=i, phase="population")
+                    for i in range(count)
+                ), return_exceptions=True)
+                responses = self._settle_stage("population", list(results), "drop")
+        
+        self._log(f"\n✅ Población inicial generada: {len(responses)} respuestas")
+        self._emit("stage_finished", stage="population", size=len(responses), failed=count - len(responses))
+        return responses
+    
+    async def _first_population_async(self, prompt: str) -> List[str]:
+        """
+        Request population_extra more samples than needed and keep the first to finish
+        
+        Every sample is its own (hedged) call so a straggler can be left
+        behind; the samples still running once population_size are done are
+        cancelled. A failed sample is replaced by a spare one while any is
+        left; failures the spares cannot cover go through the failure policy.
+        
+        Args:
+            prompt: User's original prompt
+            
+        Returns:
+            The population_size first responses, in sample order
+        """
+        tasks = [
+            asyncio.ensure_future(self._generate_async(prompt, self.temperature, sample_index=i, phase="population"))
+            for i in range(self.population_size + self.population_extra)
+        ]
+        pending = set(tasks)
+        kept = []
+        errors = []
+        try:
+            while len(kept) < self.population_size and pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is None:
+                        if len(kept) < self.population_size:
+                            kept.append(task)
+                        continue
+                    errors.append(task.exception())
+                    if self.failure_policy.population == "fail" and len(kept) + len(pending) < self.population_size:
+                        raise task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        self.last_run_stats["discarded_samples"] += len(tasks) - len(kept)
+        if self.population_extra:
+            self._log(f"   ⏭️  {len(tasks) - len(kept)} muestras de reserva descartadas")
+        responses = [task.result() for task in sorted(kept, key=tasks.index)]
+        missing = self.population_size - len(responses)
+        if missing:
+            responses = self._settle_stage("population", responses + errors[:missing], "drop")
+        return responses
+    
+    async def _generate_async(
+        self,
+        prompt: str,
+        temperature: float,
+        sample_index: int = 0,
+        phase: str = "call",
+        system: Optional[str] = None
+    ) -> str:
+        """One backend call, raced against duplicates when a hedge policy is set"""
+        def call() -> Awaitable[str]:
+            return self.backend.generate_async(
+                prompt, temperature=temperature, sample_index=sample_index, phase=phase, system=system
+            )
+        
+        return await self._race(phase, call)
+    
+    async def _generate_n_async(self, prompt: str, count: int) -> List[str]:
+        """
+        One population request for count samples, raced against duplicates when a hedge policy is set
+        
+        The whole request is hedged, so a straggling sample delays the
+        population until the request runs past the population percentile;
+        population_extra leaves stragglers behind sooner, at one call per sample.
+        """
+        def call() -> Awaitable[List[str]]:
+            return self.backend.generate_n_async(prompt, count=count, temperature=self.temperature, phase="population")
+        
+        return await self._race("population", call)
+    
+    async def _race(self, phase: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a backend call, through the hedge policy if one is set"""
+        if self.hedge is None:
+            return await call()
+        
+        response, hedges, hedge_won = await self.hedge.race(phase_kind(phase), call)
+        self.last_run_stats["hedges"] += hedges
+        self.last_run_stats["hedge_wins"] += hedge_won
+        return response
+    
+    async def _deduplicate_population_async(self, prompt: str, population: List[str], size: Optional[int] = None) -> List[str]:
+        """Async counterpart of _deduplicate_population (top-up samples in flight at once)"""
+        if self.dedup_threshold is None:
+            return population
+        
+        population = self._remove_duplicates(population)
+        # Spare samples already used the indices after population_size
+        next_index = self.population_size + self.population_extra
+        for _ in range(MAX_TOP_UP_ROUNDS if self.dedup_top_up else 0):
+            missing = self._missing_samples(prompt, population, next_index, size or self.population_size)
+            if not missing:
+                break
+            self._log(f"➕ Generando {len(missing)} respuestas adicionales para reponer la población...")
+            extra = await asyncio.gather(*(
+                self._generate_async(prompt, self.temperature, sample_index=i, phase="population")
+                for i in missing
+            ))
+            next_index = missing.stop
+            population = self._remove_duplicates(population + list(extra))
+        return population
+    
+    async def aggregate_population_async(self, responses: List[str], original_prompt: str, loop_num: int) -> List[str]:
+        """
+        Perform one round of aggregation with every group in flight at once
+        
+        Args:
+            responses: Current population of responses
+            original_prompt: Original user prompt
+            loop_num: Current loop number (for logging)
+            
+        Returns:
+            New population after aggregation, in group order
+        """
+        self._log(f"\n{'='*60}")
+        self._log(f"🔄 LOOP {loop_num}: Fase de agregación (async)")
+        self._log(f"{'='*60}")
+        
+        groups = self._create_groups(responses, original_prompt, loop_num)
+        self._log(f"Agregando {len(responses)} respuestas en {len(groups)} grupos de tamaño ~{self.group_size} en paralelo")
+        
+        requests = [self._aggregation_request(group, original_prompt) for group in groups]
+        self._emit("stage_started", stage=f"loop {loop_num}", size=len(groups))
+        results = await self._aggregate_groups_async(requests, loop_num)
+        
+        failed = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+        for i in failed:
+            self._log(f"   ✗ Grupo {i + 1} falló: {results[i]}")
+        
+        recovered = 0
+        if failed and self.failure_policy.loop == "regroup":
+            self._log(f"🔁 Reagrupando {len(failed)} grupos fallidos...")
+            regroups = self._affordable_regroups(
+                self._regroup(responses, original_prompt, loop_num, len(failed)), responses, original_prompt
+            )
+            retried = await self._aggregate_groups_async(
+                [self._aggregation_request(group, original_prompt) for group in regroups], loop_num
+            )
+            for i, result in zip(failed, retried):
+                if not isinstance(result, Exception):
+                    results[i] = result
+                    recovered += 1
+        
+        new_population = self._settle_stage(
+            f"loop {loop_num}", results, self.failure_policy.loop, groups=groups, recovered=recovered
         )
         
-        self._log(f"\n{'#'*60}")
-        self._log(f"✨ PIPELINE RSA COMPLETADO")
-        self._log(f"{'#'*60}\n")
+        self._log(f"\n✅ Loop {loop_num} completado: {len(new_population)} respuestas agregadas")
+        self._emit("stage_finished", stage=f"loop {loop_num}", size=len(new_population), failed=len(failed) - recovered)
+        return new_population
+    
+    async def _aggregate_groups_async(self, requests: List[Tuple[Optional[str], str]], loop_num: int) -> List[object]:
+        """Send every group of a loop at once; a failed group yields its exception instead of a response"""
+        return list(await asyncio.gather(*(
+            self._generate_async(
+                agg_prompt,
+                temperature=0.7,  # Lower temperature for aggregation
+                sample_index=i,
+                phase=f"loop {loop_num}",
+                system=system
+            )
+            for i, (system, agg_prompt) in enumerate(requests)
+        ), return_exceptions=True))
+    
+    async def _initial_population_async(self, prompt: str, size: Optional[int] = None) -> List[str]:
+        """Generate and deduplicate the initial population"""
+        population = await self.generate_initial_population_async(prompt, size)
+        return await self._deduplicate_population_async(prompt, population, size)
+    
+    async def _run_stage_async(self, stage: Awaitable[List[str]], final_tokens: Optional[int] = None) -> List[str]:
+        """
+        Async counterpart of _run_stage: a stage running into the final reserve is cancelled
+        
+        Args:
+            stage: The stage's coroutine
+            final_tokens: Tokens to keep for the final aggregation; once the run's
+                spending leaves less, the stage is cancelled with its calls in flight
         
+        Raises:
+            asyncio.TimeoutError: If the stage was cancelled at the deadline
+            BudgetExceeded: If the stage was cancelled by the token or call limit
+        """
+        if self.budget is None:
+            return await stage
+        
+        if final_tokens is not None and self.budget.limits_spending():
+            stage = self._guard_spending(stage, final_tokens)
+        timeout = self.budget.stage_timeout()
+        if timeout is None:
+            return await stage
+        
+        started = time.monotonic()
+        population = await asyncio.wait_for(stage, timeout)
+        self.budget.record_stage(time.monotonic() - started)
+        return population
+    
+    async def _guard_spending(self, stage: Awaitable[List[str]], final_tokens: int) -> List[str]:
+        """Run a stage, cancelling it once the run's spending leaves less than final_tokens for the final aggregation"""
+        task = asyncio.ensure_future(stage)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=SPENDING_CHECK_SECONDS)
+                if done:
+                    return task.result()
+                calls, tokens, _ = self._spent()
+                reason = self.budget.overspend(calls + 1, tokens + final_tokens)
+                if reason is not None:
+                    raise BudgetExceeded(f"Stage cancelled: the {reason} budget is spent", reason)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    async def _refine_async(
+        self,
+        prompt: str,
+        resume: bool,
+        on_stage: Optional[Callable[[int, List[str]], None]] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Async counterpart of _refine: every call of a stage is in flight at once
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            on_stage: Called with (loop number, population) after every completed loop
+            
+        Returns:
+            Tuple of (refined population, final solution if already in the checkpoint)
+        """
+        population, start_loop, final_solution = self._resume_point(prompt, resume)
+        self._start_run_stats(start_loop)
+        if final_solution is not None:
+            return population, final_solution
+        
+        if population is None:
+            size = self._budgeted_population_size(prompt)
+            try:
+                population = await self._run_stage_async(self._initial_population_async(prompt, size))
+            except asyncio.TimeoutError:
+                raise BudgetExceeded("Deadline reached before the initial population was generated")
+            self._save_stage(prompt, 0, population)
+        
+        if self.dataflow:
+            return await self._refine_dataflow_async(prompt, population, start_loop, on_stage), None
+        
+        for loop_num in range(start_loop, self.loops + 1):
+            if self._has_converged(population, loop_num - 1):
+                break
+            if not self._budget_allows_loop(population, prompt, loop_num):
+                break
+            try:
+                population = await self._run_stage_async(
+                    self.aggregate_population_async(population, prompt, loop_num),
+                    self._stage_reserve(population, prompt)
+                )
+            except asyncio.TimeoutError:
+                self._stop_for_budget(loop_num, "deadline")
+                break
+            except BudgetExceeded as e:
+                self._stop_for_budget(loop_num, e.reason or "deadline")
+                break
+            self._save_stage(prompt, loop_num, population)
+            self.last_run_stats["loops_completed"] = loop_num
+            if on_stage is not None:
+                on_stage(loop_num, population)
+        
+        return population, None
+    
+    async def _refine_dataflow_async(
+        self,
+        prompt: str,
+        population: List[str],
+        start_loop: int,
+        on_stage: Optional[Callable[[int, List[str]], None]] = None
+    ) -> List[str]:
+        """
+        Run the loops as a dataflow graph instead of loop by loop
+        
+        Every aggregation call is a task that awaits only the responses of its
+        own group, so a loop N+1 group is sent as soon as its loop N inputs are
+        done while slower groups of loop N are still running. Groups are
+        assigned on positions exactly as in the loop-by-loop version, so the
+        calls and their results are the same. Stages are still checkpointed
+        and passed to on_stage in order, once all their responses are done.
+        With a "drop" failure policy a group aggregates the inputs that did
+        not fail; with "reuse" a failed group resolves to its first input.
+        
+        Args:
+            prompt: User's original prompt/problem
+            population: Initial (or resumed) population
+            start_loop: First loop to run
+            on_stage: Called with (loop number, population) after every completed loop
+            
+        Returns:
+            Population of the last loop
+        """
+        started_loops = set()
+        action = self.failure_policy.loop
+        reused: Dict[int, int] = {}
+        
+        async def aggregate(inputs: List[asyncio.Future], loop_num: int, index: int, size: int) -> str:
+            if action == "fail":
+                group = list(await asyncio.gather(*inputs))
+            else:
+                results = await asyncio.gather(*inputs, return_exceptions=True)
+                group = [r for r in results if not isinstance(r, Exception)]
+                if not group:
+                    raise StageFailed(f"Every input of group {index + 1} of loop {loop_num} failed")
+            if loop_num not in started_loops:
+                started_loops.add(loop_num)
+                self._emit("stage_started", stage=f"loop {loop_num}", size=size)
+            system, agg_prompt = self._aggregation_request(group, prompt)
+            try:
+                return await self._generate_async(
+                    agg_prompt,
+                    temperature=0.7,  # Lower temperature for aggregation
+                    sample_index=index,
+                    phase=f"loop {loop_num}",
+                    system=system
+                )
+            except Exception as e:
+                if action != "reuse":
+                    raise
+                self._log(f"   ✗ Grupo {index + 1} del loop {loop_num} falló: {e}")
+                reused[loop_num] = reused.get(loop_num, 0) + 1
+                return group[0]
+        
+        outputs: List[asyncio.Future] = []
+        for response in population:
+            done = asyncio.get_running_loop().create_future()
+            done.set_result(response)
+            outputs.append(done)
+        
+        stages: List[List[asyncio.Task]] = []
+        for loop_num in range(start_loop, self.loops + 1):
+            groups = self._create_groups(list(range(len(outputs))), prompt, loop_num)
+            outputs = [
+                asyncio.create_task(aggregate([outputs[i] for i in group], loop_num, index, len(groups)))
+                for index, group in enumerate(groups)
+            ]
+            stages.append(outputs)
+        
+        self._log(f"\n🌊 Dataflow: {sum(map(len, stages))} agregaciones en {len(stages)} loops, "
+                  f"cada grupo se envía en cuanto sus respuestas están listas")
+        
+        tasks = [task for stage in stages for task in stage]
+        try:
+            for loop_num, stage in enumerate(stages, start_loop):
+                results = list(await asyncio.gather(*stage, return_exceptions=True))
+                # Reused groups already resolved to an input; the failures left have nothing to reuse
+                population = self._settle_stage(
+                    f"loop {loop_num}", results, "fail" if action == "fail" else "drop", reused=reused.get(loop_num, 0)
+                )
+                self._save_stage(prompt, loop_num, population)
+                self.last_run_stats["loops_completed"] = loop_num
+                self._log(f"✅ Loop {loop_num} completado: {len(population)} respuestas agregadas")
+                self._emit(
+                    "stage_finished",
+                    stage=f"loop {loop_num}",
+                    size=len(population),
+                    failed=len(stage) - len(population) + reused.get(loop_num, 0)
+                )
+                if on_stage is not None:
+                    on_stage(loop_num, population)
+        finally:
+            # A failed stage fails the run: stop whatever is still pending
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return population
+    
+    async def run_async(self, prompt: str, resume: bool = False) -> str:
+        """
+        Run the complete RSA pipeline using concurrent requests
+        
+        The population and all groups of a loop are sent concurrently, so a
+        run takes roughly loops + 2 round-trips instead of one per call.
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Returns:
+            Final refined solution
+        """
+        self._log_run_start(prompt, " (async)")
+        
+        population, final_solution = await self._refine_async(prompt, resume)
+        if final_solution is not None:
+            return final_solution
+        
+        fallback = self._final_budget_fallback(population, prompt)
+        if fallback is not None:
+            return fallback
+        self._log_final_phase(population)
+        
+        system, final_prompt = self._final_request(population, prompt)
+        try:
+            final_solution = await asyncio.wait_for(
+                self._generate_async(
+                    final_prompt,
+                    temperature=0.3,  # Low temperature for final refinement
+                    phase="final",
+                    system=system
+                ),
+                self._time_left()
+            )
+        except asyncio.TimeoutError:
+            return self._budget_fallback(population)
+        except Exception as e:
+            final_solution = await self._recover_final_async(population, prompt, e)
+        self._save_stage(prompt, self.last_run_stats["loops_completed"], population, final_solution)
+        
+        self._log_run_end()
         return final_solution
+    
+    async def _recover_final_async(self, population: List[str], original_prompt: str, error: Exception) -> str:
+        """Async counterpart of _recover_final"""
+        request = self._final_retry_request(population, original_prompt, error)
+        answer = None
+        if request is not None:
+            system, final_prompt = request
+            try:
+                answer = await asyncio.wait_for(
+                    self._generate_async(final_prompt, temperature=0.3, phase="final", system=system),
+                    self._time_left()
+                )
+            except Exception as e:
+                self._log(f"   ✗ La consolidación reagrupada también falló: {e}")
+        return self._final_degraded(population, answer)
+    
+    async def run_stream_async(self, prompt: str, resume: bool = False) -> AsyncIterator[str]:
+        """
+        Async counterpart of run_stream
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Yields:
+            Text chunks of the final solution
+        """
+        self._log_run_start(prompt, " (async)")
+        
+        population, final_solution = await self._refine_async(prompt, resume)
+        if final_solution is not None:
+            yield final_solution
+            return
+        
+        fallback = self._final_budget_fallback(population, prompt)
+        if fallback is not None:
+            yield fallback
+            return
+        self._log_final_phase(population)
+        
+        system, final_prompt = self._final_request(population, prompt)
+        chunks = []
+        try:
+            async for chunk in self._stream_until_deadline_async(
+                self.backend.stream_async(final_prompt, temperature=0.3, phase="final", system=system)
+            ):
+                chunks.append(chunk)
+                yield chunk
+        except asyncio.TimeoutError:
+            if not chunks:
+                yield self._budget_fallback(population)
+            else:
+                self._truncate_final()
+            return
+        except Exception as e:
+            if chunks:
+                raise
+            chunks.append(await self._recover_final_async(population, prompt, e))
+            yield chunks[0]
+        self._save_stage(prompt, self.last_run_stats["loops_completed"], population, "".join(chunks))
+        
+        self._log_run_end()
+    
+    async def run_async_with_stats(self, prompt: str, resume: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """
+        Async counterpart of run_with_stats
+        """
+        final_solution = await self.run_async(prompt, resume=resume)
+        return final_solution, self.last_run_stats
+    
+    def run_concurrent(self, prompt: str, resume: bool = False) -> str:
+        """
+        Synchronous wrapper around run_async
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Returns:
+            Final refined solution
+        """
+        return self._run_in_new_loop(self.run_async(prompt, resume=resume))
+    
+    @staticmethod
+    def _run_in_new_loop(coroutine: Awaitable[Any]) -> Any:
+        """Run a coroutine in a fresh event loop, closing its pooled connections at the end"""
+        async def run_and_close() -> Any:
+            try:
+                return await coroutine
+            finally:
+                # The loop ends here: close its pooled connections cleanly
+                await aclose_http_clients()
+        
+        return asyncio.run(run_and_close())
+    
+    async def _consolidate(self, prompt: str, population: List[str], phase: str) -> str:
+        """Final aggregation of a population (used for provisional answers too)"""
+        system, final_prompt = self._final_request(population, prompt)
+        return await self._generate_async(
+            final_prompt,
+            temperature=0.3,  # Low temperature for final refinement
+            phase=phase,
+            system=system
+        )
+    
+    async def iter_anytime(self, prompt: str, resume: bool = False) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Anytime RSA: yield a consolidated answer after every loop while refinement continues
+        
+        After each completed loop a final aggregation of that population starts
+        in the background and the next loop proceeds concurrently. Answers are
+        yielded as they arrive; one from an earlier loop that finishes after a
+        later one is dropped, so every yielded answer supersedes the previous.
+        The last answer is the regular final solution. Leaving the iterator
+        early cancels all outstanding calls.
+        
+        Args:
+            prompt: User's original prompt/problem
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Yields:
+            Tuples of (loop the answer is based on, answer)
+        
+        Raises:
+            ValueError: If the run budget limits tokens or calls, which provisional answers would overspend
+        """
+        if self.budget is not None and self.budget.limits_spending():
+            raise ValueError("anytime runs cannot keep to a token or call budget: use a deadline-only budget")
+        self._log_run_start(prompt, " (anytime)")
+        started = time.perf_counter()
+        answers: asyncio.Queue = asyncio.Queue()
+        consolidations: List[asyncio.Task] = []
+        consolidated_stages = set()
+        
+        async def consolidate(stage: int, population: List[str], final: bool):
+            phase = "final" if final else f"provisional {stage}"
+            try:
+                answer = await self._consolidate(prompt, population, phase)
+            except Exception as e:
+                self._log(f"   ✗ Respuesta provisional del loop {stage} falló: {e}")
+                return
+            if final:
+                self._save_stage(prompt, stage, population, answer)
+            await answers.put((stage, answer))
+        
+        def on_stage(stage: int, population: List[str]):
+            consolidated_stages.add(stage)
+            final = stage == self.loops
+            if not final:
+                self._log(f"⏩ Consolidando respuesta provisional del loop {stage} en segundo plano...")
+            consolidations.append(asyncio.create_task(consolidate(stage, population, final)))
+        
+        async def refine():
+            try:
+                population, final_solution = await self._refine_async(prompt, resume, on_stage=on_stage)
+                stage = self.last_run_stats["loops_completed"]
+                if final_solution is not None:
+                    await answers.put((stage, final_solution))
+                elif stage not in consolidated_stages:
+                    # Converged or resumed without a consolidation of the last population
+                    consolidations.append(asyncio.create_task(consolidate(stage, population, True)))
+            except Exception as e:
+                self._log(f"⚠️  Refinamiento interrumpido: {e}")
+            await asyncio.gather(*consolidations)
+            await answers.put(None)
+        
+        refinement = asyncio.create_task(refine())
+        best_stage = -1
+        try:
+            while True:
+                item = await answers.get()
+                if item is None:
+                    break
+                stage, answer = item
+                if stage <= best_stage:
+                    continue
+                best_stage = stage
+                self.last_run_stats.setdefault("anytime_answers", []).append(
+                    {"stage": stage, "elapsed": time.perf_counter() - started}
+                )
+                yield stage, answer
+        finally:
+            for task in [refinement, *consolidations]:
+                task.cancel()
+            await asyncio.gather(refinement, *consolidations, return_exceptions=True)
+        
+        if best_stage < 0:
+            raise Exception("Anytime run finished without any answer")
+        self._log_run_end()
+    
+    async def run_anytime_async(
+        self,
+        prompt: str,
+        deadline: Optional[float] = None,
+        on_answer: Optional[Callable[[int, str], None]] = None,
+        resume: bool = False
+    ) -> str:
+        """
+        Run anytime RSA, returning the best answer available by the deadline
+        
+        Args:
+            prompt: User's original prompt/problem
+            deadline: Seconds from now after which the best answer so far is
+                returned and outstanding calls are cancelled (None = run to the end)
+            on_answer: Called with (loop, answer) for every provisional and final answer, like iter_anytime yields them
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Returns:
+            The most refined answer available
+            
+        Raises:
+            TimeoutError: If the deadline passes before any answer is available
+        """
+        best: List[str] = []
+        answers = self.iter_anytime(prompt, resume=resume)
+        
+        async def consume():
+            async for stage, answer in answers:
+                best[:] = [answer]
+                if on_answer is not None:
+                    on_answer(stage, answer)
+        
+        try:
+            await asyncio.wait_for(consume(), timeout=deadline)
+        except asyncio.TimeoutError:
+            self.last_run_stats["deadline_hit"] = True
+            if not best:
+                raise TimeoutError(f"No answer available within the {deadline}s deadline")
+            self._log(f"⏱️  Plazo de {deadline}s alcanzado: devolviendo la mejor respuesta disponible")
+            self._log_run_end()
+        finally:
+            await answers.aclose()
+        return best[0]
+    
+    def run_anytime(
+        self,
+        prompt: str,
+        deadline: Optional[float] = None,
+        on_answer: Optional[Callable[[int, str], None]] = None,
+        resume: bool = False
+    ) -> str:
+        """
+        Synchronous wrapper around run_anytime_async
+        
+        Args:
+            prompt: User's original prompt/problem
+            deadline: Seconds after which the best answer so far is returned (None = no limit)
+            on_answer: Called with (loop, answer) for every provisional and final answer, like iter_anytime yields them
+            resume: Restart from the last completed stage in checkpoint_path
+            
+        Returns:
+            The most refined answer available
+        """
+        return self._run_in_new_loop(
+            self.run_anytime_async(prompt, deadline=deadline, on_answer=on_answer, resume=resume)
+        )
@@ -0,0 +1,158 @@
+"""
+Similarity Module
+Local text similarity (word shingles, Jaccard, MinHash) for population analysis
+"""
+
+import re
+import random
+import hashlib
+from itertools import combinations
+from typing import List, Set
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_text(text: str) -> List[str]:
+    """
+    Lowercase a text and split it into word tokens, dropping punctuation
+    
+    Args:
+        text: Text to normalize
+        
+    Returns:
+        List of word tokens
+    """
+    return re.findall(r"\w+", text.lower())
+
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    """
+    Build the set of word k-grams of a normalized text
+    
+    Args:
+        text: Text to shingle
+        k: Number of words per shingle
+        
+    Returns:
+        Set of shingles (a single shingle if the text has fewer than k words)
+    """
+    words = normalize_text(text)
+    if len(words) <= k:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two shingle sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _hash_shingle(shingle: str) -> int:
+    """Stable 32-bit hash of a shingle (independent of PYTHONHASHSEED)"""
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big")
+
+
+def _permutations(num_perm: int, seed: int = 1):
+    """Fixed (a, b) coefficients of the universal hash permutations"""
+    rng = random.Random(seed)
+    return [
+        (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+        for _ in range(num_perm)
+    ]
+
+
+def minhash_signature(shingle_set: Set[str], num_perm: int = 64) -> List[int]:
+    """
+    Compute the MinHash signature of a shingle set
+    
+    Args:
+        shingle_set: Shingles of a text
+        num_perm: Number of hash permutations (signature length)
+        
+    Returns:
+        List of num_perm minimum hash values
+    """
+    hashes = [_hash_shingle(s) for s in shingle_set] or [0]
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _permutations(num_perm)
+    ]
+
+
+def signature_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity from two MinHash signatures"""
+    matches = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return matches / len(sig_a)
+
+
+def mean_pairwise_similarity(responses: List[str], num_perm: int = 64, k: int = 3) -> float:
+    """
+    Average estimated similarity over all pairs of responses
+    
+    Args:
+        responses: Population of responses
+        num_perm: MinHash signature length
+        k: Words per shingle
+        
+    Returns:
+        Mean pairwise similarity in [0, 1] (1.0 for fewer than two responses)
+    """
+    if len(responses) < 2:
+        return 1.0
+    
+    signatures = [minhash_signature(shingles(r, k), num_perm) for r in responses]
+    pairs = list(combinations(signatures, 2))
+    return sum(signature_similarity(a, b) for a, b in pairs) / len(pairs)
+
+
+def population_diversity(responses: List[str], num_perm: int = 64, k: int = 3) -> float:
+    """
+    Diversity of a population: 1 - mean pairwise similarity
+    
+    Args:
+        responses: Population of responses
+        num_perm: MinHash signature length
+        k: Words per shingle
+        
+    Returns:
+        Diversity in [0, 1]; 0 means all responses are (near-)identical
+    """
+    return 1.0 - mean_pairwise_similarity(responses, num_perm, k)
+
+
+def deduplicate(responses: List[str], threshold: float = 0.9, k: int = 3) -> List[int]:
+    """
+    Find the responses to keep after dropping duplicates and near-duplicates
+    
+    Exact duplicates (same normalized text) are caught by hash; the rest are
+    compared by exact Jaccard similarity of their shingles against every
+    response already kept. The first occurrence always wins.
+    
+    Args:
+        responses: Population of responses
+        threshold: Jaccard similarity at or above which two responses are near-duplicates
+        k: Words per shingle
+        
+    Returns:
+        Indices of the responses to keep, in their original order
+    """
+    kept: List[int] = []
+    kept_shingles: List[Set[str]] = []
+    seen_hashes: Set[str] = set()
+    
+    for i, response in enumerate(responses):
+        digest = hashlib.blake2b(" ".join(normalize_text(response)).encode("utf-8"), digest_size=16).hexdigest()
+        if digest in seen_hashes:
+            continue
+        shingle_set = shingles(response, k)
+        if any(jaccard(shingle_set, other) >= threshold for other in kept_shingles):
+            continue
+        seen_hashes.add(digest)
+        kept.append(i)
+        kept_shingles.append(shingle_set)
+    
+    return kept
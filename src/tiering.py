@@ -0,0 +1,165 @@
+"""
+Tiering Module
+Per-phase model selection: a cheap model for the population, a strong one for aggregation
+"""
+
+import re
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from src.backends import LLMBackend
+from src.events import EventBus
+from src.metrics import MetricsCollector
+
+# Call kinds a model can be chosen for; "loop N" picks a model for one loop only
+PHASE_KINDS = ("population", "loop", "final")
+
+_LOOP_PHASE = re.compile(r"loop \d+")
+
+
+def phase_kind(phase: str) -> str:
+    """Kind of a call's phase: every "loop N" is a loop and provisional answers are final consolidations"""
+    if phase.startswith("loop"):
+        return "loop"
+    if phase.startswith("provisional"):
+        return "final"
+    return phase
+
+
+class ModelLimits:
+    """Concurrency and rate budget of one model"""
+    
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+    ):
+        """
+        Describe the budget
+        
+        Args:
+            max_concurrency: Async requests in flight for this model (None = the orchestrator's)
+            requests_per_minute: Request quota of this model (None = the orchestrator's)
+            tokens_per_minute: Estimated token quota of this model (None = the orchestrator's)
+        """
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+
+class TieredBackend:
+    """
+    Backend that sends every RSA phase to the backend of its model
+    
+    A call goes to the backend registered for its exact phase ("loop 2"),
+    else for its kind ("population", "loop", "final"), else to the default
+    backend. Phases that use the same model should share one backend, so
+    they share its concurrency and rate budget; from_models does that.
+    """
+    
+    def __init__(self, backends: Dict[str, LLMBackend], default: LLMBackend):
+        """
+        Initialize the router
+        
+        Args:
+            backends: Backend per phase kind or exact loop phase ("loop 2")
+            default: Backend of every other phase
+        """
+        for phase in backends:
+            if phase not in PHASE_KINDS and not _LOOP_PHASE.fullmatch(phase):
+                raise ValueError(f"Unknown phase {phase!r}: use one of {PHASE_KINDS} or 'loop N'")
+        self.backends = dict(backends)
+        self.default = default
+        self.model_name = default.model_name
+    
+    @classmethod
+    def from_models(
+        cls,
+        phase_models: Dict[str, str],
+        default_model: str,
+        make_backend: Callable[[str], LLMBackend]
+    ) -> "TieredBackend":
+        """
+        Build one backend per distinct model
+        
+        Args:
+            phase_models: Model per phase kind or exact loop phase
+            default_model: Model of the phases without an entry
+            make_backend: Builds the backend (with its own budget) of a model
+        
+        Returns:
+            The tiered backend
+        """
+        by_model: Dict[str, LLMBackend] = {default_model: make_backend(default_model)}
+        for model in phase_models.values():
+            if model not in by_model:
+                by_model[model] = make_backend(model)
+        return cls({phase: by_model[model] for phase, model in phase_models.items()}, by_model[default_model])
+    
+    def _members(self) -> List[LLMBackend]:
+        """Distinct backends, default first"""
+        members = [self.default]
+        for backend in self.backends.values():
+            if all(backend is not member for member in members):
+                members.append(backend)
+        return members
+    
+    def models(self) -> Dict[str, str]:
+        """Model of every phase kind (and of every loop with its own entry)"""
+        return {
+            **{kind: self.route(kind).model_name for kind in PHASE_KINDS},
+            **{phase: backend.model_name for phase, backend in self.backends.items() if phase not in PHASE_KINDS},
+        }
+    
+    def route(self, phase: str) -> LLMBackend:
+        """Backend serving the calls of a phase"""
+        backend = self.backends.get(phase)
+        if backend is None:
+            backend = self.backends.get(phase_kind(phase), self.default)
+        return backend
+    
+    @property
+    def metrics(self) -> Optional[MetricsCollector]:
+        """Metrics collector shared by every model"""
+        return self.default.metrics
+    
+    @metrics.setter
+    def metrics(self, collector: Optional[MetricsCollector]):
+        for backend in self._members():
+            backend.metrics = collector
+    
+    @property
+    def events(self) -> Optional[EventBus]:
+        """Event bus shared by every model"""
+        return self.default.events
+    
+    @events.setter
+    def events(self, bus: Optional[EventBus]):
+        for backend in self._members():
+            backend.events = bus
+    
+    def generate(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                 system: Optional[str] = None) -> str:
+        return self.route(phase).generate(prompt, temperature, sample_index=sample_index, phase=phase, system=system)
+    
+    def generate_n(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        return self.route(phase).generate_n(prompt, count, temperature, phase=phase)
+    
+    def stream(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+               system: Optional[str] = None) -> Iterator[str]:
+        return self.route(phase).stream(prompt, temperature, phase=phase, system=system)
+    
+    async def generate_async(self, prompt: str, temperature: float = 1.0, sample_index: int = 0, phase: str = "call",
+                             system: Optional[str] = None) -> str:
+        return await self.route(phase).generate_async(
+            prompt, temperature, sample_index=sample_index, phase=phase, system=system
+        )
+    
+    async def generate_n_async(self, prompt: str, count: int, temperature: float = 1.0, phase: str = "population") -> List[str]:
+        return await self.route(phase).generate_n_async(prompt, count, temperature, phase=phase)
+    
+    def stream_async(self, prompt: str, temperature: float = 1.0, phase: str = "call",
+                     system: Optional[str] = None) -> AsyncIterator[str]:
+        return self.route(phase).stream_async(prompt, temperature, phase=phase, system=system)
@@ -4,11 +4,35 @@ Test script to validate RSA system logic without requiring API
 
 import sys
 import os
+import random
+import time
+import asyncio
+from types import SimpleNamespace
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from aggregation import create_groups, create_aggregation_prompt, create_final_aggregation_prompt
+from aggregation import (
+    create_groups,
+    create_subset_groups,
+    schedule_sizes,
+    create_aggregation_prompt,
+    create_final_aggregation_prompt,
+    create_aggregation_messages,
+    create_final_aggregation_messages,
+    estimate_tokens,
+)
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from checkpoint import save_checkpoint, load_checkpoint
+from batch import load_prompts, load_completed_ids
+from similarity import shingles, jaccard, population_diversity, deduplicate
+from metrics import MetricsCollector, percentile
+from budget import RunBudget
+from events import EventBus, JSONLSink, ProgressSink, start_run
+from hedging import HedgePolicy
+from circuit_breaker import CircuitBreaker
+from degradation import FailurePolicy
 
 
 def test_create_groups():
@@ -37,6 +61,36 @@ def test_create_groups():
     assert len(groups[0]) == 2, "Group should have 2 responses"
     print("  ✓ Test 3 passed: 2 responses → 1 group of 2")
     
+    # Test case 4: Balanced strategy evens out token load
+    responses = ["a" * 4000, "b" * 40, "c" * 4000, "d" * 40]
+    groups = create_groups(responses, 2, strategy="balanced")
+    assert len(groups) == 2, f"Expected 2 groups, got {len(groups)}"
+    assert all(sum(len(r) for r in g) == 4040 for g in groups), "Each group should get one long response"
+    print("  ✓ Test 4 passed: balanced → equal token load per group")
+    
+    # Test case 5: Token budget opens extra groups and truncates oversize members
+    responses = ["a" * 8000, "b" * 400, "c" * 400, "d" * 400]
+    groups = create_groups(responses, 4, strategy="balanced", max_group_tokens=1000)
+    assert all(sum(estimate_tokens(r) for r in g) <= 1000 for g in groups), "Groups must fit the budget"
+    assert sum(len(g) for g in groups) == 4, "No response should be dropped"
+    assert any("truncado" in r for g in groups for r in g), "Oversize response should be truncated"
+    print("  ✓ Test 5 passed: token budget respected")
+    
+    # Test case 6: Constant-N subsets use every response equally often
+    responses = [f"R{i}" for i in range(8)]
+    groups = create_subset_groups(responses, 4, 8, random.Random(0))
+    assert len(groups) == 8 and all(len(set(g)) == 4 for g in groups), "8 groups of 4 distinct members"
+    assert all(sum(r in g for g in groups) == 4 for r in responses), "Each response used 4 times"
+    assert groups == create_subset_groups(responses, 4, 8, random.Random(0)), "Seeded groups are reproducible"
+    print("  ✓ Test 6 passed: random k-subsets with even coverage")
+    
+    # Test case 7: Schedules give the population size after each loop
+    assert schedule_sizes("shrink", 16, 3) is None
+    assert schedule_sizes("constant", 16, 3) == [16, 16, 16]
+    assert schedule_sizes("geometric", 16, 3) == [8, 4, 2]
+    assert schedule_sizes([16, 8, 1], 16, 3) == [16, 8, 1]
+    print("  ✓ Test 7 passed: population schedules")
+    
     print("✅ All create_groups() tests passed!\n")
 
 
@@ -65,6 +119,15 @@ def test_aggregation_prompts():
     assert "TAREA FINAL" in final_prompt
     print("  ✓ Final aggregation prompt structure is correct")
     
+    # Test shared-prefix layout: the system message does not depend on the group
+    system, user = create_aggregation_messages(responses, original_prompt)
+    other_system, other_user = create_aggregation_messages(["Solution D"], original_prompt)
+    assert system == other_system and original_prompt in system
+    assert "Solution A" not in system and "Solution A" in user and "SOLUCIÓN 3" in user
+    final_system, final_user = create_final_aggregation_messages(responses, original_prompt)
+    assert "TAREA FINAL" in final_system and "SOLUCIÓN REFINADA 1" in final_user
+    print("  ✓ Shared-prefix layout keeps solutions out of the system message")
+    
     print("✅ All prompt tests passed!\n")
 
 
@@ -94,6 +157,1340 @@ def test_rsa_logic():
     print("✅ RSA logic simulation passed!\n")
 
 
+def test_rate_limiter():
+    """Test token bucket rate limiting with a fake clock"""
+    print("Testing RateLimiter...")
+    
+    now = [0.0]
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600, clock=lambda: now[0])
+    
+    # Test case 1: Burst up to capacity without waiting
+    assert all(limiter.reserve() == 0.0 for _ in range(60)), "Burst within RPM should not wait"
+    assert abs(limiter.reserve() - 1.0) < 1e-9, "61st request should wait 1s at 60 RPM"
+    print("  ✓ Test 1 passed: 60 RPM burst, then 1s wait")
+    
+    # Test case 2: Token budget dominates for large prompts
+    now[0] = 120.0
+    assert limiter.reserve(600) == 0.0, "Full token bucket should not wait"
+    assert abs(limiter.reserve(100) - 10.0) < 1e-9, "100 tokens over budget at 10 tok/s should wait 10s"
+    print("  ✓ Test 2 passed: token budget enforced")
+    
+    # Test case 3: Retry-After pause blocks every caller
+    now[0] = 1000.0
+    limiter.pause(30)
+    assert abs(limiter.reserve() - 30.0) < 1e-9, "Paused limiter should wait for Retry-After"
+    print("  ✓ Test 3 passed: pause honored")
+    
+    assert estimate_tokens("a" * 400) == 101, "~4 characters per token"
+    print("✅ All RateLimiter tests passed!\n")
+
+
+def test_response_cache():
+    """Test persistent response cache keys, TTL and LRU eviction"""
+    print("Testing ResponseCache...")
+    
+    now = [0.0]
+    cache = ResponseCache(":memory:", ttl_seconds=60, max_bytes=10, clock=lambda: now[0])
+    
+    # Test case 1: Sample slots keep population members distinct
+    cache.put("gpt-4o", "prompt", 1.0, "aaa", sample_index=0)
+    cache.put("gpt-4o", "prompt", 1.0, "bbb", sample_index=1)
+    assert cache.get("gpt-4o", "prompt", 1.0, 0) == "aaa"
+    assert cache.get("gpt-4o", "prompt", 1.0, 1) == "bbb"
+    assert cache.get("gpt-4o", "prompt", 0.7, 0) is None, "Temperature is part of the key"
+    assert cache.get("gpt-4o-mini", "prompt", 1.0, 0) is None, "Model is part of the key"
+    print("  ✓ Test 1 passed: key includes model, temperature and sample slot")
+    
+    # Test case 2: Least recently used entry is evicted over max_bytes
+    now[0] = 1.0
+    cache.get("gpt-4o", "prompt", 1.0, 0)
+    now[0] = 2.0
+    cache.put("gpt-4o", "other", 1.0, "cccccc")
+    assert cache.get("gpt-4o", "prompt", 1.0, 1) is None, "LRU entry should be evicted"
+    assert cache.get("gpt-4o", "prompt", 1.0, 0) == "aaa"
+    print("  ✓ Test 2 passed: size-based LRU eviction")
+    
+    # Test case 3: Entries expire after TTL
+    now[0] = 100.0
+    assert cache.get("gpt-4o", "other", 1.0) is None, "Expired entry should miss"
+    print("  ✓ Test 3 passed: TTL expiry")
+    
+    cache.close()
+    print("✅ All ResponseCache tests passed!\n")
+
+
+def test_checkpoint():
+    """Test checkpoint save/load round trip"""
+    print("Testing checkpoint...")
+    
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.json")
+        assert load_checkpoint(path) is None, "Missing file should load as None"
+        
+        config = {"model_name": "gpt-4o", "population_size": 4, "group_size": 2, "temperature": 1.0}
+        save_checkpoint(path, "prompt", config, stage=1, population=["a", "b"])
+        state = load_checkpoint(path)
+        assert state["stage"] == 1 and state["population"] == ["a", "b"]
+        assert state["config"] == config and state["final_solution"] is None
+        print("  ✓ Test 1 passed: stage and population round trip")
+        
+        with open(path, "w") as f:
+            f.write("{not json")
+        assert load_checkpoint(path) is None, "Corrupt file should load as None"
+        print("  ✓ Test 2 passed: corrupt checkpoint ignored")
+    
+    print("✅ All checkpoint tests passed!\n")
+
+
+def test_batch_io():
+    """Test batch input parsing and resume of completed ids"""
+    print("Testing batch input/output...")
+    
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "in.jsonl")
+        with open(input_path, "w") as f:
+            f.write('{"id": "a", "prompt": "uno"}\n\n"dos"\n{"prompt": "tres"}\n')
+        items = load_prompts(input_path)
+        assert [i["id"] for i in items] == ["a", 3, 4], "Missing ids default to line number"
+        assert [i["prompt"] for i in items] == ["uno", "dos", "tres"]
+        print("  ✓ Test 1 passed: objects and bare strings parsed")
+        
+        output_path = os.path.join(tmp, "out.jsonl")
+        with open(output_path, "w") as f:
+            f.write('{"id": "a", "result": "x", "error": null}\n')
+            f.write('{"id": 3, "result": null, "error": "boom"}\n')
+        assert load_completed_ids(output_path) == {"a"}, "Failed prompts must be retried"
+        print("  ✓ Test 2 passed: only successful ids are skipped")
+    
+    print("✅ All batch tests passed!\n")
+
+
+def test_similarity():
+    """Test shingle similarity and population diversity"""
+    print("Testing similarity...")
+    
+    a = "La búsqueda binaria divide el arreglo a la mitad en cada paso"
+    b = "la búsqueda binaria divide el arreglo, a la mitad, en cada paso."
+    c = "Quicksort elige un pivote y particiona la lista recursivamente"
+    
+    assert jaccard(shingles(a), shingles(b)) == 1.0, "Case and punctuation are normalized away"
+    assert population_diversity([a, b, a]) == 0.0, "Identical population has no diversity"
+    assert population_diversity([a, c]) > 0.9, "Unrelated responses are diverse"
+    assert population_diversity([a]) == 0.0, "Single response has no diversity"
+    print("  ✓ Diversity separates converged and diverse populations")
+    
+    d = "La búsqueda binaria divide el arreglo a la mitad en cada paso hasta encontrar el valor"
+    assert deduplicate([a, c, b, a]) == [0, 1], "Exact duplicates after normalization are dropped"
+    assert deduplicate([a, d, c], threshold=0.6) == [0, 2], "Near-duplicates above the threshold are dropped"
+    assert deduplicate([a, d, c], threshold=0.95) == [0, 1, 2]
+    print("  ✓ Deduplication keeps first occurrences")
+    
+    print("✅ All similarity tests passed!\n")
+
+
+def test_metrics():
+    """Test per-phase metrics aggregation"""
+    print("Testing MetricsCollector...")
+    
+    assert percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 50) == 5
+    assert percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 95) == 10
+    assert percentile([], 50) == 0.0
+    print("  ✓ Test 1 passed: nearest-rank percentiles")
+    
+    metrics = MetricsCollector()
+    metrics.record("population", "gpt-4o", wall_time=1.0, prompt_tokens=10, completion_tokens=50)
+    metrics.record("population", "gpt-4o", wall_time=3.0, retries=2, prompt_tokens=10, completion_tokens=40)
+    mark = metrics.mark()
+    metrics.record("loop 1", "gpt-4o", wall_time=2.0, wait_time=0.5, prompt_tokens=100, completion_tokens=60,
+                   cached_tokens=64)
+    metrics.record("final", "gpt-4o", wall_time=0.0, cache_hit=True)
+    
+    summary = metrics.summary()
+    assert list(summary["phases"]) == ["population", "loop 1", "final"], "Phases keep first-seen order"
+    assert summary["totals"]["calls"] == 4 and summary["totals"]["retries"] == 2
+    assert summary["totals"]["prompt_tokens"] == 120 and summary["totals"]["cache_hits"] == 1
+    assert summary["phases"]["loop 1"]["cached_tokens"] == 64
+    assert summary["phases"]["population"]["p95_latency"] == 3.0
+    print("  ✓ Test 2 passed: totals and per-phase stats")
+    
+    assert metrics.summary(since=mark)["totals"]["calls"] == 2, "mark() limits the summary to later calls"
+    metrics.record("loop 1", "gpt-4o", wall_time=0.5, prompt_tokens=100, cancelled=True)
+    assert metrics.summary(since=mark)["phases"]["loop 1"]["cancelled"] == 1
+    print("  ✓ Test 3 passed: per-run summaries via mark()")
+    
+    metrics.record("population", "gpt-4o-mini", wall_time=0.1, prompt_tokens=5)
+    models = metrics.summary()["models"]
+    assert list(models) == ["gpt-4o", "gpt-4o-mini"], "Models keep first-seen order"
+    assert models["gpt-4o-mini"]["calls"] == 1 and models["gpt-4o"]["calls"] == 5
+    print("  ✓ Test 4 passed: per-model stats")
+    
+    print("✅ All MetricsCollector tests passed!\n")
+
+
+def test_budget():
+    """Test run budget projections"""
+    print("Testing RunBudget...")
+    
+    # Test case 1: Call and token limits reserve room for the final aggregation
+    budget = RunBudget(max_tokens=1000, max_calls=12)
+    assert budget.stop_reason(calls=8, tokens=500, next_calls=3, next_tokens=200, final_tokens=100) is None
+    assert budget.stop_reason(calls=8, tokens=500, next_calls=4, next_tokens=200, final_tokens=100) == "calls"
+    assert budget.stop_reason(calls=8, tokens=500, next_calls=3, next_tokens=400, final_tokens=200) == "tokens"
+    assert budget.stage_timeout() is None, "No deadline, no stage timeout"
+    assert budget.overspend(12, 1000) is None and budget.overspend(13, 1000) == "calls"
+    assert budget.overspend(13, 1001) == "tokens", "Tokens are reported first"
+    assert budget.limits_spending() and not RunBudget(deadline=10.0).limits_spending()
+    print("  ✓ Test 1 passed: call and token projections")
+    
+    # Test case 2: The deadline keeps a reserve for the final aggregation
+    budget = RunBudget(deadline=10.0)
+    assert budget.reserve() == 5.0, "Half the deadline before any stage is timed"
+    budget.record_stage(2.0)
+    assert budget.reserve() == 4.0 and 5.9 < budget.stage_timeout() <= 6.0
+    assert budget.stop_reason(0, 0, 1, 0, 0) is None
+    budget.record_stage(4.0)
+    assert budget.stop_reason(0, 0, 1, 0, 0) == "deadline", "A 4s loop plus an 8s reserve exceed 10s"
+    assert RunBudget(deadline=10.0, final_reserve=1.0).reserve() == 1.0
+    print("  ✓ Test 2 passed: deadline reserve")
+    
+    print("✅ All RunBudget tests passed!\n")
+
+
+def test_hedging():
+    """Test hedge thresholds and races"""
+    print("Testing HedgePolicy...")
+    
+    # Test case 1: No threshold until enough latencies of that kind are known
+    policy = HedgePolicy(percentile=50, min_samples=3, min_delay=0.05)
+    policy.observe("loop", 0.01)
+    policy.observe("loop", 0.2)
+    assert policy.delay("loop") is None and policy.delay("final") is None
+    policy.observe("loop", 0.3)
+    assert policy.delay("loop") == 0.2
+    policy.observe("loop", 0.01)
+    policy.observe("loop", 0.01)
+    assert policy.delay("loop") == 0.05, "Never below min_delay"
+    print("  ✓ Test 1 passed: per-kind thresholds")
+    
+    # Test case 2: A slow call is duplicated and the first answer wins
+    async def race(delays):
+        attempts = iter(delays)
+        
+        async def call():
+            delay = next(attempts)
+            await asyncio.sleep(abs(delay))
+            if delay < 0:
+                raise RuntimeError("boom")
+            return delay
+        
+        return await policy.race("loop", call)
+    
+    started = time.perf_counter()
+    assert asyncio.run(race([2.0, 0.01])) == (0.01, 1, True)
+    assert time.perf_counter() - started < 0.5, "The slow copy was cancelled"
+    assert asyncio.run(race([0.01])) == (0.01, 0, False)
+    assert asyncio.run(race([-0.1, 0.02])) == (0.02, 1, True), "A failed copy loses to a running one"
+    try:
+        asyncio.run(race([-0.01]))
+        assert False, "Should raise once no copy is left"
+    except RuntimeError:
+        pass
+    print("  ✓ Test 2 passed: hedged races")
+    
+    print("✅ All HedgePolicy tests passed!\n")
+
+
+def test_circuit_breaker():
+    """Test circuit breaker state transitions"""
+    print("Testing CircuitBreaker...")
+    
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])
+    
+    # Test case 1: Consecutive failures open the circuit, then it half-opens
+    assert not breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.record_failure(), "The threshold opens the circuit"
+    assert not breaker.allows() and breaker.retry_in() == 10.0
+    now[0] = 10.0
+    assert breaker.state == "half-open" and breaker.allows()
+    print("  ✓ Test 1 passed: threshold and reset timeout")
+    
+    # Test case 2: A half-open failure reopens it, a success closes it
+    assert breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] = 20.0
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert not breaker.record_failure(), "Past failures are forgotten"
+    print("  ✓ Test 2 passed: half-open probes")
+    
+    # Test case 3: A cooldown (429 Retry-After) opens the circuit at once
+    breaker.record_success()
+    assert breaker.record_failure(cooldown=3.0)
+    assert breaker.retry_in() == 3.0
+    assert not breaker.record_failure(cooldown=1.0), "Already open"
+    assert breaker.retry_in() == 3.0, "A shorter cooldown never shortens the wait"
+    print("  ✓ Test 3 passed: cooldowns")
+    
+    print("✅ All CircuitBreaker tests passed!\n")
+
+
+def test_failure_policy():
+    """Test failure policy validation"""
+    print("Testing FailurePolicy...")
+    
+    # Test case 1: Every stage accepts only the actions that make sense for it
+    for kwargs in ({"population": "reuse"}, {"final": "drop"}, {"loop": "retry"}, {"min_survival": 1.5}):
+        try:
+            FailurePolicy(**kwargs)
+            assert False, f"Should reject {kwargs}"
+        except ValueError:
+            pass
+    print("  ✓ Test 1 passed: actions per stage")
+    
+    # Test case 2: At least one call of a stage must succeed
+    assert FailurePolicy().required(4) == 1
+    assert FailurePolicy(min_survival=0.5).required(5) == 3
+    assert FailurePolicy(min_survival=1.0).required(4) == 4
+    print("  ✓ Test 2 passed: minimum survivors")
+    
+    print("✅ All FailurePolicy tests passed!\n")
+
+
+def test_events():
+    """Test the event bus and its sinks"""
+    print("Testing EventBus...")
+    
+    # Test case 1: Sinks receive events tagged with the run id of the context
+    bus = EventBus()
+    assert not bus.active, "No sinks, nothing to emit"
+    received = []
+    bus.subscribe(received.append)
+    bus.subscribe(received.append)
+    run_id = start_run()
+    bus.emit("stage_started", stage="loop 1", size=2)
+    assert len(received) == 1, "A sink subscribed twice receives each event once"
+    assert received[0]["type"] == "stage_started" and received[0]["run_id"] == run_id
+    bus.unsubscribe(received.append)
+    bus.emit("stage_started", stage="loop 2", size=1)
+    assert len(received) == 1 and not bus.active
+    print("  ✓ Test 1 passed: subscribe, emit and run ids")
+    
+    # Test case 2: JSONL sink writes one event per line
+    import tempfile
+    import json
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "events.jsonl")
+        with JSONLSink(path) as sink:
+            bus = EventBus([sink])
+            bus.emit("call_queued", call_id=1, phase="population", n=1)
+            bus.emit("call_finished", call_id=1, phase="population", error=None, cache_hit=False)
+        with open(path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+    assert [e["type"] for e in events] == ["call_queued", "call_finished"]
+    print("  ✓ Test 2 passed: JSONL sink")
+    
+    # Test case 3: Progress bar counts finished calls and ends the line with the run
+    import io
+    stream = io.StringIO()
+    bus = EventBus([ProgressSink(stream=stream, min_interval=0.0)])
+    bus.emit("run_started", mode="sync")
+    for call_id in (1, 2):
+        bus.emit("call_queued", call_id=call_id, phase="population", n=1)
+    bus.emit("call_finished", call_id=1, phase="population", error=None, cache_hit=False)
+    bus.emit("call_finished", call_id=3, phase="population", error=None, cache_hit=True)
+    bus.emit("run_finished", elapsed=0.1)
+    assert "2/3 llamadas" in stream.getvalue() and stream.getvalue().endswith("\n")
+    print("  ✓ Test 3 passed: progress bar")
+    
+    print("✅ All EventBus tests passed!\n")
+
+
+def stub_orchestrator(backend=None, **kwargs):
+    """Orchestrator over a local stub: 8 responses, groups of 4 and 2 loops unless overridden"""
+    from src.backends import LocalStubBackend
+    from src.rsa_orchestrator import RSAOrchestrator
+    
+    settings = {"population_size": 8, "group_size": 4, "loops": 2, "verbose": False, **kwargs}
+    return RSAOrchestrator(backend=LocalStubBackend() if backend is None else backend, **settings)
+
+
+def scripted_stub(slow=(), failing=(), delay=5.0, latency=0.0):
+    """
+    Local stub whose listed calls misbehave once, like a stuck or failed attempt
+    
+    Calls are (phase, sample_index) pairs; a pair listed twice misbehaves twice.
+    
+    Args:
+        slow: Calls that take delay seconds
+        failing: Calls that raise, like a call that ran out of retries
+        delay: Seconds of a slow call
+        latency: Seconds of every other call
+    """
+    from src.backends import LocalStubBackend
+    
+    class ScriptedStub(LocalStubBackend):
+        def __init__(self):
+            super().__init__(latency=latency)
+            self.slow = list(slow)
+            self.failing = list(failing)
+        
+        def _latency(self, phase, sample_index):
+            call = (phase, sample_index)
+            if call in self.failing:
+                self.failing.remove(call)
+                raise RuntimeError(f"{phase} call {sample_index} failed")
+            if call in self.slow:
+                self.slow.remove(call)
+                return delay
+            return self.latency
+    
+    return ScriptedStub()
+
+
+def test_orchestrator_with_stub():
+    """Test the full pipeline offline with the deterministic local backend"""
+    print("Testing RSAOrchestrator with LocalStubBackend...")
+    
+    try:
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: Serial, threaded and async execution give the same answer
+    serial = stub_orchestrator()
+    result = serial.run("Solve the problem")
+    assert serial.backend.call_count == 8 + 2 + 1 + 1, "8 population + 2 + 1 groups + final"
+    assert stub_orchestrator(max_workers=4).run("Solve the problem") == result
+    assert stub_orchestrator().run_concurrent("Solve the problem") == result
+    print("  ✓ Test 1 passed: sync, threads and async agree")
+    
+    # Test case 2: Metrics are attributed to each phase
+    phases = serial.last_run_stats["metrics"]["phases"]
+    assert list(phases) == ["population", "loop 1", "loop 2", "final"]
+    assert phases["population"]["calls"] == 8 and phases["loop 1"]["calls"] == 2
+    print("  ✓ Test 2 passed: per-phase metrics")
+    
+    # Test case 3: A population shrunk to one answer has not converged
+    shrunk = stub_orchestrator(loops=3, convergence_threshold=0.5)
+    shrunk.run("Solve the problem")
+    assert shrunk.last_run_stats["converged_at_loop"] is None
+    assert shrunk.last_run_stats["loops_completed"] == 3
+    assert [d["stage"] for d in shrunk.last_run_stats["diversity"]] == [0, 1], "no diversity of a single answer"
+    print("  ✓ Test 3 passed: no convergence for a single answer")
+    
+    print("✅ All orchestrator tests passed!\n")
+
+
+def test_parallel_groups():
+    """Test that group aggregations run in parallel and fail one at a time"""
+    print("Testing parallel group aggregation...")
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    requests = [(None, f"Group {i}") for i in range(4)]
+    
+    # Test case 1: Groups overlap on the thread pool; a failing group only loses its own result
+    pooled = stub_orchestrator(scripted_stub(failing=[("loop 1", 1)], latency=0.1), max_workers=4)
+    started = time.perf_counter()
+    results = pooled._generate_groups(requests, temperature=0.7, phase="loop 1")
+    assert time.perf_counter() - started < 0.3, "four 0.1s groups on four workers"
+    assert isinstance(results[1], RuntimeError)
+    assert all(isinstance(r, str) for i, r in enumerate(results) if i != 1)
+    print("  ✓ Test 1 passed: groups in parallel with per-group errors")
+    
+    # Test case 2: An injected executor runs the groups, in group order
+    class CountingExecutor(ThreadPoolExecutor):
+        submitted = 0
+        
+        def submit(self, fn, *args, **kwargs):
+            CountingExecutor.submitted += 1
+            return super().submit(fn, *args, **kwargs)
+    
+    with CountingExecutor(max_workers=2) as executor:
+        injected = stub_orchestrator(executor=executor)
+        results = injected._generate_groups(requests, temperature=0.7, phase="loop 1")
+    serial = stub_orchestrator(max_workers=1)._generate_groups(requests, temperature=0.7, phase="loop 1")
+    assert CountingExecutor.submitted == 4
+    assert results == serial, "Same responses in the same order as the serial path"
+    print("  ✓ Test 2 passed: injected executor")
+    
+    print("✅ All parallel group tests passed!\n")
+
+
+def test_checkpoint_resume():
+    """Test that runs resume from the stage their checkpoint recorded"""
+    print("Testing checkpoint resume...")
+    
+    try:
+        import tempfile
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoint.json")
+        
+        # Test case 1: A run that stopped early records the loops it completed
+        for run in ("run", "run_concurrent"):
+            converged = stub_orchestrator(checkpoint_path=path, convergence_threshold=1.01)
+            answer = getattr(converged, run)("Solve the problem")
+            assert converged.last_run_stats["loops_completed"] == 0
+            assert load_checkpoint(path)["stage"] == 0, run
+        print("  ✓ Test 1 passed: final checkpoint stage is the last completed loop")
+        
+        # Test case 2: Resuming returns the saved answer without calls
+        resumed = stub_orchestrator(checkpoint_path=path, convergence_threshold=1.01)
+        assert resumed.run("Solve the problem", resume=True) == answer
+        assert resumed.backend.call_count == 0
+        assert resumed.last_run_stats["loops_completed"] == 0
+        print("  ✓ Test 2 passed: resumed from the saved answer")
+        
+        # Test case 3: A finished run resumed with more loops refines its saved population further
+        short = stub_orchestrator(checkpoint_path=path, loops=1)
+        answer = short.run("Solve the problem")
+        longer = stub_orchestrator(checkpoint_path=path, loops=3)
+        assert longer.run("Solve the problem", resume=True) != answer
+        assert longer.last_run_stats["loops_completed"] == 3
+        assert longer.backend.call_count == 3, "loops 2 and 3 and the final aggregation"
+        assert load_checkpoint(path)["loops"] == 3
+        print("  ✓ Test 3 passed: resumed with more loops")
+    
+    print("✅ All checkpoint resume tests passed!\n")
+
+
+def test_deduplication():
+    """Test that duplicate initial responses are dropped and optionally replaced"""
+    print("Testing population deduplication...")
+    
+    try:
+        from src.backends import LocalStubBackend
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    class RepetitiveStub(LocalStubBackend):
+        def _respond(self, prompt, temperature, sample_index):
+            return super()._respond(prompt, temperature, sample_index % 3 if sample_index < 8 else sample_index)
+    
+    def dedup_run(top_up):
+        orchestrator = stub_orchestrator(
+            RepetitiveStub(), loops=1, dedup_threshold=0.9, dedup_top_up=top_up
+        )
+        orchestrator.run("Solve the problem")
+        return orchestrator
+    
+    # Test case 1: Duplicates are dropped
+    assert dedup_run(False).backend.call_count == 8 + 1 + 1, "3 unique responses fit in 1 group"
+    print("  ✓ Test 1 passed: duplicates dropped")
+    
+    # Test case 2: Dropped duplicates are topped up with new samples
+    topped_up = dedup_run(True)
+    assert topped_up.last_run_stats["duplicates_removed"] == 5
+    assert topped_up.backend.call_count == 8 + 5 + 2 + 1, "5 top-up samples restore 8 responses"
+    print("  ✓ Test 2 passed: deduplication with top-up")
+    
+    print("✅ All deduplication tests passed!\n")
+
+
+def test_population_schedule():
+    """Test population schedules across loops"""
+    print("Testing population schedules...")
+    
+    try:
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: Constant-N schedule runs population_size aggregations per loop
+    constant = stub_orchestrator(population_schedule="constant")
+    result = constant.run("Solve the problem")
+    phases = constant.last_run_stats["metrics"]["phases"]
+    assert phases["loop 1"]["calls"] == 8 and phases["loop 2"]["calls"] == 8
+    assert stub_orchestrator(population_schedule="constant").run_concurrent("Solve the problem") == result
+    print("  ✓ Test 1 passed: constant-N schedule")
+    
+    print("✅ All population schedule tests passed!\n")
+
+
+def test_anytime():
+    """Test provisional answers and deadlines of anytime runs"""
+    print("Testing anytime mode...")
+    
+    try:
+        from src.backends import LocalStubBackend
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    def slow():
+        return stub_orchestrator(LocalStubBackend(latency=0.1))
+    
+    # Test case 1: Every loop yields an improving answer
+    stages = []
+    final = slow().run_anytime("Solve the problem", on_answer=lambda stage, answer: stages.append(stage))
+    assert stages == [1, 2], "one provisional answer, then the final one"
+    assert final == stub_orchestrator().run_concurrent("Solve the problem")
+    print("  ✓ Test 1 passed: provisional and final answers")
+    
+    # Test case 2: The deadline returns the best answer so far
+    early = slow()
+    early.run_anytime("Solve the problem", deadline=0.35)
+    assert early.last_run_stats["deadline_hit"]
+    assert [a["stage"] for a in early.last_run_stats["anytime_answers"]] == [1]
+    print("  ✓ Test 2 passed: anytime deadline")
+    
+    print("✅ All anytime tests passed!\n")
+
+
+def test_run_budget():
+    """Test that run budgets skip loops and cancel stalled stages"""
+    print("Testing run budgets in the orchestrator...")
+    
+    try:
+        from src.budget import RunBudget, BudgetExceeded
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: A call budget skips the loops it cannot pay for
+    limited = stub_orchestrator(budget=RunBudget(max_calls=11))
+    limited.run("Solve the problem")
+    assert limited.last_run_stats["budget_stop"] == {"loop": 2, "reason": "calls"}
+    assert limited.backend.call_count == 8 + 2 + 1, "loop 2 and final would need 12 calls"
+    print("  ✓ Test 1 passed: loops skipped within the call budget")
+    
+    # Test case 2: A stage stalled past the deadline is cancelled
+    stalled = stub_orchestrator(
+        scripted_stub(slow=[("loop 2", 0)], delay=10.0, latency=0.05),
+        budget=RunBudget(deadline=1.0)
+    )
+    started = time.perf_counter()
+    stalled.run_concurrent("Solve the problem")
+    assert time.perf_counter() - started < 1.0
+    assert stalled.last_run_stats["budget_stop"] == {"loop": 2, "reason": "deadline"}
+    assert not stalled.last_run_stats["budget_fallback"]
+    print("  ✓ Test 2 passed: stalled stage cancelled at the deadline")
+    
+    # Test case 3: Small budgets shrink the population instead of overspending
+    for run in ("run", "run_concurrent"):
+        capped = stub_orchestrator(budget=RunBudget(max_calls=3))
+        getattr(capped, run)("Solve the problem")
+        assert capped.metrics.summary()["totals"]["calls"] <= 3
+        assert capped.last_run_stats["budget_population"] == 2
+        
+        capped = stub_orchestrator(budget=RunBudget(max_tokens=1500))
+        getattr(capped, run)("Solve the problem")
+        totals = capped.metrics.summary()["totals"]
+        assert totals["prompt_tokens"] + totals["completion_tokens"] <= 1500
+        assert capped.last_run_stats["budget_population"] < 8
+    print("  ✓ Test 3 passed: population capped to the call and token budgets")
+    
+    # Test case 4: A budget without room for one sample and the final call is refused
+    try:
+        stub_orchestrator(budget=RunBudget(max_tokens=50)).run("Solve the problem")
+        assert False, "Should have raised BudgetExceeded"
+    except BudgetExceeded as e:
+        assert e.reason == "tokens"
+    print("  ✓ Test 4 passed: too small budget refused before any call")
+    
+    # Test case 5: A stage whose answers run long is cancelled with its calls in flight
+    wordy = scripted_stub(slow=[("loop 1", 1)], delay=10.0)
+    respond = wordy._respond
+    # Loop 1 aggregates groups of four samples: its answers are 30 times longer than planned
+    wordy._respond = lambda prompt, temperature, i: respond(prompt, temperature, i) * (
+        30 if prompt.count("[stub ") == 4 else 1
+    )
+    cut = stub_orchestrator(wordy, budget=RunBudget(max_tokens=4400, completion_estimate=80))
+    started = time.perf_counter()
+    cut.run_concurrent("Solve the problem")
+    assert time.perf_counter() - started < 1.0
+    assert cut.last_run_stats["budget_stop"] == {"loop": 1, "reason": "tokens"}
+    assert cut.last_run_stats["budget_fallback"], "no room left for the final aggregation"
+    totals = cut.metrics.summary()["totals"]
+    assert totals["cancelled"] == 1
+    assert totals["prompt_tokens"] + totals["completion_tokens"] <= 4400
+    print("  ✓ Test 5 passed: overspending stage cancelled in flight")
+    
+    # Test case 6: Streamed final consolidations keep to the deadline
+    async def collect(chunks):
+        return [chunk async for chunk in chunks]
+    
+    for streamed in (
+        lambda o: list(o.run_stream("Solve the problem")),
+        lambda o: RSAOrchestrator._run_in_new_loop(collect(o.run_stream_async("Solve the problem"))),
+    ):
+        late = stub_orchestrator(scripted_stub(slow=[("final", 0)], delay=2.0), budget=RunBudget(deadline=1.0))
+        started = time.perf_counter()
+        chunks = streamed(late)
+        assert time.perf_counter() - started < 1.5
+        assert late.last_run_stats["budget_fallback"] and len(chunks) == 1
+    print("  ✓ Test 6 passed: streamed final consolidation cut at the deadline")
+    
+    # Test case 7: Token and call budgets cannot plan for hedged or spare calls
+    for options in ({"hedge": HedgePolicy()}, {"population_extra": 2}):
+        try:
+            stub_orchestrator(budget=RunBudget(max_calls=20), **options)
+            assert False, "Should have raised ValueError"
+        except ValueError:
+            pass
+    print("  ✓ Test 7 passed: hedging and spare calls refused with spending budgets")
+    
+    print("✅ All run budget tests passed!\n")
+
+
+def test_run_events():
+    """Test the structured events of orchestrator runs"""
+    print("Testing run events...")
+    
+    try:
+        # The package's own bus: run ids live in src.events
+        from src.events import EventBus as Bus
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: Events trace every stage and call
+    events = []
+    traced = stub_orchestrator(events=Bus([events.append]))
+    traced.run("Solve the problem")
+    stages = [e["stage"] for e in events if e["type"] == "stage_finished"]
+    assert stages == ["population", "loop 1", "loop 2"]
+    finished = [e for e in events if e["type"] == "call_finished"]
+    assert len(finished) == traced.backend.call_count == 12
+    traced_events = [e for e in events if e["type"] != "log"]
+    assert {e["run_id"] for e in traced_events} == {traced.last_run_stats["run_id"]}
+    assert traced_events[0]["type"] == "run_started" and traced_events[-1]["type"] == "run_finished"
+    print("  ✓ Test 1 passed: stages and calls traced")
+    
+    # Test case 2: Concurrent runs keep their events apart
+    events.clear()
+    
+    async def two_runs():
+        await asyncio.gather(traced.run_async("Problem A"), traced.run_async("Problem B"))
+    
+    asyncio.run(two_runs())
+    runs = {e["run_id"] for e in events if e["type"] != "log"}
+    assert len(runs) == 2
+    for run_id in runs:
+        assert sum(e["type"] == "call_finished" and e["run_id"] == run_id for e in events) == 12
+    print("  ✓ Test 2 passed: run ids of concurrent runs")
+    
+    # Test case 3: Progress messages are log events, printed only by the verbose console sink
+    import io
+    import contextlib
+    for verbose, sinks in ((False, []), (False, [events.append]), (True, [])):
+        events.clear()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            quiet = stub_orchestrator(events=Bus(sinks), verbose=verbose)
+            quiet.run("Solve the problem")
+        logged = [e["message"] for e in events if e["type"] == "log"]
+        assert bool(output.getvalue()) == verbose, verbose
+        assert quiet.events.active == bool(sinks or verbose)
+        assert bool(sinks) == any("INICIANDO PIPELINE RSA" in message for message in logged)
+    print("  ✓ Test 3 passed: progress messages as log events")
+    
+    print("✅ All run event tests passed!\n")
+
+
+def test_batch_run():
+    """Test that overlapping batch prompts keep their run statistics apart"""
+    print("Testing batch runs...")
+    
+    try:
+        from src.batch import run_batch
+        from src.backends import LocalStubBackend
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    import json
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "in.jsonl")
+        output_path = os.path.join(tmp, "out.jsonl")
+        with open(input_path, "w") as f:
+            f.write("".join(f'{{"id": {i}, "prompt": "Problem {i}"}}\n' for i in range(3)))
+        
+        # Test case 1: Every prompt reports its own calls while all three overlap
+        orchestrator = stub_orchestrator(LocalStubBackend(latency=0.02))
+        started = time.perf_counter()
+        summary = run_batch(orchestrator, input_path, output_path, max_active_prompts=3)
+        assert summary == {"completed": 3, "failed": 0, "skipped": 0}
+        assert time.perf_counter() - started < 3 * 4 * 0.02, "the prompts' stages overlap"
+        with open(output_path) as f:
+            records = [json.loads(line) for line in f]
+        assert [r["metrics"]["calls"] for r in records] == [12, 12, 12]
+        assert orchestrator.metrics.summary()["totals"]["calls"] == 36
+        assert orchestrator.last_run_stats == {}, "runs happen on forks"
+        print("  ✓ Test 1 passed: per-prompt stats of overlapping runs")
+        
+        # Test case 2: Forks share the backend but not their run state
+        first, second = orchestrator.fork(), orchestrator.fork()
+        
+        async def two_runs():
+            return await asyncio.gather(first.run_async("Problem A"), second.run_async("Problem B"))
+        
+        asyncio.run(two_runs())
+        assert first.backend is second.backend is orchestrator.backend
+        assert first.last_run_stats["run_id"] != second.last_run_stats["run_id"]
+        assert first.last_run_stats["metrics"]["totals"]["calls"] == 12
+        assert second.last_run_stats["metrics"]["totals"]["calls"] == 12
+        print("  ✓ Test 2 passed: forks keep their run stats apart")
+    
+    print("✅ All batch run tests passed!\n")
+
+
+def test_dataflow():
+    """Test dataflow execution without per-loop barriers"""
+    print("Testing dataflow execution...")
+    
+    try:
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    def skewed(**kwargs):
+        stub = scripted_stub(slow=[("loop 1", 0), ("loop 2", 1)], delay=0.35, latency=0.05)
+        return stub_orchestrator(stub, group_size=2, loops=3, **kwargs)
+    
+    # Test case 1: Groups start as their inputs finish, with the same result
+    timings = {}
+    results = {}
+    for dataflow in (False, True):
+        started = time.perf_counter()
+        results[dataflow] = skewed(dataflow=dataflow).run_concurrent("Solve the problem")
+        timings[dataflow] = time.perf_counter() - started
+    assert results[True] == results[False]
+    assert timings[True] < timings[False] - 0.15, "the two slow groups overlap instead of adding up"
+    print("  ✓ Test 1 passed: slow groups overlap")
+    
+    # Test case 2: Dataflow needs position-based groups
+    try:
+        skewed(dataflow=True, grouping_strategy="balanced")
+        assert False, "dataflow needs position-based groups"
+    except ValueError:
+        pass
+    print("  ✓ Test 2 passed: content-based grouping rejected")
+    
+    print("✅ All dataflow tests passed!\n")
+
+
+def test_hedged_calls():
+    """Test hedged calls and spare population samples"""
+    print("Testing hedged calls...")
+    
+    try:
+        from benchmarks.fake_server import FakeOpenAIServer
+        from src.backends import OpenAICompatibleBackend
+        from src.gemini_client import AsyncOpenAIClient
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    def straggling(slow, **kwargs):
+        return stub_orchestrator(scripted_stub(slow=slow, latency=0.05), group_size=2, **kwargs)
+    
+    # Test case 1: Stragglers are hedged, and the extra calls are counted
+    expected = stub_orchestrator(group_size=2).run_concurrent("Solve the problem")
+    policy = HedgePolicy(percentile=90, min_samples=3)
+    for _ in range(3):
+        # Latencies of earlier population requests, which are one call per run
+        policy.observe("population", 0.05)
+    hedged = straggling([("population", 3), ("loop 1", 1)], hedge=policy)
+    started = time.perf_counter()
+    assert hedged.run_concurrent("Solve the problem") == expected, "Duplicates answer the same request"
+    assert time.perf_counter() - started < 2.0
+    assert hedged.last_run_stats["hedges"] == hedged.last_run_stats["hedge_wins"] == 2
+    assert hedged.last_run_stats["metrics"]["totals"]["cancelled"] == 2
+    print("  ✓ Test 1 passed: hedged stragglers")
+    
+    # Test case 2: Spare population samples leave the slowest ones behind
+    spare = straggling([("population", 3)], population_extra=2)
+    started = time.perf_counter()
+    spare.run_concurrent("Solve the problem")
+    assert time.perf_counter() - started < 2.0, "The slow sample was left behind"
+    assert spare.last_run_stats["discarded_samples"] == 2
+    assert spare.last_run_stats["metrics"]["phases"]["population"]["cancelled"] >= 1
+    print("  ✓ Test 2 passed: spare population samples")
+    
+    # Test case 3: Hedging alone keeps the population in one n-sampling request
+    with FakeOpenAIServer(latency_mean=0.0) as server:
+        backend = OpenAICompatibleBackend(server.url, api_key="test", request_delay=0)
+        hedged = stub_orchestrator(backend, group_size=2, hedge=HedgePolicy())
+        hedged.run_concurrent("Solve the problem")
+        assert server.stats["requests"] == 1 + 4 + 2 + 1, "one population request, then one per group"
+        phases = hedged.last_run_stats["metrics"]["phases"]
+        assert phases["population"]["calls"] == 1
+    print("  ✓ Test 3 passed: n-sampling kept with hedging")
+    
+    # Test case 4: A cancelled request still counts the prompt it sent
+    with FakeOpenAIServer(latency="constant", latency_mean=5.0) as server:
+        client = AsyncOpenAIClient(api_key="test", base_url=server.url, metrics=MetricsCollector())
+        
+        async def abandoned():
+            task = asyncio.ensure_future(client.generate_response("Solve the problem " * 10))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        
+        RSAOrchestrator._run_in_new_loop(abandoned())
+        totals = client.metrics.summary()["totals"]
+        assert totals["cancelled"] == 1 and totals["prompt_tokens"] > 0
+    print("  ✓ Test 4 passed: cancelled requests count their prompt tokens")
+    
+    print("✅ All hedged call tests passed!\n")
+
+
+def test_degraded_runs():
+    """Test that failed calls degrade the run instead of aborting it"""
+    print("Testing degraded runs...")
+    
+    try:
+        from src.degradation import FailurePolicy, StageFailed
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    def flaky(failing, **kwargs):
+        return stub_orchestrator(scripted_stub(failing=failing), group_size=2, **kwargs)
+    
+    def degradation(failing, concurrent=False, **kwargs):
+        orchestrator = flaky(failing, **kwargs)
+        answer = orchestrator.run_concurrent("Solve the problem") if concurrent else orchestrator.run("Solve the problem")
+        assert answer.startswith("[stub")
+        return [
+            (d["stage"], d["calls"], d["failed"], d["recovered"], d["reused"], d["dropped"])
+            for d in orchestrator.last_run_stats["degradation"]
+        ]
+    
+    # Test case 1: Each failure policy is reported per stage
+    loop_failure = [("loop 1", 1)]
+    for mode in ({}, {"concurrent": True}, {"concurrent": True, "dataflow": True}):
+        assert degradation(loop_failure, **mode) == [("loop 1", 4, 1, 0, 0, 1)], mode
+        reuse = FailurePolicy(loop="reuse")
+        assert degradation(loop_failure, failure_policy=reuse, **mode) == [("loop 1", 4, 1, 0, 1, 0)], mode
+    for concurrent in (False, True):
+        regroup = FailurePolicy(loop="regroup")
+        assert degradation(loop_failure, concurrent, failure_policy=regroup) == [("loop 1", 4, 1, 1, 0, 0)]
+    assert degradation([("population", 2)] * 2) == [("population", 8, 1, 0, 0, 1)]
+    assert degradation([("final", 0)], failure_policy=FailurePolicy(final="reuse")) == [("final", 1, 1, 0, 1, 0)]
+    regroup = FailurePolicy(final="regroup")
+    assert degradation([("final", 0)], True, failure_policy=regroup) == [("final", 1, 1, 1, 0, 0)]
+    print("  ✓ Test 1 passed: degradation report")
+    
+    # Test case 2: Streamed runs recover a final consolidation that failed before its first chunk
+    async def collect(chunks):
+        return [chunk async for chunk in chunks]
+    
+    for policy, report in ((FailurePolicy(final="reuse"), ("final", 1, 1, 0, 1, 0)),
+                           (FailurePolicy(final="regroup"), ("final", 1, 1, 1, 0, 0))):
+        for streamed in (
+            lambda o: list(o.run_stream("Solve the problem")),
+            lambda o: RSAOrchestrator._run_in_new_loop(collect(o.run_stream_async("Solve the problem"))),
+        ):
+            orchestrator = flaky([("final", 0)], failure_policy=policy)
+            chunks = streamed(orchestrator)
+            assert len(chunks) == 1 and chunks[0].startswith("[stub")
+            [d] = orchestrator.last_run_stats["degradation"]
+            assert (d["stage"], d["calls"], d["failed"], d["recovered"], d["reused"], d["dropped"]) == report
+    print("  ✓ Test 2 passed: streamed final consolidation recovered")
+    
+    # Test case 3: Runs below the policy's requirements still abort
+    for failing, policy, error in (
+        (loop_failure, FailurePolicy(min_survival=0.8), StageFailed),
+        (loop_failure, FailurePolicy(loop="fail"), StageFailed),
+        ([("population", 0)], FailurePolicy(population="fail"), RuntimeError),
+        ([("final", 0)], None, RuntimeError),
+    ):
+        try:
+            flaky(failing, failure_policy=policy).run("Solve the problem")
+            assert False, f"Should raise {error.__name__}"
+        except error:
+            pass
+    print("  ✓ Test 3 passed: failing stages abort the run")
+    
+    print("✅ All degraded run tests passed!\n")
+
+
+def test_tiered_backend():
+    """Test that every phase is served by the model chosen for it"""
+    print("Testing TieredBackend...")
+    
+    try:
+        from src.backends import LocalStubBackend
+        from src.tiering import TieredBackend
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: Phases route to their model, and phases of one model share its backend
+    tiered = TieredBackend.from_models(
+        {"population": "small", "loop": "large", "loop 2": "medium"},
+        "large",
+        lambda model: LocalStubBackend(model_name=model)
+    )
+    assert tiered.models() == {"population": "small", "loop": "large", "final": "large", "loop 2": "medium"}
+    assert tiered.route("final") is tiered.route("loop 1"), "Phases of one model share its backend"
+    print("  ✓ Test 1 passed: routing")
+    
+    # Test case 2: Runs record calls per model
+    orchestrator = stub_orchestrator(tiered, group_size=2)
+    for run in (orchestrator.run, orchestrator.run_concurrent):
+        run("Solve the problem")
+        models = orchestrator.last_run_stats["metrics"]["models"]
+        assert {model: stats["calls"] for model, stats in models.items()} == {"small": 8, "large": 5, "medium": 2}
+    print("  ✓ Test 2 passed: per-model metrics")
+    
+    # Test case 3: Unknown phases are rejected
+    try:
+        TieredBackend({"aggregation": LocalStubBackend()}, LocalStubBackend())
+        assert False, "Unknown phases are rejected"
+    except ValueError:
+        pass
+    print("  ✓ Test 3 passed: unknown phases rejected")
+    
+    # Test case 4: Checkpoints of other phase models are not resumed
+    def fingerprint(population_model):
+        backend = TieredBackend.from_models(
+            {"population": population_model}, "large", lambda model: LocalStubBackend(model_name=model)
+        )
+        return stub_orchestrator(backend)._checkpoint_config()
+    
+    assert fingerprint("small") != fingerprint("medium")
+    assert stub_orchestrator()._checkpoint_config()["phase_models"] is None
+    print("  ✓ Test 4 passed: phase models in the checkpoint fingerprint")
+    
+    # Test case 5: Rate limits of an injected backend are configured on the backend
+    try:
+        stub_orchestrator(tiered, requests_per_minute=60)
+        assert False, "An orchestrator limiter would never be used"
+    except ValueError:
+        pass
+    print("  ✓ Test 5 passed: orchestrator limits rejected with an injected backend")
+    
+    print("✅ All TieredBackend tests passed!\n")
+
+
+def test_async_client():
+    """Test the concurrency cap of the async client against the simulated endpoint"""
+    print("Testing AsyncOpenAIClient...")
+    
+    try:
+        from benchmarks.fake_server import FakeOpenAIServer
+        from src.events import EventBus as Bus
+        from src.gemini_client import AsyncOpenAIClient
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: No more requests in flight than max_concurrency
+    with FakeOpenAIServer(latency="constant", latency_mean=0.1) as server:
+        in_flight = []
+        
+        def track(event):
+            if event["type"] == "call_started":
+                in_flight.append(in_flight[-1] + 1 if in_flight else 1)
+            elif event["type"] == "call_finished":
+                in_flight.append(in_flight[-1] - 1)
+        
+        client = AsyncOpenAIClient(api_key="test", base_url=server.url, max_concurrency=2, events=Bus([track]))
+        started = time.perf_counter()
+        responses = RSAOrchestrator._run_in_new_loop(client.generate_many([f"Problem {i}" for i in range(6)]))
+        assert len(responses) == 6 and server.stats["requests"] == 6
+        assert max(in_flight) == 2, f"Peak of {max(in_flight)} requests in flight"
+        assert time.perf_counter() - started >= 0.3, "six 0.1s requests, two at a time"
+    print("  ✓ Test 1 passed: requests capped at max_concurrency")
+    
+    # Test case 2: Responses come back in the order of their prompts
+    with FakeOpenAIServer(latency_mean=0.0) as server:
+        client = AsyncOpenAIClient(api_key="test", base_url=server.url, max_concurrency=1)
+        responses = RSAOrchestrator._run_in_new_loop(client.generate_many([f"Problem {i}" for i in range(4)]))
+        assert [r.split(":")[0] for r in responses] == [f"Respuesta simulada {i}" for i in range(1, 5)]
+    print("  ✓ Test 2 passed: generate_many keeps the prompt order")
+    
+    print("✅ All AsyncOpenAIClient tests passed!\n")
+
+
+def test_streaming():
+    """Test streamed final answers and streamed client responses"""
+    print("Testing streaming...")
+    
+    try:
+        from benchmarks.fake_server import FakeOpenAIServer
+        from src.gemini_client import AsyncOpenAIClient, OpenAIClient
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: Streamed runs yield the answer of a regular run, chunk by chunk
+    answer = stub_orchestrator().run("Solve the problem")
+    chunks = list(stub_orchestrator().run_stream("Solve the problem"))
+    assert len(chunks) > 1 and "".join(chunks) == answer
+    
+    async def collect():
+        return [chunk async for chunk in stub_orchestrator().run_stream_async("Solve the problem")]
+    
+    assert "".join(RSAOrchestrator._run_in_new_loop(collect())) == answer
+    print("  ✓ Test 1 passed: run_stream and run_stream_async")
+    
+    # Test case 2: Clients stream the endpoint's chunks and record the call
+    with FakeOpenAIServer(latency_mean=0.0) as server:
+        client = OpenAIClient(api_key="test", base_url=server.url, metrics=MetricsCollector())
+        chunks = list(client.stream_response("Solve the problem"))
+        assert len(chunks) > 1 and "".join(chunks).startswith("Respuesta simulada")
+        
+        async_client = AsyncOpenAIClient(api_key="test", base_url=server.url, metrics=client.metrics)
+        
+        async def stream():
+            return [chunk async for chunk in async_client.stream_response("Solve the problem")]
+        
+        assert len(RSAOrchestrator._run_in_new_loop(stream())) > 1
+        assert server.stats["streams"] == 2
+        totals = client.metrics.summary()["totals"]
+        assert totals["calls"] == 2 and totals["completion_tokens"] > 0
+    print("  ✓ Test 2 passed: sync and async client streams")
+    
+    print("✅ All streaming tests passed!\n")
+
+
+def test_n_sampling():
+    """Test server-side n-sampling against the simulated endpoint"""
+    print("Testing n-sampling population requests...")
+    
+    try:
+        from benchmarks.fake_server import FakeOpenAIServer
+        from src.backends import OpenAICompatibleBackend
+        from src.gemini_client import AsyncOpenAIClient, OpenAIClient
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: The whole population comes from a single request
+    with FakeOpenAIServer(latency_mean=0.0) as server:
+        backend = OpenAICompatibleBackend(server.url, api_key="test", request_delay=0)
+        responses = backend.generate_n("Solve the problem", 8)
+        assert len(responses) == 8 and len(set(responses)) == 8
+        assert server.stats["requests"] == 1, f"Expected 1 request, got {server.stats['requests']}"
+    print("  ✓ Test 1 passed: one request for 8 responses")
+    
+    # Test case 2: A lower server limit shrinks n instead of giving up
+    with FakeOpenAIServer(latency_mean=0.0, max_n=4) as server:
+        backend = OpenAICompatibleBackend(server.url, api_key="test", request_delay=0)
+        responses = backend.generate_n("Solve the problem", 8)
+        assert len(responses) == 8 and backend.client.max_n == 4
+        assert server.stats["completions"] == 8
+    print("  ✓ Test 2 passed: n reduced to the server limit")
+    
+    # Test case 3: Endpoints without n fall back to one request per response
+    with FakeOpenAIServer(latency_mean=0.0, max_n=1) as server:
+        backend = OpenAICompatibleBackend(server.url, api_key="test", request_delay=0)
+        responses = backend.generate_n("Solve the problem", 3)
+        assert len(responses) == 3 and None not in responses
+        assert not backend.client.supports_n
+    print("  ✓ Test 3 passed: fallback without n support")
+    
+    # Test case 4: Choices without content end n-sampling instead of repeating it
+    def empty_choices(n):
+        return SimpleNamespace(choices=[
+            SimpleNamespace(index=i, message=SimpleNamespace(content=None if n > 1 else "single"))
+            for i in range(n)
+        ])
+    
+    class EmptyChoicesClient(OpenAIClient):
+        def _create_with_retries(self, prompt, temperature, max_retries, retry_delay, phase, n=1, system=None):
+            return empty_choices(n)
+    
+    class AsyncEmptyChoicesClient(AsyncOpenAIClient):
+        async def _create_with_retries(self, prompt, temperature, max_retries, retry_delay, phase, n=1, system=None):
+            return empty_choices(n)
+    
+    assert EmptyChoicesClient(api_key="test").generate_n_responses("Solve", 4, delay=0) == ["single"] * 4
+    responses = asyncio.run(AsyncEmptyChoicesClient(api_key="test").generate_n_responses("Solve", 4))
+    assert responses == ["single"] * 4
+    print("  ✓ Test 4 passed: single calls after a round without content")
+    
+    print("✅ All n-sampling tests passed!\n")
+
+
+def test_prompt_caching():
+    """Test that the shared-prefix layout is served from the provider's prompt cache"""
+    print("Testing shared-prefix prompt caching...")
+    
+    try:
+        from benchmarks.fake_server import FakeOpenAIServer
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    def cached_tokens(layout):
+        with FakeOpenAIServer(latency_mean=0.0) as server:
+            orchestrator = RSAOrchestrator(
+                api_key="test",
+                base_url=server.url,
+                population_size=8,
+                group_size=2,
+                loops=1,
+                verbose=False,
+                prompt_layout=layout
+            )
+            orchestrator.run("Solve the problem " * 40)
+            return orchestrator.last_run_stats["metrics"]["phases"]["loop 1"]["cached_tokens"]
+    
+    classic = cached_tokens("classic")
+    shared = cached_tokens("shared-prefix")
+    assert shared > classic, f"Expected more cached tokens with shared-prefix ({shared} vs {classic})"
+    print("  ✓ Test 1 passed: shared-prefix layout reuses a longer cached prefix")
+    
+    print("✅ All prompt caching tests passed!\n")
+
+
+def test_http_pool():
+    """Test that orchestrators share pooled keep-alive connections"""
+    print("Testing shared HTTP connection pool...")
+    
+    try:
+        from benchmarks.fake_server import FakeOpenAIServer
+        from src.http_pool import HTTPPoolConfig, get_http_client
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: Equal settings map to one client; the pool is sized from concurrency
+    config = HTTPPoolConfig().sized_for(4)
+    assert config.max_connections == 4
+    assert get_http_client(config) is get_http_client(HTTPPoolConfig(max_connections=4))
+    print("  ✓ Test 1 passed: one client per pool configuration")
+    
+    # Test case 2: Two orchestrators reuse the same connections
+    with FakeOpenAIServer(latency_mean=0.01) as server:
+        for _ in range(2):
+            RSAOrchestrator(
+                api_key="test",
+                base_url=server.url,
+                population_size=8,
+                group_size=2,
+                loops=1,
+                verbose=False,
+                max_workers=3
+            ).run("Solve the problem")
+        assert server.stats["connections"] <= 3, f"Opened {server.stats['connections']} connections"
+    print("  ✓ Test 2 passed: connections reused across orchestrators")
+    
+    print("✅ All HTTP pool tests passed!\n")
+
+
+def test_endpoint_pool():
+    """Test load balancing and failover across endpoints"""
+    print("Testing PooledBackend...")
+    
+    try:
+        from benchmarks.fake_server import FakeOpenAIServer
+        from src.endpoint_pool import Endpoint, PooledBackend
+        from src.rsa_orchestrator import RSAOrchestrator
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    def orchestrator(pool, **kwargs):
+        return RSAOrchestrator(backend=pool, population_size=8, group_size=2, loops=2, verbose=False, **kwargs)
+    
+    with FakeOpenAIServer(latency_mean=0.01, seed=1) as first, FakeOpenAIServer(latency_mean=0.01, seed=2) as second:
+        # Test case 1: Calls are spread evenly across healthy endpoints
+        for strategy in ("round-robin", "least-outstanding"):
+            pool = PooledBackend.from_endpoints(
+                [Endpoint(first.url, "key-1"), Endpoint(second.url, "key-2")],
+                strategy=strategy,
+                use_n_sampling=False
+            )
+            orchestrator(pool).run_concurrent("Solve the problem")
+            calls = [s["calls"] for s in pool.stats()]
+            assert calls[0] == calls[1] > 0, f"{strategy}: {calls}"
+        print("  ✓ Test 1 passed: balanced calls")
+        
+        # Test case 2: A rate-limited or unreachable endpoint is skipped for the rest of the run
+        down = FakeOpenAIServer().start()
+        down_url = down.url
+        down.stop()
+        with FakeOpenAIServer(rate_limit_probability=1.0, retry_after=30) as limited:
+            for bad in (limited.url, down_url):
+                pool = PooledBackend.from_endpoints(
+                    [Endpoint(first.url, "key-1"), Endpoint(bad, "key-2"), Endpoint(second.url, "key-3")],
+                    use_n_sampling=False,
+                    request_delay=0
+                )
+                warnings = []
+                events = EventBus([lambda e: e["type"] == "warning" and warnings.append(e["message"])])
+                o = orchestrator(pool, events=events)
+                o.run_concurrent("Solve the problem")
+                final_answer = o.run("Solve the problem")
+                assert final_answer, "Failed calls moved to healthy endpoints"
+                stats = pool.stats()
+                assert stats[1]["state"] == "open" and stats[1]["failures"] == stats[1]["calls"]
+                assert stats[1]["calls"] <= 3, "Open circuit gets no more calls"
+                assert len(warnings) == 1 and "unavailable for 30s" in warnings[0]
+        print("  ✓ Test 2 passed: failover and circuit breaking")
+    
+    print("✅ All PooledBackend tests passed!\n")
+
+
+def test_model_tiering():
+    """Test per-model backends and budgets built by the orchestrator"""
+    print("Testing per-phase models...")
+    
+    try:
+        from benchmarks.fake_server import FakeOpenAIServer
+        from src.rsa_orchestrator import RSAOrchestrator
+        from src.tiering import ModelLimits, TieredBackend
+    except ImportError as e:
+        print(f"  Note: skipped, dependencies not installed ({e})\n")
+        return
+    
+    # Test case 1: One backend, concurrency limit and rate limiter per model
+    with FakeOpenAIServer(latency_mean=0.01) as server:
+        orchestrator = RSAOrchestrator(
+            api_key="test",
+            base_url=server.url,
+            model_name="gpt-4o",
+            phase_models={"population": "gpt-4o-mini"},
+            model_limits={"gpt-4o-mini": ModelLimits(max_concurrency=16, requests_per_minute=6000)},
+            requests_per_minute=600,
+            population_size=8,
+            group_size=4,
+            loops=1,
+            verbose=False
+        )
+        backend = orchestrator.backend
+        assert isinstance(backend, TieredBackend)
+        small, large = backend.route("population"), backend.route("final")
+        assert small.model_name == "gpt-4o-mini" and large.model_name == "gpt-4o"
+        assert small.async_client.max_concurrency == 16 and large.async_client.max_concurrency == 8
+        assert small.client.rate_limiter.requests_per_minute == 6000
+        assert large.client.rate_limiter.requests_per_minute == 600, "Each model has its own budget"
+        
+        orchestrator.run_concurrent("Solve the problem")
+        models = orchestrator.last_run_stats["metrics"]["models"]
+        assert models["gpt-4o-mini"]["calls"] == 1 and models["gpt-4o"]["calls"] == 3
+    print("  ✓ Test 1 passed: per-model budgets")
+    
+    print("✅ All per-phase model tests passed!\n")
+
+
 def test_imports():
     """Test that all modules can be imported"""
     print("Testing module imports...")
@@ -109,6 +1506,21 @@ def test_imports():
             'src/gemini_client.py',
             'src/aggregation.py',
             'src/rsa_orchestrator.py',
+            'src/rate_limiter.py',
+            'src/response_cache.py',
+            'src/checkpoint.py',
+            'src/batch.py',
+            'src/similarity.py',
+            'src/metrics.py',
+            'src/budget.py',
+            'src/events.py',
+            'src/hedging.py',
+            'src/circuit_breaker.py',
+            'src/endpoint_pool.py',
+            'src/degradation.py',
+            'src/tiering.py',
+            'src/backends.py',
+            'src/http_pool.py',
             'main.py',
             'examples.py'
         ]
@@ -118,7 +1530,7 @@ def test_imports():
             print(f"    ✓ {f}")
         
         print("✅ All files exist!\n")
-        
+    
     except Exception as e:
         print(f"❌ Import test failed: {e}\n")
 
@@ -132,6 +1544,37 @@ if __name__ == "__main__":
         test_imports()
         test_create_groups()
         test_aggregation_prompts()
+        test_rate_limiter()
+        test_response_cache()
+        test_checkpoint()
+        test_batch_io()
+        test_similarity()
+        test_metrics()
+        test_budget()
+        test_hedging()
+        test_circuit_breaker()
+        test_failure_policy()
+        test_events()
+        test_orchestrator_with_stub()
+        test_parallel_groups()
+        test_checkpoint_resume()
+        test_deduplication()
+        test_population_schedule()
+        test_anytime()
+        test_run_budget()
+        test_run_events()
+        test_batch_run()
+        test_dataflow()
+        test_hedged_calls()
+        test_degraded_runs()
+        test_tiered_backend()
+        test_async_client()
+        test_streaming()
+        test_n_sampling()
+        test_prompt_caching()
+        test_http_pool()
+        test_endpoint_pool()
+        test_model_tiering()
         test_rsa_logic()
         
         print("="*60)
@@ -142,7 +1585,7 @@ if __name__ == "__main__":
         print("  1. Install dependencies: pip install -r requirements.txt")
         print("  2. Set GEMINI_API_KEY in .env file")
         print("  3. Run: python main.py \"your prompt here\"")
-        
+    
     except AssertionError as e:
         print(f"\n❌ Test failed: {e}")
         sys.exit(1)